@@ -6,5 +6,4 @@ class RecommenderConfig(AppConfig):
     name = 'recommender'
 
     def ready(self):
-        # Importing signals or other startup logic can happen here later.
-        return super().ready()
+        import recommender.signals  # noqa: F401
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.services.audio_embeddings import AUDIO_EMBEDDING_DIR, AUDIO_MODEL_VERSION, build_audio_embeddings
+from recommender.services.embedding_snapshot import SNAPSHOT_KEEP, SNAPSHOT_SOURCES, VECTOR_DIM
+
+
+class Command(BaseCommand):
+    help = 'Embed tracks, albums, and artists from their stored audio features as a snapshot of their own.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory',
+            default=AUDIO_EMBEDDING_DIR,
+            help='Snapshot root for the audio vectors (default: RECOMMENDER_AUDIO_EMBEDDING_DIR).',
+        )
+        parser.add_argument(
+            '--types',
+            nargs='+',
+            choices=list(SNAPSHOT_SOURCES),
+            help='Resource types to write (default: all).',
+        )
+        parser.add_argument('--dim', type=int, default=VECTOR_DIM, help='Stored vector width.')
+        parser.add_argument('--keep', type=int, default=SNAPSHOT_KEEP, help='Snapshot versions to keep on disk.')
+
+    def handle(self, *args, **options):
+        if not options['directory']:
+            raise CommandError('Pass --directory or set RECOMMENDER_AUDIO_EMBEDDING_DIR.')
+        result = build_audio_embeddings(
+            options['types'], dim=options['dim'], directory=options['directory'], keep=options['keep'],
+        )
+        built = ', '.join(f"{resource_type}={count}" for resource_type, count in result.built.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Audio embeddings {AUDIO_MODEL_VERSION} built to {result.path} ({built}) in {result.seconds}s.")
+        )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from recommender.services.embedding_snapshot import SNAPSHOT_SOURCES
+from recommender.services.item_neighbors import NEIGHBORS_K, NEIGHBORS_WORKERS, compute_neighbors
+
+
+class Command(BaseCommand):
+    help = 'Precompute the nearest neighbours of catalog items for "more like this" lookups.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--types',
+            nargs='+',
+            choices=list(SNAPSHOT_SOURCES),
+            help='Resource types to process (default: all).',
+        )
+        parser.add_argument('--k', type=int, default=NEIGHBORS_K, help='Neighbours stored per item.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=NEIGHBORS_WORKERS,
+            help='Scoring threads (0 uses up to 4 CPUs, 1 runs inline).',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every item instead of only newly embedded or changed ones.',
+        )
+
+    def handle(self, *args, **options):
+        result = compute_neighbors(options['types'], k=options['k'], full=options['full'], workers=options['workers'])
+        computed = ', '.join(f"{resource_type}={count}" for resource_type, count in result.computed.items())
+        self.stdout.write(self.style.SUCCESS(f"Item neighbours computed ({computed}) in {result.seconds}s."))
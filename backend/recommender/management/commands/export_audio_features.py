@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.services.audio_export import CHUNK_ROWS, EXPORT_DIR, export_audio_features
+
+
+class Command(BaseCommand):
+    help = 'Append changed audio features to a memory-mappable columnar export for training and the engine.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory',
+            default=EXPORT_DIR,
+            help='Export root (default: RECOMMENDER_AUDIO_EXPORT_DIR).',
+        )
+        parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows per chunk directory.')
+        parser.add_argument('--full', action='store_true', help='Re-export every row and drop the old chunks.')
+
+    def handle(self, *args, **options):
+        if not options['directory']:
+            raise CommandError('Pass --directory or set RECOMMENDER_AUDIO_EXPORT_DIR.')
+        result = export_audio_features(options['directory'], full=options['full'], chunk_rows=options['chunk_rows'])
+        mode = 'full' if result.full else 'incremental'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Audio features exported to {result.path} ({mode}, rows={result.rows}, chunks={len(result.chunks)})."
+            )
+        )
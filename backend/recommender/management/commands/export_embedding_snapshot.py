@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.services.embedding_snapshot import SNAPSHOT_DIR, SNAPSHOT_KEEP, VECTOR_DIM, export_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export stored embeddings as a memory-mappable snapshot and make it the engine\'s current version.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory',
+            default=SNAPSHOT_DIR,
+            help='Snapshot root shared with the engine (default: RECOMMENDER_SNAPSHOT_DIR).',
+        )
+        parser.add_argument('--dim', type=int, default=VECTOR_DIM, help='Vector width written to the snapshot.')
+        parser.add_argument('--keep', type=int, default=SNAPSHOT_KEEP, help='Snapshot versions to keep on disk.')
+
+    def handle(self, *args, **options):
+        if not options['directory']:
+            raise CommandError('Pass --directory or set RECOMMENDER_SNAPSHOT_DIR.')
+        result = export_snapshot(options['directory'], dim=options['dim'], keep=options['keep'])
+        rows = ', '.join(f"{resource_type}={count}" for resource_type, count in result.rows.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Embedding snapshot {result.version} written to {result.path} ({rows}).")
+        )
@@ -1,19 +1,42 @@
 from django.core.management.base import BaseCommand
 
-from recommender.services.audio_ingest import ingest_training_data
+from recommender.services.audio_ingest import INGEST_SHARD_SIZE, ingest_training_data
+from recommender.tasks import ingest_training_data_parallel
 
 
 class Command(BaseCommand):
     help = 'Ingest audio features from Spotify for every track in the catalog.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--parallel',
+            action='store_true',
+            help='Queue the ingest as shards on the recommender Celery queue instead of running it here.',
+        )
+        parser.add_argument('--shard-size', type=int, default=INGEST_SHARD_SIZE, help='Tracks per shard with --parallel.')
+
     def handle(self, *args, **options):
+        if options['parallel']:
+            # Plan the shards here; only the shard tasks and the merge go to the workers.
+            dispatched = ingest_training_data_parallel.apply(kwargs={'shard_size': options['shard_size']}).get()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Audio-feature ingest queued ("
+                    f"shards={dispatched['shards']}, "
+                    f"tracks={dispatched['tracks']}, "
+                    f"skipped={dispatched['skipped']})."
+                )
+            )
+            return
+
         result = ingest_training_data()
         self.stdout.write(
             self.style.SUCCESS(
                 f"Audio-feature ingest finished ("
                 f"ingested={result.ingested}, "
                 f"skipped={result.skipped}, "
-                f"failed={result.failed})."
+                f"failed={result.failed}, "
+                f"{result.rows_per_second} rows/s)."
             )
         )
         if result.failed_track_ids:
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recommender.services.embedding_sync import CHUNK_SIZE, EMBEDDING_TARGETS, sync_stale_embeddings
+
+
+class Command(BaseCommand):
+    help = 'Embed every artist, album, and track whose embedding is missing or from another model version.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resource-types',
+            nargs='+',
+            choices=sorted(EMBEDDING_TARGETS),
+            help='Limit the sync to these resource types (default: all).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Entities per engine call.')
+        parser.add_argument('--force', action='store_true', help='Re-embed everything, not only stale rows.')
+
+    def handle(self, *args, **options):
+        result = sync_stale_embeddings(
+            options['resource_types'],
+            chunk_size=options['chunk_size'],
+            force=options['force'],
+        )
+        synced = ', '.join(f"{resource_type}={count}" for resource_type, count in result.synced.items())
+        self.stdout.write(
+            self.style.SUCCESS(f"Embedding sync finished ({synced}, requests={result.requests}).")
+        )
@@ -0,0 +1,112 @@
+import math
+import struct
+
+from django.db import migrations, models, transaction
+
+_EMBEDDING_MODELS = ('ArtistEmbedding', 'AlbumEmbedding', 'TrackEmbedding')
+_BATCH_SIZE = 2000
+
+
+def _numeric(values):
+    if not isinstance(values, list):
+        return []
+    try:
+        return [float(value) for value in values]
+    except (TypeError, ValueError):
+        return []
+
+
+def _batches(model, field):
+    """Rows in primary-key order, ``_BATCH_SIZE`` at a time, read by keyset so no cursor outlives a commit."""
+    last_id = 0
+    while True:
+        batch = list(model.objects.filter(id__gt=last_id).order_by('id').only('id', field)[:_BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def pack_json_vectors(apps, schema_editor):
+    for model_name in _EMBEDDING_MODELS:
+        model = apps.get_model('recommender', model_name)
+        for batch in _batches(model, 'vector'):
+            for embedding in batch:
+                values = _numeric(embedding.vector)
+                packed = struct.pack(f'<{len(values)}f', *values)
+                decoded = struct.unpack(f'<{len(values)}f', packed)
+                embedding.vector_data = packed
+                embedding.vector_dim = len(decoded)
+                embedding.vector_norm = math.hypot(*decoded)
+            # One short transaction per batch, so a large table's row locks are not held until the backfill ends.
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ['vector_data', 'vector_dim', 'vector_norm'])
+
+
+def unpack_binary_vectors(apps, schema_editor):
+    for model_name in _EMBEDDING_MODELS:
+        model = apps.get_model('recommender', model_name)
+        for batch in _batches(model, 'vector_data'):
+            for embedding in batch:
+                data = bytes(embedding.vector_data or b'')
+                embedding.vector = list(struct.unpack(f'<{len(data) // 4}f', data))
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ['vector'])
+
+
+class Migration(migrations.Migration):
+    # The backfill commits per batch (see pack_json_vectors), so the schema changes commit on their own too.
+    atomic = False
+
+    dependencies = [
+        ('recommender', '0002_track_audio_features'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artistembedding',
+            name='vector_data',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='artistembedding',
+            name='vector_dim',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='artistembedding',
+            name='vector_norm',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='albumembedding',
+            name='vector_data',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='albumembedding',
+            name='vector_dim',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='albumembedding',
+            name='vector_norm',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='trackembedding',
+            name='vector_data',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='trackembedding',
+            name='vector_dim',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='trackembedding',
+            name='vector_norm',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(pack_json_vectors, unpack_binary_vectors),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0003_embedding_binary_vectors'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='albumembedding',
+            name='vector',
+        ),
+        migrations.RemoveField(
+            model_name='artistembedding',
+            name='vector',
+        ),
+        migrations.RemoveField(
+            model_name='trackembedding',
+            name='vector',
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0004_remove_embedding_json_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemNeighbors',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource_type', models.CharField(
+                    choices=[('artists', 'artists'), ('albums', 'albums'), ('tracks', 'tracks')], max_length=16,
+                )),
+                ('item_id', models.BigIntegerField()),
+                ('neighbor_ids', models.BinaryField(default=b'')),
+                ('scores', models.BinaryField(default=b'')),
+                ('model_version', models.CharField(max_length=32)),
+                ('source_modified_at', models.DateTimeField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('resource_type', 'item_id')},
+            },
+        ),
+    ]
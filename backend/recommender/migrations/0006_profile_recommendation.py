@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('juke_auth', '0007_musicprofile_onboarding_completed_at'),
+        ('recommender', '0005_item_neighbors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('results', models.JSONField(default=dict)),
+                ('seed_digest', models.CharField(max_length=64)),
+                ('model_version', models.CharField(max_length=32)),
+                ('generated_at', models.DateTimeField()),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('profile', models.OneToOneField(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='recommendations',
+                    to='juke_auth.musicprofile',
+                )),
+            ],
+        ),
+    ]
@@ -1,21 +1,53 @@
 from __future__ import annotations
 
+import math
+import struct
+from typing import Iterable, List
+
 from django.db import models
 
 from catalog.models import Artist, Album, Track
+from juke_auth.models import MusicProfile
+
+
+def pack_vector(values: Iterable[float]) -> bytes:
+    """Encode a vector as packed little-endian float32, the layout the engine reads with np.frombuffer."""
+    values = list(values)
+    return struct.pack(f'<{len(values)}f', *values)
+
+
+def unpack_vector(data: bytes | memoryview | None) -> List[float]:
+    data = bytes(data or b'')
+    return list(struct.unpack(f'<{len(data) // 4}f', data))
 
 
 class EmbeddingBase(models.Model):
-    vector = models.JSONField(default=list)
+    # Packed little-endian float32; vector_dim and vector_norm are stored alongside so
+    # readers can filter and normalize without decoding every row.
+    vector_data = models.BinaryField(default=b'')
+    vector_dim = models.PositiveSmallIntegerField(default=0)
+    vector_norm = models.FloatField(default=0.0)
     model_version = models.CharField(max_length=32)
     quality_score = models.FloatField(default=0.0)
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    modified_at = models.DateTimeField(auto_now=True)
+    # Indexed for the engine's incremental refresh, which polls for rows changed since a watermark.
+    modified_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         abstract = True
 
+    @property
+    def vector(self) -> List[float]:
+        return unpack_vector(self.vector_data)
+
+    @vector.setter
+    def vector(self, values: Iterable[float] | None) -> None:
+        self.vector_data = pack_vector(values or [])
+        decoded = unpack_vector(self.vector_data)
+        self.vector_dim = len(decoded)
+        self.vector_norm = math.hypot(*decoded)
+
     def as_payload(self) -> dict:
         return {
             'vector': self.vector,
@@ -46,6 +78,53 @@ class TrackEmbedding(EmbeddingBase):
         return f"Embedding(track={self.track.name})"
 
 
+class ItemNeighbors(models.Model):
+    """Precomputed nearest neighbours of one catalog item, read back with a single-row lookup.
+
+    ``neighbor_ids`` holds catalog ids as packed little-endian int64 and ``scores`` the
+    matching cosine similarities as packed float32, best first.
+    """
+
+    RESOURCE_TYPES = [('artists', 'artists'), ('albums', 'albums'), ('tracks', 'tracks')]
+
+    resource_type = models.CharField(max_length=16, choices=RESOURCE_TYPES)
+    item_id = models.BigIntegerField()
+    neighbor_ids = models.BinaryField(default=b'')
+    scores = models.BinaryField(default=b'')
+    model_version = models.CharField(max_length=32)
+    # The item's embedding modified_at when these neighbours were computed; newer embeddings are recomputed.
+    source_modified_at = models.DateTimeField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('resource_type', 'item_id')
+
+    def __str__(self) -> str:
+        return f"Neighbors({self.resource_type}={self.item_id})"
+
+    def neighbors(self, limit: int | None = None) -> List[tuple[int, float]]:
+        ids = struct.unpack(f'<{len(self.neighbor_ids) // 8}q', bytes(self.neighbor_ids))
+        scores = unpack_vector(self.scores)
+        return list(zip(ids, scores))[:limit]
+
+
+class ProfileRecommendation(models.Model):
+    """Ranked engine results for one music profile, refreshed nightly and whenever its favourites change."""
+
+    profile = models.OneToOneField(MusicProfile, related_name='recommendations', on_delete=models.CASCADE)
+    # {'artists': [...], 'albums': [...], 'tracks': [...]} exactly as the engine ranked them.
+    results = models.JSONField(default=dict)
+    # Digest of the seed payload the results were computed from; a profile save only triggers a
+    # recompute when its favourites no longer match.
+    seed_digest = models.CharField(max_length=64)
+    model_version = models.CharField(max_length=32)
+    generated_at = models.DateTimeField()
+    modified_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Recommendations(profile={self.profile_id})"
+
+
 class TrackAudioFeatures(models.Model):
     track = models.OneToOneField(Track, related_name='audio_features', on_delete=models.CASCADE)
     energy = models.FloatField()
@@ -32,3 +32,18 @@ class RecommendationResponseSerializer(serializers.Serializer):
     tracks = RecommendationResultSerializer(many=True, required=False)
     model_version = serializers.CharField()
     generated_at = serializers.DateTimeField()
+
+
+class NeighborSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    spotify_id = serializers.CharField(allow_null=True, allow_blank=True)
+    likeness = serializers.FloatField()
+
+
+class ItemNeighborsResponseSerializer(serializers.Serializer):
+    resource_type = serializers.CharField()
+    item_id = serializers.IntegerField()
+    neighbors = NeighborSerializer(many=True)
+    model_version = serializers.CharField()
+    computed_at = serializers.DateTimeField()
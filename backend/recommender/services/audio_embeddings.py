@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from catalog.models import Album
+from recommender.models import TrackAudioFeatures
+from recommender.services.audio_ingest import is_major
+from recommender.services.embedding_snapshot import SNAPSHOT_KEEP, SNAPSHOT_SOURCES, VECTOR_DIM, publish_version, write_type
+
+logger = logging.getLogger(__name__)
+
+AUDIO_MODEL_VERSION = getattr(settings, 'RECOMMENDER_AUDIO_MODEL_VERSION', 'audio-v1')
+AUDIO_EMBEDDING_DIR = getattr(settings, 'RECOMMENDER_AUDIO_EMBEDDING_DIR', '')
+# Standardized to zero mean and unit variance across the catalog.
+CONTINUOUS_FIELDS = (
+    'energy',
+    'valence',
+    'tempo',
+    'danceability',
+    'acousticness',
+    'instrumentalness',
+    'liveness',
+    'speechiness',
+    'loudness',
+)
+# Spotify reports key -1 when none was detected and time signatures 3-7; anything else encodes as all zeros.
+KEYS = 12
+TIME_SIGNATURES = (3, 4, 5, 6, 7)
+FEATURE_DIM = len(CONTINUOUS_FIELDS) + KEYS + 1 + len(TIME_SIGNATURES)
+_CHUNK_SIZE = 10000
+
+
+@dataclass
+class AudioEmbeddingResult:
+    version: str = ''
+    path: str = ''
+    built: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+@dataclass
+class _Corpus:
+    track_ids: np.ndarray
+    album_ids: np.ndarray
+    durations: np.ndarray
+    continuous: np.ndarray
+    keys: np.ndarray
+    major: np.ndarray
+    time_signatures: np.ndarray
+
+
+def _load_corpus() -> _Corpus:
+    queryset = (
+        TrackAudioFeatures.objects.order_by('track__album_id', 'track_id')
+        .values_list('track_id', 'track__album_id', 'track__duration_ms', *CONTINUOUS_FIELDS, 'key', 'mode', 'time_signature')
+    )
+    columns: List[List[np.ndarray]] = [[] for _ in range(7)]
+    chunk: List[tuple] = []
+
+    def flush() -> None:
+        values = list(zip(*chunk))
+        continuous_end = 3 + len(CONTINUOUS_FIELDS)
+        columns[0].append(np.asarray(values[0], dtype=np.int64))
+        columns[1].append(np.asarray(values[1], dtype=np.int64))
+        columns[2].append(np.asarray(values[2], dtype=np.float64))
+        columns[3].append(np.asarray(values[3:continuous_end], dtype=np.float64).T)
+        columns[4].append(np.asarray(values[continuous_end], dtype=np.int64))
+        columns[5].append(np.fromiter(map(is_major, values[continuous_end + 1]), dtype=bool, count=len(chunk)))
+        columns[6].append(np.asarray(values[continuous_end + 2], dtype=np.int64))
+        chunk.clear()
+
+    for row in queryset.iterator(chunk_size=_CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) >= _CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+    if not columns[0]:
+        empty = np.zeros(0, dtype=np.int64)
+        return _Corpus(empty, empty, np.zeros(0), np.zeros((0, len(CONTINUOUS_FIELDS))), empty, np.zeros(0, dtype=bool), empty)
+    return _Corpus(*(np.concatenate(blocks) for blocks in columns))
+
+
+def encode_features(corpus: _Corpus) -> np.ndarray:
+    """One (N, FEATURE_DIM) row per track: standardized continuous columns, then one-hot key, mode, one-hot time signature."""
+    rows = corpus.track_ids.size
+    features = np.zeros((rows, FEATURE_DIM), dtype=np.float32)
+    width = len(CONTINUOUS_FIELDS)
+    std = corpus.continuous.std(axis=0)
+    features[:, :width] = (corpus.continuous - corpus.continuous.mean(axis=0)) / np.where(std > 0, std, 1.0)
+
+    keyed = np.flatnonzero((corpus.keys >= 0) & (corpus.keys < KEYS))
+    features[keyed, width + corpus.keys[keyed]] = 1.0
+    features[:, width + KEYS] = corpus.major
+
+    signature_column = np.searchsorted(TIME_SIGNATURES, corpus.time_signatures)
+    known = np.flatnonzero(np.isin(corpus.time_signatures, TIME_SIGNATURES))
+    features[known, width + KEYS + 1 + signature_column[known]] = 1.0
+    return features
+
+
+def project(features: np.ndarray, dim: int) -> np.ndarray:
+    """Fit ``features`` into ``dim`` columns: zero-padded when they fit, otherwise their top ``dim`` principal components."""
+    if features.shape[1] <= dim:
+        projected = np.zeros((features.shape[0], dim), dtype=np.float32)
+        projected[:, :features.shape[1]] = features
+        return projected
+    centered = features - features.mean(axis=0)
+    _, eigenvectors = np.linalg.eigh(centered.T @ centered)
+    return (centered @ eigenvectors[:, ::-1][:, :dim]).astype(np.float32)
+
+
+def segment_means(keys: np.ndarray, vectors: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Weighted mean of ``vectors`` per distinct key: ``(unique_keys, means, rows_per_key)``."""
+    if not keys.size:
+        return keys, np.zeros((0, vectors.shape[1]), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    keys, vectors, weights = keys[order], vectors[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    sums = np.add.reduceat(vectors * weights[:, None], starts, axis=0)
+    totals = np.add.reduceat(weights, starts)
+    counts = np.diff(np.r_[starts, keys.size])
+    return keys[starts], (sums / totals[:, None]).astype(np.float32), counts
+
+
+def _album_artist_pairs(album_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(album row, artist id) index arrays for every credited artist of the given sorted albums."""
+    pairs = np.asarray(list(Album.artists.through.objects.values_list('album_id', 'artist_id')), dtype=np.int64).reshape(-1, 2)
+    rows = np.searchsorted(album_ids, pairs[:, 0])
+    present = np.flatnonzero(rows < album_ids.size)
+    present = present[album_ids[rows[present]] == pairs[present, 0]]
+    return rows[present], pairs[present, 1]
+
+
+def _catalog_rows(resource_type: str, item_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+    model, fk = SNAPSHOT_SOURCES[resource_type]
+    wanted = set(item_ids)
+    queryset = model._meta.get_field(fk).related_model.objects.order_by('pk').values_list('pk', 'name', 'spotify_id')
+    return {pk: (name, spotify_id) for pk, name, spotify_id in queryset.iterator(chunk_size=_CHUNK_SIZE) if pk in wanted}
+
+
+def _stage(staging: Path, resource_type: str, item_ids: np.ndarray, vectors: np.ndarray, counts: np.ndarray | None) -> int:
+    norms = np.linalg.norm(vectors, axis=1)
+    valid = np.flatnonzero((norms > 0) & np.isfinite(norms))
+    item_ids = item_ids[valid].tolist()
+    counts = counts[valid].tolist() if counts is not None else None
+    catalog = _catalog_rows(resource_type, item_ids)
+    columns: Dict[str, List[Any]] = {
+        'item_ids': item_ids,
+        'names': [catalog[item_id][0] for item_id in item_ids],
+        'spotify_ids': [catalog[item_id][1] for item_id in item_ids],
+        'model_versions': [AUDIO_MODEL_VERSION] * len(item_ids),
+        'quality_scores': [1.0] * len(item_ids),
+        'metadata': [
+            {'source': 'audio_features', **({'tracks': counts[row]} if counts is not None else {})} for row in range(len(item_ids))
+        ],
+    }
+    return write_type(staging, resource_type, vectors[valid] / norms[valid, None], columns, None)
+
+
+def build_audio_embeddings(
+    resource_types: Sequence[str] | None = None,
+    *,
+    dim: int = VECTOR_DIM,
+    directory: str | Path | None = None,
+    keep: int = SNAPSHOT_KEEP,
+) -> AudioEmbeddingResult:
+    """Embed the catalog from ``TrackAudioFeatures`` without calling the engine.
+
+    Every feature row is streamed once into column arrays and encoded in one
+    vectorized pass. Album vectors are the duration-weighted mean of their tracks and
+    artist vectors the mean of their albums, both as segment means over sorted index
+    arrays. Only items with at least one featured track are written.
+
+    The vectors live in a different space from the engine's, so they are published as
+    a snapshot version under ``directory`` (same layout as ``export_snapshot``) and
+    never written to the embedding tables the recommendation requests are scored against.
+    """
+    directory = directory or AUDIO_EMBEDDING_DIR
+    if not directory:
+        raise ValueError('RECOMMENDER_AUDIO_EMBEDDING_DIR is not configured')
+    started = time.monotonic()
+    resource_types = list(resource_types or SNAPSHOT_SOURCES)
+    corpus = _load_corpus()
+    track_vectors = project(encode_features(corpus), dim)
+    album_ids, album_vectors, album_tracks = segment_means(
+        corpus.album_ids, track_vectors, np.maximum(corpus.durations, 1.0),
+    )
+
+    def write(staging: Path) -> Dict[str, int]:
+        built = {}
+        if 'tracks' in resource_types:
+            built['tracks'] = _stage(staging, 'tracks', corpus.track_ids, track_vectors, None)
+        if 'albums' in resource_types:
+            built['albums'] = _stage(staging, 'albums', album_ids, album_vectors, album_tracks)
+        if 'artists' in resource_types:
+            album_rows, artist_keys = _album_artist_pairs(album_ids)
+            artist_ids, artist_vectors, _ = segment_means(artist_keys, album_vectors[album_rows], np.ones(album_rows.size))
+            artist_tracks = np.bincount(
+                np.searchsorted(artist_ids, artist_keys), weights=album_tracks[album_rows], minlength=artist_ids.size,
+            )
+            built['artists'] = _stage(staging, 'artists', artist_ids, artist_vectors, artist_tracks.astype(np.int64))
+        return built
+
+    snapshot = publish_version(directory, keep, write)
+    result = AudioEmbeddingResult(version=snapshot.version, path=snapshot.path, built=snapshot.rows)
+    result.seconds = round(time.monotonic() - started, 3)
+    logger.info('audio embeddings %s built: %s in %.3fs', result.version, result.built, result.seconds)
+    return result
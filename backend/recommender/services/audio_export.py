@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from datetime import timedelta, timezone as dt_timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from recommender.models import TrackAudioFeatures
+from recommender.services.audio_ingest import is_major
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = getattr(settings, 'RECOMMENDER_AUDIO_EXPORT_DIR', '')
+CHUNK_ROWS = int(getattr(settings, 'RECOMMENDER_AUDIO_EXPORT_CHUNK_ROWS', 100000))
+# modified_at is stamped before commit, so a row can become visible after later-stamped rows were
+# exported. Incremental runs re-read this far behind the watermark to pick such rows up.
+OVERLAP_SECONDS = float(getattr(settings, 'RECOMMENDER_AUDIO_EXPORT_OVERLAP_SECONDS', 30))
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+# One .npy per column and chunk. Narrow dtypes keep the files small while leaving them
+# uncompressed, so readers can memory-map them; mode is 1 for major and 0 for minor.
+COLUMNS = {
+    'track_ids': '<i8',
+    'spotify_ids': 'S',
+    'modified_at': '<M8[us]',
+    'energy': '<f4',
+    'valence': '<f4',
+    'tempo': '<f4',
+    'danceability': '<f4',
+    'acousticness': '<f4',
+    'instrumentalness': '<f4',
+    'liveness': '<f4',
+    'speechiness': '<f4',
+    'loudness': '<f4',
+    'key': 'i1',
+    'mode': 'i1',
+    'time_signature': 'i1',
+}
+# The trailing pk identifies rows already exported inside the overlap window; it is not exported.
+_QUERY_FIELDS = ['track_id', 'track__spotify_id', 'modified_at', *list(COLUMNS)[3:], 'pk']
+_STREAM_CHUNK = 10000
+
+
+@dataclass
+class AudioExportResult:
+    path: str
+    rows: int = 0
+    chunks: List[str] = field(default_factory=list)
+    watermark: str | None = None
+    full: bool = False
+
+
+def read_manifest(directory: str | os.PathLike) -> Dict[str, Any] | None:
+    try:
+        return json.loads((Path(directory) / MANIFEST_FILE).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def _columns(rows: List[tuple]) -> Dict[str, np.ndarray]:
+    values = list(zip(*rows))
+    arrays = {
+        'track_ids': np.asarray(values[0], dtype='<i8'),
+        'spotify_ids': np.asarray([spotify_id.encode('ascii') for spotify_id in values[1]], dtype='S'),
+        # Naive UTC, which is what datetime64 holds.
+        'modified_at': np.asarray([value.astimezone(dt_timezone.utc).replace(tzinfo=None) for value in values[2]], dtype='<M8[us]'),
+    }
+    for position, name in enumerate(list(COLUMNS)[3:], start=3):
+        column = values[position]
+        if name == 'mode':
+            column = [is_major(value) for value in column]
+        arrays[name] = np.asarray(column, dtype=COLUMNS[name])
+    return arrays
+
+
+def _write_chunk(directory: Path, name: str, rows: List[tuple]) -> Dict[str, Any]:
+    staging = Path(tempfile.mkdtemp(prefix='.staging-', dir=directory))
+    try:
+        for column, array in _columns(rows).items():
+            np.save(staging / f'{column}.npy', array)
+        # mkdtemp creates the directory owner-only; the engine may read it as another user.
+        staging.chmod(0o755)
+        os.rename(staging, directory / name)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return {'name': name, 'rows': len(rows)}
+
+
+def _publish(directory: Path, manifest: Dict[str, Any]) -> None:
+    staging = directory / f'.{MANIFEST_FILE}.{os.getpid()}'
+    staging.write_text(json.dumps(manifest, indent=2))
+    os.replace(staging, directory / MANIFEST_FILE)
+
+
+def _discard_orphans(directory: Path, manifest: Dict[str, Any] | None) -> None:
+    """Remove staging leftovers and chunks no manifest references, e.g. from a run that died mid-export.
+
+    Their names would otherwise collide with the chunks this run is about to write.
+    """
+    live = {chunk['name'] for chunk in (manifest or {}).get('chunks', [])}
+    for entry in directory.iterdir():
+        if entry.name.startswith(('.staging-', f'.{MANIFEST_FILE}.')) or (entry.name.startswith('chunk-') and entry.name not in live):
+            logger.warning('removing orphaned audio export entry %s', entry)
+            if entry.is_dir():
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entry.unlink(missing_ok=True)
+
+
+def export_audio_features(
+    directory: str | os.PathLike | None = None,
+    *,
+    full: bool = False,
+    chunk_rows: int = CHUNK_ROWS,
+    overlap_seconds: float = OVERLAP_SECONDS,
+) -> AudioExportResult:
+    """Append ``TrackAudioFeatures`` rows changed since the last export as new columnar chunks.
+
+    Layout under ``directory``::
+
+        manifest.json                # chunk list, row counts, dtypes, the modified_at watermark and overlap tail
+        chunk-<n>/<column>.npy       # one array per column, at most ``chunk_rows`` rows
+
+    Rows are streamed with a server-side cursor ordered by ``modified_at``. An
+    incremental run re-reads ``overlap_seconds`` behind the newest exported
+    ``modified_at`` and skips the rows the manifest's ``tail`` says were already
+    exported at that timestamp, so rows committed out of order are still picked up.
+    A re-ingested track appears again in a later chunk and readers keep its last occurrence.
+    Chunks are immutable and the manifest is swapped in with ``os.replace``; ``full``
+    re-exports everything and then removes the chunks it replaced. Chunks left behind
+    by an interrupted run are never in the manifest and are cleared before exporting.
+    """
+    directory = directory or EXPORT_DIR
+    if not directory:
+        raise ValueError('RECOMMENDER_AUDIO_EXPORT_DIR is not configured')
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = read_manifest(directory)
+    _discard_orphans(directory, previous)
+    if previous is not None and previous.get('format') != FORMAT_VERSION:
+        full = True
+    full = full or previous is None
+    manifest = {
+        'format': FORMAT_VERSION,
+        'columns': COLUMNS,
+        'chunks': [] if full else previous['chunks'],
+        'next_chunk': (previous or {}).get('next_chunk', 0),
+        'watermark': None if full else previous['watermark'],
+        # {pk: modified_at} of exported rows inside the overlap window behind the watermark.
+        'tail': {} if full else previous.get('tail', {}),
+    }
+
+    queryset = TrackAudioFeatures.objects.order_by('modified_at', 'pk')
+    if manifest['watermark']:
+        queryset = queryset.filter(modified_at__gte=parse_datetime(manifest['watermark']) - timedelta(seconds=overlap_seconds))
+    result = AudioExportResult(path=str(directory), full=full)
+    batch: List[tuple] = []
+
+    def flush() -> None:
+        name = f"chunk-{manifest['next_chunk']:06d}"
+        manifest['chunks'].append(_write_chunk(directory, name, batch))
+        manifest['next_chunk'] += 1
+        result.rows += len(batch)
+        result.chunks.append(name)
+        batch.clear()
+
+    tail = manifest['tail']
+    newest = parse_datetime(manifest['watermark']) if manifest['watermark'] else None
+    for row in queryset.values_list(*_QUERY_FIELDS).iterator(chunk_size=_STREAM_CHUNK):
+        modified_at = row[2].isoformat()
+        if tail.get(str(row[-1])) == modified_at:
+            continue
+        batch.append(row)
+        tail[str(row[-1])] = modified_at
+        if newest is None or row[2] > newest:
+            newest = row[2]
+        if len(batch) >= chunk_rows:
+            flush()
+    if batch:
+        flush()
+    if newest is not None:
+        manifest['watermark'] = newest.isoformat()
+        horizon = newest - timedelta(seconds=overlap_seconds)
+        manifest['tail'] = {pk: stamp for pk, stamp in tail.items() if parse_datetime(stamp) >= horizon}
+
+    manifest['rows'] = sum(chunk['rows'] for chunk in manifest['chunks'])
+    manifest['exported_at'] = timezone.now().isoformat()
+    if result.chunks or full:
+        _publish(directory, manifest)
+    if full and previous is not None:
+        live = {chunk['name'] for chunk in manifest['chunks']}
+        for chunk in previous['chunks']:
+            if chunk['name'] not in live:
+                shutil.rmtree(directory / chunk['name'], ignore_errors=True)
+    result.watermark = manifest['watermark']
+    logger.info('audio features exported to %s: rows=%d chunks=%d full=%s', directory, result.rows, len(result.chunks), full)
+    return result
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import logging
+import time
 from dataclasses import dataclass, field
-from typing import Sequence
+from itertools import islice
+from typing import Iterable, Iterator, Sequence
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet, Subquery
 
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
@@ -12,11 +16,14 @@ from spotipy.oauth2 import SpotifyClientCredentials
 from catalog import spotify_stub
 from catalog.models import Artist, Track
 from recommender.models import TrackAudioFeatures
+from recommender.services.rate_limit import spotify_limiter
 
 logger = logging.getLogger(__name__)
 
 # Spotify audio_features endpoint accepts up to 50 IDs per call.
 _BATCH_SIZE = 50
+# Tracks per task when ingestion is fanned out across Celery workers.
+INGEST_SHARD_SIZE = int(getattr(settings, 'RECOMMENDER_INGEST_SHARD_SIZE', 1000))
 
 # Field names on TrackAudioFeatures that map directly from the Spotify payload.
 _AUDIO_FIELDS = (
@@ -33,6 +40,10 @@ _AUDIO_FIELDS = (
     'loudness',
     'time_signature',
 )
+# Columns rewritten when a track's features are ingested again.
+_UPDATE_FIELDS = [*_AUDIO_FIELDS, 'modified_at']
+# TrackAudioFeatures.mode is text: Spotify's numeric mode lands as '1'/'0', the stub's as 'major'/'minor'.
+MAJOR_MODES = ('1', 'major')
 
 
 @dataclass
@@ -41,11 +52,18 @@ class IngestResult:
     skipped: int = 0
     failed: int = 0
     failed_track_ids: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+    rows_per_second: float = 0.0
 
 
 _spotify_client: spotipy.Spotify | None = None
 
 
+def is_major(mode: object) -> bool:
+    """Whether a stored ``mode`` value means major, in either the numeric or the named form."""
+    return str(mode).strip().lower() in MAJOR_MODES
+
+
 def _get_spotify_client() -> spotipy.Spotify:
     global _spotify_client
     if _spotify_client is None:
@@ -57,12 +75,80 @@ def _fetch_audio_features(track_ids: Sequence[str]) -> list[dict]:
     """Call Spotify (or stub) for a batch of track IDs."""
     if getattr(settings, 'SPOTIFY_USE_STUB_DATA', False):
         return spotify_stub.audio_features(list(track_ids))
+    # Shared across ingest workers so parallel shards stay under the Spotify quota together.
+    spotify_limiter().acquire()
     return _get_spotify_client().audio_features(list(track_ids)) or []
 
 
-def _upsert_audio_features(track: Track, payload: dict) -> None:
-    defaults = {f: payload[f] for f in _AUDIO_FIELDS}
-    TrackAudioFeatures.objects.update_or_create(track=track, defaults=defaults)
+def _audio_features_row(track: Track, payload: dict) -> TrackAudioFeatures:
+    return TrackAudioFeatures(track=track, **{f: payload[f] for f in _AUDIO_FIELDS})
+
+
+def _bulk_upsert(rows: list[TrackAudioFeatures]) -> list[TrackAudioFeatures]:
+    """Write ``rows`` with one upserting INSERT and return the rows that could not be written.
+
+    When the statement fails the batch is split in half and each half retried,
+    so a bad row costs O(log n) extra statements and never takes its
+    neighbours down with it.
+    """
+    if not rows:
+        return []
+    try:
+        # A savepoint, so a failed statement does not poison an enclosing transaction.
+        with transaction.atomic():
+            TrackAudioFeatures.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['track'],
+                update_fields=_UPDATE_FIELDS,
+            )
+        return []
+    except Exception:
+        if len(rows) == 1:
+            logger.exception(
+                'ingest: upsert failed for track %s (%s)',
+                rows[0].track.name, rows[0].track.spotify_id,
+            )
+            return rows
+    middle = len(rows) // 2
+    return _bulk_upsert(rows[:middle]) + _bulk_upsert(rows[middle:])
+
+
+def _crawl_order() -> QuerySet[Track]:
+    """Tracks in deterministic DFS order, with the album's first artist standing in for the artist loop.
+
+    An album credited to several artists is visited under the first one by
+    (name, spotify_id), so each track appears once. Tracks on albums with no
+    artist are outside the crawl, as before.
+    """
+    first_artist = Artist.objects.filter(albums=OuterRef('album_id')).order_by('name', 'spotify_id')
+    return (
+        Track.objects.annotate(
+            artist_name=Subquery(first_artist.values('name')[:1]),
+            artist_spotify_id=Subquery(first_artist.values('spotify_id')[:1]),
+        )
+        .filter(artist_name__isnull=False)
+        .order_by('artist_name', 'artist_spotify_id', 'album__name', 'album_id', 'track_number', 'pk')
+    )
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _has_features() -> Exists:
+    return Exists(TrackAudioFeatures.objects.filter(track=OuterRef('pk')))
+
+
+def pending_tracks() -> QuerySet[Track]:
+    """Tracks without audio features, in crawl order."""
+    return _crawl_order().filter(~_has_features())
+
+
+def ingested_tracks() -> QuerySet[Track]:
+    return _crawl_order().filter(_has_features())
 
 
 def ingest_training_data() -> IngestResult:
@@ -71,80 +157,85 @@ def ingest_training_data() -> IngestResult:
     Order: artists sorted by (name, spotify_id), then for each artist all albums
     sorted by name, then tracks within each album sorted by track_number.
 
-    Tracks that already have a TrackAudioFeatures row are skipped, giving free
-    resume semantics on restart without a cursor table.
+    Tracks that already have a TrackAudioFeatures row are excluded by one
+    anti-join, giving free resume semantics on restart without a cursor table.
+    The remaining tracks are streamed in crawl order and sent to Spotify
+    _BATCH_SIZE at a time regardless of album boundaries.
     """
-    result = IngestResult()
-
-    artists = Artist.objects.order_by('name', 'spotify_id')
-
-    for artist in artists:
-        logger.info('ingest: artist started — %s', artist.name)
-
-        albums = artist.albums.order_by('name')
-        for album in albums:
-            logger.info('ingest: album started — %s / %s', artist.name, album.name)
-
-            tracks = list(album.tracks.order_by('track_number'))
-
-            # Partition into tracks that need ingestion vs those already done.
-            pending: list[Track] = []
-            for track in tracks:
-                if TrackAudioFeatures.objects.filter(track=track).exists():
-                    result.skipped += 1
-                else:
-                    pending.append(track)
-
-            # Process pending tracks in batches of _BATCH_SIZE.
-            for batch_start in range(0, len(pending), _BATCH_SIZE):
-                batch = pending[batch_start:batch_start + _BATCH_SIZE]
-                batch_ids = [t.spotify_id for t in batch]
-                id_to_track = {t.spotify_id: t for t in batch}
-
-                try:
-                    features_list = _fetch_audio_features(batch_ids)
-                except Exception:
-                    failed_names = [
-                        f"{id_to_track[sid].name} ({sid})" for sid in batch_ids
-                    ]
-                    logger.exception(
-                        'ingest: batch fetch failed for album %s / %s: [%s]',
-                        artist.name, album.name, ', '.join(failed_names),
-                    )
-                    result.failed += len(batch)
-                    result.failed_track_ids.extend(batch_ids)
-                    continue
-
-                # Index the response by track ID so we can match back.
-                features_by_id = {item['id']: item for item in features_list if item}
-
-                for track in batch:
-                    payload = features_by_id.get(track.spotify_id)
-                    if payload is None:
-                        logger.warning(
-                            'ingest: no features returned for track %s (%s)',
-                            track.name, track.spotify_id,
-                        )
-                        result.failed += 1
-                        result.failed_track_ids.append(track.spotify_id)
-                        continue
-
-                    try:
-                        _upsert_audio_features(track, payload)
-                        result.ingested += 1
-                    except Exception:
-                        logger.exception(
-                            'ingest: upsert failed for track %s (%s)',
-                            track.name, track.spotify_id,
-                        )
-                        result.failed += 1
-                        result.failed_track_ids.append(track.spotify_id)
-
-            logger.info(
-                'ingest: album completed — %s / %s (%d tracks)',
-                artist.name, album.name, len(tracks),
-            )
+    result = IngestResult(skipped=ingested_tracks().count())
+    return _ingest(pending_tracks(), result)
 
-        logger.info('ingest: artist completed — %s', artist.name)
 
+def ingest_tracks(track_ids: Sequence[int]) -> IngestResult:
+    """Ingest one shard of track primary keys, skipping any that gained features since it was planned."""
+    return _ingest(pending_tracks().filter(pk__in=track_ids), IngestResult())
+
+
+def merge_results(results: Iterable[IngestResult]) -> IngestResult:
+    """Sum shard results; ``seconds`` is the longest shard and the caller sets the overall rate."""
+    merged = IngestResult()
+    for result in results:
+        merged.ingested += result.ingested
+        merged.skipped += result.skipped
+        merged.failed += result.failed
+        merged.failed_track_ids.extend(result.failed_track_ids)
+        merged.seconds = max(merged.seconds, result.seconds)
+    return merged
+
+
+def _ingest(pending: QuerySet[Track], result: IngestResult) -> IngestResult:
+    started = time.monotonic()
+    pending = pending.only('pk', 'name', 'spotify_id')
+
+    for batch_number, batch in enumerate(_chunks(pending.iterator(chunk_size=_BATCH_SIZE * 20), _BATCH_SIZE), start=1):
+        batch_ids = [t.spotify_id for t in batch]
+
+        try:
+            features_list = _fetch_audio_features(batch_ids)
+        except Exception:
+            failed_names = [f"{t.name} ({t.spotify_id})" for t in batch]
+            logger.exception(
+                'ingest: batch %d fetch failed: [%s]', batch_number, ', '.join(failed_names),
+            )
+            result.failed += len(batch)
+            result.failed_track_ids.extend(batch_ids)
+            continue
+
+        # Index the response by track ID so we can match back.
+        features_by_id = {item['id']: item for item in features_list if item}
+
+        rows: list[TrackAudioFeatures] = []
+        for track in batch:
+            payload = features_by_id.get(track.spotify_id)
+            if payload is None:
+                logger.warning(
+                    'ingest: no features returned for track %s (%s)',
+                    track.name, track.spotify_id,
+                )
+                result.failed += 1
+                result.failed_track_ids.append(track.spotify_id)
+                continue
+
+            try:
+                rows.append(_audio_features_row(track, payload))
+            except KeyError:
+                logger.exception(
+                    'ingest: incomplete features for track %s (%s)',
+                    track.name, track.spotify_id,
+                )
+                result.failed += 1
+                result.failed_track_ids.append(track.spotify_id)
+
+        failed_rows = _bulk_upsert(rows)
+        result.ingested += len(rows) - len(failed_rows)
+        result.failed += len(failed_rows)
+        result.failed_track_ids.extend(row.track.spotify_id for row in failed_rows)
+
+        logger.info(
+            'ingest: batch %d completed — %d tracks (ingested=%d, failed=%d so far)',
+            batch_number, len(batch), result.ingested, result.failed,
+        )
+
+    result.seconds = round(time.monotonic() - started, 3)
+    result.rows_per_second = round(result.ingested / result.seconds, 1) if result.seconds else 0.0
     return result
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+import json
 import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Any, Dict, List
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
@@ -12,16 +20,257 @@ ENGINE_BASE_URL = getattr(settings, 'RECOMMENDER_ENGINE_BASE_URL', None)
 if not ENGINE_BASE_URL:
     raise ValueError("RECOMMENDER_ENGINE_BASE_URL must be set")
 DEFAULT_TIMEOUT = int(getattr(settings, 'RECOMMENDER_ENGINE_TIMEOUT', 15))
+# Profiles per /recommend/batch call; must stay within the engine's RECOMMENDER_BATCH_MAX_REQUESTS.
+BATCH_SIZE = int(getattr(settings, 'RECOMMENDER_ENGINE_BATCH_SIZE', 500))
+# Keep-alive connections held open to the engine per process.
+POOL_SIZE = int(getattr(settings, 'RECOMMENDER_ENGINE_POOL_SIZE', 10))
+# Extra attempts after connection errors, timeouts, and 502/503/504. Every engine endpoint is a
+# side-effect-free scoring or embedding call, so all of them are safe to resend.
+RETRIES = int(getattr(settings, 'RECOMMENDER_ENGINE_RETRIES', 2))
+RETRY_BACKOFF = float(getattr(settings, 'RECOMMENDER_ENGINE_RETRY_BACKOFF', 0.1))
+# Consecutive failures that open the circuit, and how long it stays open before one trial call.
+BREAKER_THRESHOLD = int(getattr(settings, 'RECOMMENDER_ENGINE_BREAKER_THRESHOLD', 5))
+BREAKER_RESET_SECONDS = float(getattr(settings, 'RECOMMENDER_ENGINE_BREAKER_RESET_SECONDS', 30))
+# Send a second copy of a call if the first has not answered this long after it started (0 disables).
+HEDGE_AFTER_SECONDS = float(getattr(settings, 'RECOMMENDER_ENGINE_HEDGE_AFTER_MS', 0)) / 1000
+# Hedges in flight at once per process; past this a slow call just waits for its first copy.
+HEDGE_POOL_SIZE = int(getattr(settings, 'RECOMMENDER_ENGINE_HEDGE_POOL_SIZE', 2))
+# Seconds between the "engine call stats" log lines each process writes (0 disables them).
+STATS_LOG_SECONDS = float(getattr(settings, 'RECOMMENDER_ENGINE_STATS_LOG_SECONDS', 300))
 
+_RETRY_STATUSES = {502, 503, 504}
 
-def _request(path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+
+class EngineUnavailable(requests.ConnectionError):
+    """Raised without contacting the engine while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; after ``reset_seconds`` lets one trial call through."""
+
+    def __init__(self, threshold: int, reset_seconds: float, *, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            return 'half-open' if self._clock() - self._opened_at >= self.reset_seconds else 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._clock() - self._opened_at < self.reset_seconds or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or (self.threshold and self._failures >= self.threshold):
+                self._opened_at = self._clock()
+
+
+class CallStats:
+    """Per-endpoint outcome counters and latency totals for engine calls, kept per process."""
+
+    def __init__(self, *, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._logged_at = clock()
+        self.outcomes: Counter = Counter()
+        self.latency_seconds: Counter = Counter()
+        self.calls: Counter = Counter()
+
+    def record(self, path: str, outcome: str, seconds: float | None = None) -> None:
+        with self._lock:
+            self.outcomes[(path, outcome)] += 1
+            if seconds is not None:
+                self.calls[path] += 1
+                self.latency_seconds[path] += seconds
+
+    def due(self, interval: float) -> bool:
+        """True at most once per ``interval`` seconds, for the caller that should log the counters."""
+        with self._lock:
+            if interval <= 0 or self._clock() - self._logged_at < interval:
+                return False
+            self._logged_at = self._clock()
+            return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                path: {
+                    'outcomes': {outcome: count for (name, outcome), count in self.outcomes.items() if name == path},
+                    'calls': self.calls[path],
+                    'mean_latency_ms': round(self.latency_seconds[path] / self.calls[path] * 1000, 3) if self.calls[path] else None,
+                }
+                for path in sorted({name for name, _ in self.outcomes})
+            }
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    # Retries are handled here so they can be counted and jittered; the adapter only pools.
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE + HEDGE_POOL_SIZE, max_retries=0)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+SESSION = _build_session()
+BREAKER = CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET_SECONDS)
+STATS = CallStats()
+# Hedged calls run their first copy on one pool and hedges on a separate, smaller one, so a burst of
+# slow calls cannot queue hedges behind the primaries they are meant to overtake.
+_PRIMARY_EXECUTOR = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix='engine-call')
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=max(HEDGE_POOL_SIZE, 1), thread_name_prefix='engine-hedge')
+_HEDGE_SLOTS = threading.BoundedSemaphore(max(HEDGE_POOL_SIZE, 1))
+
+
+def _post(url: str, payload: Dict[str, Any]) -> requests.Response:
+    return SESSION.post(url, json=payload, timeout=DEFAULT_TIMEOUT)
+
+
+def _get(url: str) -> requests.Response:
+    return SESSION.get(url, timeout=DEFAULT_TIMEOUT)
+
+
+def _hedged_post(path: str, url: str, payload: Dict[str, Any]) -> requests.Response:
+    started = threading.Event()
+
+    def primary_post() -> requests.Response:
+        started.set()
+        return _post(url, payload)
+
+    primary = _PRIMARY_EXECUTOR.submit(primary_post)
+    # Time spent queued behind other calls is not engine latency; the hedge delay starts on the wire.
+    started.wait()
+    try:
+        return primary.result(timeout=HEDGE_AFTER_SECONDS)
+    except TimeoutError:
+        pass
+    if not _HEDGE_SLOTS.acquire(blocking=False):
+        STATS.record(path, 'hedge_skipped')
+        return primary.result()
+    STATS.record(path, 'hedged')
+    hedge = _HEDGE_EXECUTOR.submit(_post, url, payload)
+    hedge.add_done_callback(lambda _: _HEDGE_SLOTS.release())
+    pending = {primary, hedge}
+    error: BaseException | None = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    STATS.record(path, 'hedge_won')
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter: uniformly random up to the exponential ceiling, so retries from many workers spread out.
+    return random.uniform(0, RETRY_BACKOFF * (2 ** attempt))
+
+
+def _send(path: str, url: str, payload: Dict[str, Any] | None) -> requests.Response:
+    """One attempt (a GET when ``payload`` is None), with its outcome recorded on the breaker and in STATS."""
+    started = time.monotonic()
+    healthy = False
+    try:
+        if payload is None:
+            response = _get(url)
+        elif HEDGE_AFTER_SECONDS > 0:
+            response = _hedged_post(path, url, payload)
+        else:
+            response = _post(url, payload)
+        # A 4xx still means the engine is up; it rejected this payload.
+        healthy = response.status_code < 500
+    except requests.RequestException as exc:
+        if isinstance(exc, requests.Timeout):
+            outcome = 'timeout'
+        elif isinstance(exc, requests.ConnectionError):
+            outcome = 'connection_error'
+        else:
+            outcome = 'request_error'
+        STATS.record(path, outcome, time.monotonic() - started)
+        raise
+    finally:
+        # Settled on every exit, so no exception can leave a half-open trial claimed.
+        if healthy:
+            BREAKER.record_success()
+        else:
+            BREAKER.record_failure()
+    STATS.record(path, 'ok' if response.ok else f'http_{response.status_code}', time.monotonic() - started)
+    return response
+
+
+def _request(path: str, payload: Dict[str, Any] | None) -> Dict[str, Any]:
+    try:
+        return _call(path, payload)
+    finally:
+        _log_stats()
+
+
+def _call(path: str, payload: Dict[str, Any] | None) -> Dict[str, Any]:
     url = f"{ENGINE_BASE_URL.rstrip('/')}{path}"
     logger.debug('Recommender engine request %s payload=%s', url, payload)
-    response = requests.post(url, json=payload, timeout=DEFAULT_TIMEOUT)
-    response.raise_for_status()
-    data = response.json()
-    logger.debug('Recommender engine response %s', data)
-    return data
+    attempt = 0
+    while True:
+        if not BREAKER.allow():
+            STATS.record(path, 'circuit_open')
+            raise EngineUnavailable(f'Recommender engine circuit is open; not calling {path}')
+        try:
+            response = _send(path, url, payload)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= RETRIES:
+                raise
+        else:
+            if response.status_code not in _RETRY_STATUSES or attempt >= RETRIES:
+                response.raise_for_status()
+                data = response.json()
+                logger.debug('Recommender engine response %s', data)
+                return data
+        STATS.record(path, 'retry')
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+def _log_stats() -> None:
+    if STATS.due(STATS_LOG_SECONDS):
+        logger.info('engine call stats pid=%d %s', os.getpid(), json.dumps(call_stats(), sort_keys=True))
+
+
+def call_stats() -> Dict[str, Any]:
+    """Outcome counters and mean latency per engine endpoint, plus the circuit breaker state.
+
+    The counters cover this process only. Each process logs them every ``STATS_LOG_SECONDS``
+    (tagged with its pid), and staff can read the serving process's copy at
+    ``/api/v1/recommendations/engine-stats/``.
+    """
+    return {'breaker': BREAKER.state, 'endpoints': STATS.snapshot()}
+
+
+def fetch_engine_stats() -> Dict[str, Any]:
+    """The engine's ``/stats``: its model version, index version and sizes, and result-cache counters."""
+    return _request('/stats', None)
 
 
 def fetch_recommendations(profile: Dict[str, Any]) -> Dict[str, Any]:
@@ -29,6 +278,15 @@ def fetch_recommendations(profile: Dict[str, Any]) -> Dict[str, Any]:
     return _request('/recommend', profile)
 
 
+def fetch_recommendations_batch(profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Score many profiles with the engine's batch endpoint, one result per profile in order."""
+    results: List[Dict[str, Any]] = []
+    for start in range(0, len(profiles), BATCH_SIZE):
+        chunk = profiles[start:start + BATCH_SIZE]
+        results.extend(_request('/recommend/batch', {'requests': chunk})['results'])
+    return results
+
+
 def generate_embedding(resource_type: str, attributes: Dict[str, Any]) -> Dict[str, Any]:
     payload = {
         'resource_type': resource_type,
@@ -37,5 +295,12 @@ def generate_embedding(resource_type: str, attributes: Dict[str, Any]) -> Dict[s
     return _request('/embed', payload)
 
 
+def generate_embeddings_batch(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Embed ``{'resource_type', 'attributes'}`` items in one engine call; results keep item order."""
+    if not items:
+        return []
+    return _request('/embed/batch', {'items': items})['vectors']
+
+
 def build_vector_from_names(names: List[str]) -> Dict[str, Any]:
     return generate_embedding('text', {'tokens': names})
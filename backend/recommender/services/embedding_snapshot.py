@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from recommender.models import AlbumEmbedding, ArtistEmbedding, TrackEmbedding
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = getattr(settings, 'RECOMMENDER_SNAPSHOT_DIR', '')
+SNAPSHOT_KEEP = int(getattr(settings, 'RECOMMENDER_SNAPSHOT_KEEP', 3))
+VECTOR_DIM = int(getattr(settings, 'RECOMMENDER_VECTOR_DIM', 32))
+CURRENT_FILE = 'CURRENT'
+_CHUNK_SIZE = 10000
+
+SNAPSHOT_SOURCES = {
+    'artists': (ArtistEmbedding, 'artist'),
+    'albums': (AlbumEmbedding, 'album'),
+    'tracks': (TrackEmbedding, 'track'),
+}
+
+
+@dataclass
+class SnapshotResult:
+    version: str
+    path: str
+    rows: Dict[str, int] = field(default_factory=dict)
+    pruned: List[str] = field(default_factory=list)
+
+
+def current_version(directory: str | os.PathLike) -> str | None:
+    try:
+        return (Path(directory) / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def decode_vectors(blobs: List[bytes], dims: List[int], dim: int) -> np.ndarray:
+    """Stack packed float32 blobs into an (N, dim) matrix, padding or truncating rows stored at another width."""
+    if all(stored == dim for stored in dims):
+        return np.frombuffer(b''.join(blobs), dtype='<f4').reshape(len(blobs), dim).astype(np.float32)
+    matrix = np.zeros((len(blobs), dim), dtype=np.float32)
+    for position, blob in enumerate(blobs):
+        values = np.frombuffer(blob, dtype='<f4')[:dim]
+        matrix[position, :values.size] = values
+    return matrix
+
+
+def _export_type(resource_type: str, staging: Path, dim: int) -> int:
+    model, fk = SNAPSHOT_SOURCES[resource_type]
+    queryset = (
+        model.objects.filter(vector_dim__gt=0, vector_norm__gt=0)
+        .order_by('pk')
+        .values_list(
+            f'{fk}_id', f'{fk}__name', f'{fk}__spotify_id', 'vector_data', 'vector_dim',
+            'model_version', 'quality_score', 'metadata', 'modified_at',
+        )
+    )
+    blocks: List[np.ndarray] = []
+    columns: Dict[str, List[Any]] = {
+        key: [] for key in ('item_ids', 'names', 'spotify_ids', 'model_versions', 'quality_scores', 'metadata')
+    }
+    watermark = None
+    chunk: List[tuple] = []
+
+    def flush() -> None:
+        matrix = decode_vectors([bytes(row[3]) for row in chunk], [row[4] for row in chunk], dim)
+        norms = np.linalg.norm(matrix, axis=1)
+        valid = np.flatnonzero((norms > 0) & np.isfinite(norms))
+        blocks.append(matrix[valid] / norms[valid, None])
+        for position in valid:
+            item_id, name, spotify_id, _, _, model_version, quality_score, metadata, _ = chunk[position]
+            columns['item_ids'].append(item_id)
+            columns['names'].append(name)
+            columns['spotify_ids'].append(spotify_id)
+            columns['model_versions'].append(model_version)
+            columns['quality_scores'].append(quality_score)
+            columns['metadata'].append(metadata or {})
+        chunk.clear()
+
+    for row in queryset.iterator(chunk_size=_CHUNK_SIZE):
+        if watermark is None or row[8] > watermark:
+            watermark = row[8]
+        chunk.append(row)
+        if len(chunk) >= _CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+
+    matrix = np.concatenate(blocks) if blocks else np.zeros((0, dim), dtype=np.float32)
+    return write_type(staging, resource_type, matrix, columns, watermark.isoformat() if watermark else None)
+
+
+def write_type(staging: Path, resource_type: str, matrix: np.ndarray, columns: Dict[str, List[Any]], watermark: str | None) -> int:
+    """Write one resource type's L2-normalized matrix and its aligned row sidecar into a staged version."""
+    np.save(staging / f'{resource_type}.npy', np.ascontiguousarray(matrix, dtype=np.float32))
+    sidecar = {'dim': matrix.shape[1], 'watermark': watermark, **columns}
+    with open(staging / f'{resource_type}.rows.json', 'w') as handle:
+        json.dump(sidecar, handle)
+    return matrix.shape[0]
+
+
+def _prune(directory: Path, keep: int, live: str) -> List[str]:
+    versions = sorted(
+        entry.name for entry in directory.iterdir()
+        if entry.is_dir() and not entry.name.startswith('.') and entry.name != live
+    )
+    # Engines that already mapped an older version keep reading it after unlink.
+    stale = versions[:max(len(versions) - (keep - 1), 0)]
+    for name in stale:
+        shutil.rmtree(directory / name, ignore_errors=True)
+    return stale
+
+
+def export_snapshot(
+    directory: str | os.PathLike | None = None,
+    *,
+    dim: int = VECTOR_DIM,
+    keep: int = SNAPSHOT_KEEP,
+) -> SnapshotResult:
+    """Write a new snapshot version of every resource type and make it current.
+
+    Layout under ``directory``::
+
+        CURRENT                      # name of the live version
+        <version>/<type>.npy         # (N, dim) float32, rows L2-normalized
+        <version>/<type>.rows.json   # item ids, names, and per-row extras aligned with the matrix
+
+    The version is written into a hidden staging directory, renamed into place, and
+    only then published by swapping CURRENT with ``os.replace``, so the engine never
+    maps a half-written file. ``keep`` bounds how many versions stay on disk.
+    """
+    directory = directory or SNAPSHOT_DIR
+    if not directory:
+        raise ValueError('RECOMMENDER_SNAPSHOT_DIR is not configured')
+    result = publish_version(directory, keep, lambda staging: {
+        resource_type: _export_type(resource_type, staging, dim) for resource_type in SNAPSHOT_SOURCES
+    })
+    logger.info('embedding snapshot %s written: %s', result.version, result.rows)
+    return result
+
+
+def publish_version(directory: str | os.PathLike, keep: int, write: Callable[[Path], Dict[str, int]]) -> SnapshotResult:
+    """Stage a new version with ``write``, rename it into place, point CURRENT at it, and prune old versions."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    version = timezone.now().strftime('%Y%m%dT%H%M%S%fZ')
+    staging = Path(tempfile.mkdtemp(prefix='.staging-', dir=directory))
+    result = SnapshotResult(version=version, path=str(directory / version))
+    try:
+        result.rows = write(staging)
+        # mkdtemp creates the directory owner-only; the engine may read it as another user.
+        staging.chmod(0o755)
+        os.rename(staging, directory / version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    pointer = directory / f'.{CURRENT_FILE}.{version}'
+    pointer.write_text(version)
+    os.replace(pointer, directory / CURRENT_FILE)
+    result.pruned = _prune(directory, max(keep, 1), version)
+    return result
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence
+
+from django.conf import settings
+from django.db import models
+
+from catalog.models import Album, Artist, Track
+from recommender.models import AlbumEmbedding, ArtistEmbedding, TrackEmbedding
+from recommender.services.client import generate_embeddings_batch
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = getattr(settings, 'RECOMMENDER_MODEL_VERSION', 'v1.0.0')
+CHUNK_SIZE = int(getattr(settings, 'RECOMMENDER_EMBED_CHUNK_SIZE', 500))
+
+# Columns rewritten when an existing embedding row is re-synced.
+_UPDATE_FIELDS = ['vector_data', 'vector_dim', 'vector_norm', 'model_version', 'quality_score', 'metadata', 'modified_at']
+
+
+def artist_attributes(artist: Artist) -> Dict[str, Any]:
+    return {'name': artist.name, 'spotify_id': artist.spotify_id}
+
+
+def album_attributes(album: Album) -> Dict[str, Any]:
+    return {
+        'name': album.name,
+        'spotify_id': album.spotify_id,
+        'artists': [artist.name for artist in album.artists.all()],
+    }
+
+
+def track_attributes(track: Track) -> Dict[str, Any]:
+    return {
+        'name': track.name,
+        'spotify_id': track.spotify_id,
+        'album': track.album.name,
+        'artists': [artist.name for artist in track.album.artists.all()],
+    }
+
+
+@dataclass(frozen=True)
+class _EmbeddingTarget:
+    resource_type: str
+    model: type[models.Model]
+    embedding_model: type[models.Model]
+    field: str
+    attributes: Callable[[Any], Dict[str, Any]]
+    select_related: Sequence[str] = ()
+    prefetch_related: Sequence[str] = ()
+
+
+EMBEDDING_TARGETS = {
+    'artist': _EmbeddingTarget('artist', Artist, ArtistEmbedding, 'artist', artist_attributes),
+    'album': _EmbeddingTarget(
+        'album', Album, AlbumEmbedding, 'album', album_attributes,
+        prefetch_related=('artists',),
+    ),
+    'track': _EmbeddingTarget(
+        'track', Track, TrackEmbedding, 'track', track_attributes,
+        select_related=('album',), prefetch_related=('album__artists',),
+    ),
+}
+
+
+@dataclass
+class EmbeddingSyncResult:
+    synced: Dict[str, int] = field(default_factory=dict)
+    requests: int = 0
+
+
+def embedding_fields(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an engine /embed response onto EmbeddingBase columns."""
+    return {
+        'vector': payload.get('vector', []),
+        'model_version': payload.get('model_version', MODEL_VERSION),
+        'quality_score': payload.get('quality', 0.0),
+        'metadata': payload.get('metadata', {}),
+    }
+
+
+def _chunks(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _pending(target: _EmbeddingTarget, *, force: bool) -> models.QuerySet:
+    queryset = target.model.objects.order_by('pk')
+    if not force:
+        # Rows with no embedding have a NULL model_version here, so exclude() keeps them too.
+        queryset = queryset.exclude(embedding__model_version=MODEL_VERSION)
+    if target.select_related:
+        queryset = queryset.select_related(*target.select_related)
+    if target.prefetch_related:
+        queryset = queryset.prefetch_related(*target.prefetch_related)
+    return queryset
+
+
+def sync_stale_embeddings(
+    resource_types: Sequence[str] | None = None,
+    *,
+    chunk_size: int = CHUNK_SIZE,
+    force: bool = False,
+) -> EmbeddingSyncResult:
+    """Embed every entity whose embedding is missing or from another model version.
+
+    Entities are streamed with ``iterator()`` and embedded ``chunk_size`` at a time
+    through the engine's batch endpoint; each chunk is written back with a single
+    upserting ``bulk_create``. ``force`` re-embeds everything regardless of version.
+    """
+    result = EmbeddingSyncResult()
+    for resource_type in resource_types or EMBEDDING_TARGETS:
+        target = EMBEDDING_TARGETS[resource_type]
+        synced = 0
+        for chunk in _chunks(_pending(target, force=force).iterator(chunk_size=chunk_size), chunk_size):
+            payloads = generate_embeddings_batch([
+                {'resource_type': resource_type, 'attributes': target.attributes(instance)}
+                for instance in chunk
+            ])
+            result.requests += 1
+            target.embedding_model.objects.bulk_create(
+                [
+                    target.embedding_model(**{target.field: instance}, **embedding_fields(payload))
+                    for instance, payload in zip(chunk, payloads)
+                ],
+                update_conflicts=True,
+                unique_fields=[target.field],
+                update_fields=_UPDATE_FIELDS,
+            )
+            synced += len(chunk)
+            logger.info('embedding sync: %s chunk written (%d so far)', resource_type, synced)
+        result.synced[resource_type] = synced
+    return result
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+
+from recommender.models import ItemNeighbors, pack_vector
+from recommender.services import knn
+from recommender.services.embedding_snapshot import SNAPSHOT_SOURCES, VECTOR_DIM, decode_vectors
+
+logger = logging.getLogger(__name__)
+
+NEIGHBORS_K = int(getattr(settings, 'RECOMMENDER_NEIGHBORS_K', 50))
+NEIGHBORS_WORKERS = int(getattr(settings, 'RECOMMENDER_NEIGHBORS_WORKERS', 0))
+# Ceiling for the default (0) worker count: every Celery child runs its own pool, and each
+# scoring thread holds one block of scores.
+MAX_DEFAULT_WORKERS = 4
+# Score cells per block: 16M float32 keeps each worker's score matrix near 64 MiB.
+BLOCK_CELLS = 1 << 24
+_CHUNK_SIZE = 10000
+_WRITE_BATCH = 1000
+_UPDATE_FIELDS = ['neighbor_ids', 'scores', 'model_version', 'source_modified_at', 'computed_at']
+
+
+@dataclass
+class NeighborsResult:
+    computed: Dict[str, int] = field(default_factory=dict)
+    removed: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+@dataclass
+class _Catalog:
+    item_ids: np.ndarray
+    matrix: np.ndarray
+    model_versions: List[str]
+    modified_at: List
+    pending: np.ndarray
+
+
+def _load_catalog(resource_type: str, dim: int, full: bool) -> _Catalog:
+    model, fk = SNAPSHOT_SOURCES[resource_type]
+    fresh = ItemNeighbors.objects.filter(
+        resource_type=resource_type,
+        item_id=OuterRef(f'{fk}_id'),
+        source_modified_at__gte=OuterRef('modified_at'),
+    )
+    queryset = (
+        model.objects.filter(vector_dim__gt=0, vector_norm__gt=0)
+        .annotate(fresh=Exists(fresh))
+        .order_by('pk')
+        .values_list(f'{fk}_id', 'vector_data', 'vector_dim', 'model_version', 'modified_at', 'fresh')
+    )
+    blocks: List[np.ndarray] = []
+    item_ids: List[int] = []
+    model_versions: List[str] = []
+    modified_at: List = []
+    pending: List[bool] = []
+    chunk: List[tuple] = []
+
+    def flush() -> None:
+        matrix = decode_vectors([bytes(row[1]) for row in chunk], [row[2] for row in chunk], dim)
+        norms = np.linalg.norm(matrix, axis=1)
+        valid = np.flatnonzero((norms > 0) & np.isfinite(norms))
+        blocks.append(matrix[valid] / norms[valid, None])
+        for position in valid:
+            item_id, _, _, model_version, modified, is_fresh = chunk[position]
+            item_ids.append(item_id)
+            model_versions.append(model_version)
+            modified_at.append(modified)
+            pending.append(full or not is_fresh)
+        chunk.clear()
+
+    for row in queryset.iterator(chunk_size=_CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) >= _CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+
+    matrix = np.concatenate(blocks) if blocks else np.zeros((0, dim), dtype=np.float32)
+    return _Catalog(
+        item_ids=np.asarray(item_ids, dtype=np.int64),
+        matrix=np.ascontiguousarray(matrix, dtype=np.float32),
+        model_versions=model_versions,
+        modified_at=modified_at,
+        pending=np.flatnonzero(pending),
+    )
+
+
+def _blocks(rows: np.ndarray, catalog_rows: int) -> Iterator[np.ndarray]:
+    block_rows = max(1, BLOCK_CELLS // max(catalog_rows, 1))
+    for start in range(0, rows.size, block_rows):
+        yield rows[start:start + block_rows]
+
+
+def _ranked_blocks(
+    matrix: np.ndarray,
+    rows: np.ndarray,
+    k: int,
+    workers: int,
+) -> Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    blocks = list(_blocks(rows, matrix.shape[0]))
+    if workers <= 1 or len(blocks) == 1:
+        yield from (knn.top_neighbors(matrix, block, k) for block in blocks)
+        return
+    # Threads rather than processes: the job runs inside daemonic Celery prefork children,
+    # which may not start processes of their own, and the GEMM and partial sort release the GIL.
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='item-neighbors') as pool:
+        yield from pool.map(lambda block: knn.top_neighbors(matrix, block, k), blocks)
+
+
+def _write(resource_type: str, catalog: _Catalog, ranked: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]]) -> int:
+    written = 0
+    batch: List[ItemNeighbors] = []
+
+    def flush() -> None:
+        ItemNeighbors.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['resource_type', 'item_id'],
+            update_fields=_UPDATE_FIELDS,
+        )
+        batch.clear()
+
+    for rows, neighbors, scores in ranked:
+        neighbor_ids = catalog.item_ids[neighbors]
+        for position, row in enumerate(rows.tolist()):
+            batch.append(ItemNeighbors(
+                resource_type=resource_type,
+                item_id=int(catalog.item_ids[row]),
+                neighbor_ids=neighbor_ids[position].astype('<i8').tobytes(),
+                scores=pack_vector(scores[position].tolist()),
+                model_version=catalog.model_versions[row],
+                source_modified_at=catalog.modified_at[row],
+            ))
+            if len(batch) >= _WRITE_BATCH:
+                written += len(batch)
+                flush()
+    if batch:
+        written += len(batch)
+        flush()
+    return written
+
+
+def _remove_orphans(resource_type: str) -> int:
+    model, fk = SNAPSHOT_SOURCES[resource_type]
+    embedded = model.objects.filter(**{f'{fk}_id': OuterRef('item_id')}, vector_dim__gt=0, vector_norm__gt=0)
+    removed, _ = ItemNeighbors.objects.filter(resource_type=resource_type).exclude(Exists(embedded)).delete()
+    return removed
+
+
+def compute_neighbors(
+    resource_types: Sequence[str] | None = None,
+    *,
+    k: int = NEIGHBORS_K,
+    full: bool = False,
+    workers: int = NEIGHBORS_WORKERS,
+    dim: int = VECTOR_DIM,
+) -> NeighborsResult:
+    """Store the top-``k`` cosine neighbours of catalog items in ``ItemNeighbors``.
+
+    Without ``full`` only items whose embedding is new or changed since their row was
+    written are recomputed; they are still ranked against the whole catalog, but
+    existing rows only pick up newer items on a full run. Query rows are scored in
+    blocks of ``BLOCK_CELLS`` across ``workers`` threads (0 uses up to
+    ``MAX_DEFAULT_WORKERS`` CPUs, 1 runs inline) and written as each block finishes.
+    """
+    started = time.monotonic()
+    workers = workers or min(os.cpu_count() or 1, MAX_DEFAULT_WORKERS)
+    result = NeighborsResult()
+    for resource_type in resource_types or SNAPSHOT_SOURCES:
+        catalog = _load_catalog(resource_type, dim, full)
+        ranked = _ranked_blocks(catalog.matrix, catalog.pending, k, workers) if catalog.pending.size else []
+        result.computed[resource_type] = _write(resource_type, catalog, ranked)
+        result.removed[resource_type] = _remove_orphans(resource_type)
+        logger.info(
+            'item neighbours for %s: computed=%d catalog=%d removed=%d',
+            resource_type, result.computed[resource_type], catalog.item_ids.size, result.removed[resource_type],
+        )
+    result.seconds = round(time.monotonic() - started, 3)
+    return result
+
+
+def lookup(resource_type: str, item_id: int, limit: int | None = None) -> Tuple[ItemNeighbors, List[Dict]] | None:
+    """Stored neighbours of one item with their catalog names, or None when none were computed."""
+    row = ItemNeighbors.objects.filter(resource_type=resource_type, item_id=item_id).first()
+    if row is None:
+        return None
+    neighbors = row.neighbors(limit)
+    model, fk = SNAPSHOT_SOURCES[resource_type]
+    catalog_model = model._meta.get_field(fk).related_model
+    entities = catalog_model.objects.only('name', 'spotify_id').in_bulk([neighbor_id for neighbor_id, _ in neighbors])
+    # Items deleted since the last run simply drop out.
+    return row, [
+        {
+            'id': neighbor_id,
+            'name': entities[neighbor_id].name,
+            'spotify_id': entities[neighbor_id].spotify_id,
+            'likeness': round(max(0.0, min(score, 1.0)), 4),
+        }
+        for neighbor_id, score in neighbors if neighbor_id in entities
+    ]
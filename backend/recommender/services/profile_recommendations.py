@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from juke_auth.models import MusicProfile
+from recommender.models import ProfileRecommendation
+from recommender.services import client, taste
+
+logger = logging.getLogger(__name__)
+
+RESULT_LIMIT = int(getattr(settings, 'RECOMMENDER_PROFILE_RESULT_LIMIT', 20))
+CHUNK_SIZE = int(getattr(settings, 'RECOMMENDER_ENGINE_BATCH_SIZE', 500))
+RESOURCE_TYPES = ('artists', 'albums', 'tracks')
+_FAVORITE_FIELDS = ['favorite_artists', 'favorite_albums', 'favorite_tracks', 'favorite_genres']
+_UPDATE_FIELDS = ['results', 'seed_digest', 'model_version', 'generated_at', 'modified_at']
+
+
+@dataclass
+class RefreshResult:
+    profiles: int = 0
+    stored: int = 0
+    cleared: int = 0
+
+
+def seed_digest(payload: Dict[str, Any]) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def has_seeds(payload: Dict[str, Any]) -> bool:
+    return any(payload.get(key) for key in ('artists', 'albums', 'tracks', 'genres'))
+
+
+def _generated_at(value: str | None) -> datetime:
+    parsed = parse_datetime(value) if value else None
+    if parsed is None:
+        return timezone.now()
+    # The engine reports naive UTC timestamps.
+    return parsed if timezone.is_aware(parsed) else parsed.replace(tzinfo=dt_timezone.utc)
+
+
+def _stored(profile_id: int, payload: Dict[str, Any], engine_result: Dict[str, Any]) -> ProfileRecommendation:
+    return ProfileRecommendation(
+        profile_id=profile_id,
+        results={resource_type: engine_result.get(resource_type, []) for resource_type in RESOURCE_TYPES},
+        seed_digest=seed_digest(payload),
+        model_version=engine_result.get('model_version', 'unknown'),
+        generated_at=_generated_at(engine_result.get('generated_at')),
+    )
+
+
+def _save(rows: List[ProfileRecommendation]) -> None:
+    ProfileRecommendation.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['profile'],
+        update_fields=_UPDATE_FIELDS,
+    )
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterable[List]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def refresh_all(
+    queryset: QuerySet[MusicProfile] | None = None,
+    *,
+    chunk_size: int = CHUNK_SIZE,
+    limit: int = RESULT_LIMIT,
+) -> RefreshResult:
+    """Recompute stored recommendations for every profile, one engine batch call per chunk.
+
+    Profiles are streamed by primary key so memory stays flat regardless of how many
+    there are. Profiles without any favourites have their stored results removed.
+    """
+    queryset = queryset if queryset is not None else MusicProfile.objects.all()
+    profiles = queryset.order_by('pk').only('pk', *_FAVORITE_FIELDS).iterator(chunk_size=chunk_size)
+    result = RefreshResult()
+    for chunk in _chunks(profiles, chunk_size):
+        result.profiles += len(chunk)
+        payloads = {profile.pk: taste.profile_to_payload(profile) for profile in chunk}
+        seeded = [profile_id for profile_id, payload in payloads.items() if has_seeds(payload)]
+        empty = [profile_id for profile_id, payload in payloads.items() if not has_seeds(payload)]
+        if empty:
+            result.cleared += ProfileRecommendation.objects.filter(profile_id__in=empty).delete()[0]
+        if not seeded:
+            continue
+        engine_results = client.fetch_recommendations_batch(
+            [{**payloads[profile_id], 'limit': limit} for profile_id in seeded]
+        )
+        _save([
+            _stored(profile_id, payloads[profile_id], engine_result)
+            for profile_id, engine_result in zip(seeded, engine_results)
+        ])
+        result.stored += len(seeded)
+        logger.info('profile recommendations: stored %d of %d profiles so far', result.stored, result.profiles)
+    return result
+
+
+def refresh_profile(profile: MusicProfile, *, limit: int = RESULT_LIMIT) -> ProfileRecommendation | None:
+    """Recompute one profile right away, e.g. after its favourites were edited."""
+    payload = taste.profile_to_payload(profile)
+    if not has_seeds(payload):
+        ProfileRecommendation.objects.filter(profile=profile).delete()
+        return None
+    stored = _stored(profile.pk, payload, client.fetch_recommendations({**payload, 'limit': limit}))
+    _save([stored])
+    return stored
+
+
+def is_stale(profile: MusicProfile) -> bool:
+    """True when the profile's favourites differ from the seeds its stored results were computed from."""
+    payload = taste.profile_to_payload(profile)
+    stored = ProfileRecommendation.objects.filter(profile=profile).values_list('seed_digest', flat=True).first()
+    if stored is None:
+        return has_seeds(payload)
+    return stored != seed_digest(payload)
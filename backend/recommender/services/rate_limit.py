@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SPOTIFY_CALLS_PER_SECOND = float(getattr(settings, 'RECOMMENDER_SPOTIFY_CALLS_PER_SECOND', 5))
+RATE_LIMIT_REDIS_URL = getattr(settings, 'RECOMMENDER_RATE_LIMIT_REDIS_URL', '')
+_SPOTIFY_KEY = 'recommender:ratelimit:spotify'
+
+
+class LocalRateLimiter:
+    """At most ``rate`` acquisitions per ``period``-second window within this process."""
+
+    def __init__(self, rate: float, period: float = 1.0, *, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.period = period
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+
+    def _take(self, window: int) -> bool:
+        with self._lock:
+            for stale in [key for key in self._counts if key < window]:
+                del self._counts[stale]
+            self._counts[window] += 1
+            return self._counts[window] <= self.rate
+
+    def acquire(self) -> None:
+        while self.rate > 0:
+            now = self._clock()
+            window = int(now // self.period)
+            if self._take(window):
+                return
+            self._sleep((window + 1) * self.period - now)
+
+
+class RedisRateLimiter(LocalRateLimiter):
+    """Fixed-window limiter whose counters live in Redis, so every worker process shares one quota.
+
+    Each acquisition is an atomic INCR on the current window's key; a caller
+    that lands over ``rate`` sleeps until the next window and tries again.
+    """
+
+    def __init__(self, client, key: str, rate: float, period: float = 1.0, *, clock=time.time, sleep=time.sleep):
+        super().__init__(rate, period, clock=clock, sleep=sleep)
+        self.client = client
+        self.key = key
+
+    def _take(self, window: int) -> bool:
+        pipeline = self.client.pipeline()
+        pipeline.incr(f'{self.key}:{window}')
+        pipeline.expire(f'{self.key}:{window}', math.ceil(self.period) + 1)
+        count, _ = pipeline.execute()
+        return count <= self.rate
+
+
+_spotify_limiter: LocalRateLimiter | None = None
+
+
+def spotify_limiter() -> LocalRateLimiter:
+    """Limiter for Spotify API calls: shared through Redis when one is configured, per process otherwise."""
+    global _spotify_limiter
+    if _spotify_limiter is None:
+        if RATE_LIMIT_REDIS_URL.startswith(('redis://', 'rediss://')):
+            import redis
+
+            _spotify_limiter = RedisRateLimiter(redis.Redis.from_url(RATE_LIMIT_REDIS_URL), _SPOTIFY_KEY, SPOTIFY_CALLS_PER_SECOND)
+        else:
+            logger.info('Spotify rate limit is per process; set RECOMMENDER_RATE_LIMIT_REDIS_URL to share it across workers.')
+            _spotify_limiter = LocalRateLimiter(SPOTIFY_CALLS_PER_SECOND)
+    return _spotify_limiter
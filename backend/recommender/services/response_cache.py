@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+RESPONSE_CACHE_TTL_SECONDS = int(getattr(settings, 'RECOMMENDER_RESPONSE_CACHE_TTL_SECONDS', 300))
+MODEL_VERSION = getattr(settings, 'RECOMMENDER_MODEL_VERSION', 'v1.0.0')
+RESOURCE_TYPES = ['artists', 'albums', 'tracks']
+# Last model version the engine reported. Keys embed it, so a new version orphans every older entry.
+# Lives in the shared cache; refresh_engine_model_version moves it even while every key is a hit.
+MODEL_VERSION_CACHE_KEY = 'recommender:engine-model-version'
+_KEY_PREFIX = 'recommender:response'
+
+
+def engine_model_version() -> str:
+    return cache.get(MODEL_VERSION_CACHE_KEY) or MODEL_VERSION
+
+
+def note_model_version(model_version: str | None) -> bool:
+    """Point lookups at ``model_version``; returns True when that moved the pointer."""
+    if not model_version or model_version == engine_model_version():
+        return False
+    cache.set(MODEL_VERSION_CACHE_KEY, model_version, None)
+    return True
+
+
+def cache_key(payload: Dict[str, Any], model_version: str) -> str:
+    """``payload`` comes from ``taste.mixed_payload`` (lists already sorted and de-duplicated) plus limit/resource_types."""
+    normalized = {
+        **payload,
+        'resource_types': sorted(payload.get('resource_types') or RESOURCE_TYPES),
+    }
+    encoded = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return f"{_KEY_PREFIX}:{model_version}:{hashlib.sha256(encoded.encode('utf-8')).hexdigest()}"
+
+
+def get(payload: Dict[str, Any]) -> Dict[str, Any] | None:
+    if RESPONSE_CACHE_TTL_SECONDS <= 0:
+        return None
+    return cache.get(cache_key(payload, engine_model_version()))
+
+
+def store(payload: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """Cache a normalized, serializer-validated response under the model version it reports."""
+    if RESPONSE_CACHE_TTL_SECONDS <= 0:
+        return
+    model_version = response.get('model_version') or MODEL_VERSION
+    note_model_version(model_version)
+    cache.set(cache_key(payload, model_version), response, RESPONSE_CACHE_TTL_SECONDS)
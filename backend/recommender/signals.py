@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from juke_auth.models import MusicProfile
+from recommender.services.profile_recommendations import is_stale
+
+
+@receiver(post_save, sender=MusicProfile)
+def refresh_recommendations_on_favorites_change(sender, instance=None, raw=False, **kwargs):
+    if raw or not is_stale(instance):
+        return
+    from recommender.tasks import refresh_profile_recommendation
+
+    # Queued after commit so the worker reads the saved favourites.
+    transaction.on_commit(lambda: refresh_profile_recommendation.delay(instance.pk))
@@ -1,24 +1,43 @@
 from __future__ import annotations
 
 import logging
+import time
+from dataclasses import asdict
 
-from celery import shared_task
+from celery import chord, shared_task
 
 from catalog.models import Artist, Album, Track
+from juke_auth.models import MusicProfile
 from recommender.models import ArtistEmbedding, AlbumEmbedding, TrackEmbedding
-from recommender.services.client import generate_embedding
-from recommender.services.audio_ingest import ingest_training_data as _ingest_training_data
+from recommender.services import response_cache
+from recommender.services.client import fetch_engine_stats, generate_embedding
+from recommender.services.audio_ingest import (
+    INGEST_SHARD_SIZE,
+    IngestResult,
+    ingested_tracks,
+    ingest_tracks,
+    ingest_training_data as _ingest_training_data,
+    merge_results,
+    pending_tracks,
+)
+from recommender.services.embedding_snapshot import SNAPSHOT_DIR, export_snapshot
+from recommender.services.item_neighbors import compute_neighbors
+from recommender.services.profile_recommendations import refresh_all, refresh_profile
+from recommender.services.embedding_sync import (
+    MODEL_VERSION,
+    album_attributes,
+    artist_attributes,
+    embedding_fields,
+    sync_stale_embeddings as _sync_stale_embeddings,
+    track_attributes,
+)
 
 logger = logging.getLogger(__name__)
 
-MODEL_VERSION = 'v1.0.0'
-
 
 def _upsert_embedding(instance, payload):
-    instance.vector = payload.get('vector', [])
-    instance.model_version = payload.get('model_version', MODEL_VERSION)
-    instance.quality_score = payload.get('quality', 0.0)
-    instance.metadata = payload.get('metadata', {})
+    for name, value in embedding_fields(payload).items():
+        setattr(instance, name, value)
     instance.save()
     return instance
 
@@ -30,7 +49,7 @@ def _embed(resource_type: str, attributes: dict) -> dict:
 @shared_task
 def sync_artist_embedding(artist_id: int):
     artist = Artist.objects.get(pk=artist_id)
-    payload = _embed('artist', {'name': artist.name, 'spotify_id': artist.spotify_id})
+    payload = _embed('artist', artist_attributes(artist))
     embedding, _ = ArtistEmbedding.objects.get_or_create(artist=artist, defaults={'model_version': MODEL_VERSION})
     _upsert_embedding(embedding, payload)
     logger.info('Artist embedding synced for %s', artist.name)
@@ -39,11 +58,7 @@ def sync_artist_embedding(artist_id: int):
 @shared_task
 def sync_album_embedding(album_id: int):
     album = Album.objects.get(pk=album_id)
-    payload = _embed('album', {
-        'name': album.name,
-        'spotify_id': album.spotify_id,
-        'artists': list(album.artists.values_list('name', flat=True)),
-    })
+    payload = _embed('album', album_attributes(album))
     embedding, _ = AlbumEmbedding.objects.get_or_create(album=album, defaults={'model_version': MODEL_VERSION})
     _upsert_embedding(embedding, payload)
     logger.info('Album embedding synced for %s', album.name)
@@ -52,17 +67,113 @@ def sync_album_embedding(album_id: int):
 @shared_task
 def sync_track_embedding(track_id: int):
     track = Track.objects.get(pk=track_id)
-    payload = _embed('track', {
-        'name': track.name,
-        'spotify_id': track.spotify_id,
-        'album': track.album.name,
-        'artists': list(track.album.artists.values_list('name', flat=True)),
-    })
+    payload = _embed('track', track_attributes(track))
     embedding, _ = TrackEmbedding.objects.get_or_create(track=track, defaults={'model_version': MODEL_VERSION})
     _upsert_embedding(embedding, payload)
     logger.info('Track embedding synced for %s', track.name)
 
 
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={'max_retries': 3},
+    name='recommender.tasks.sync_stale_embeddings',
+)
+def sync_stale_embeddings(self, resource_types=None, force=False):
+    result = _sync_stale_embeddings(resource_types, force=force)
+    logger.info('sync_stale_embeddings finished: synced=%s requests=%d', result.synced, result.requests)
+    return {
+        'synced': result.synced,
+        'requests': result.requests,
+    }
+
+
+@shared_task(name='recommender.tasks.refresh_engine_model_version')
+def refresh_engine_model_version():
+    """Move the response cache to the engine's current model version, so hot keys stop serving the old model.
+
+    Without this the pointer only moves when a cache miss brings back a response from the new model.
+    Failures are left to the next run rather than retried.
+    """
+    model_version = fetch_engine_stats().get('model_version')
+    if response_cache.note_model_version(model_version):
+        logger.info('refresh_engine_model_version: response cache now keyed on model_version=%s', model_version)
+    return {'model_version': model_version}
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={'max_retries': 3},
+    name='recommender.tasks.export_embedding_snapshot',
+)
+def export_embedding_snapshot(self):
+    if not SNAPSHOT_DIR:
+        logger.warning('export_embedding_snapshot: RECOMMENDER_SNAPSHOT_DIR is not set; skipping.')
+        return {'version': None, 'rows': {}, 'warning': 'snapshot directory not configured'}
+    result = export_snapshot()
+    logger.info('export_embedding_snapshot finished: version=%s rows=%s', result.version, result.rows)
+    return {
+        'version': result.version,
+        'rows': result.rows,
+        'pruned': result.pruned,
+    }
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={'max_retries': 3},
+    name='recommender.tasks.compute_item_neighbors',
+)
+def compute_item_neighbors(self, resource_types=None, full=False):
+    result = compute_neighbors(resource_types, full=full)
+    logger.info('compute_item_neighbors finished: computed=%s removed=%s', result.computed, result.removed)
+    return {
+        'computed': result.computed,
+        'removed': result.removed,
+        'seconds': result.seconds,
+    }
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={'max_retries': 3},
+    name='recommender.tasks.refresh_profile_recommendations',
+)
+def refresh_profile_recommendations(self):
+    result = refresh_all()
+    logger.info(
+        'refresh_profile_recommendations finished: profiles=%d stored=%d cleared=%d',
+        result.profiles, result.stored, result.cleared,
+    )
+    return {
+        'profiles': result.profiles,
+        'stored': result.stored,
+        'cleared': result.cleared,
+    }
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={'max_retries': 3},
+    name='recommender.tasks.refresh_profile_recommendation',
+)
+def refresh_profile_recommendation(self, profile_id: int):
+    profile = MusicProfile.objects.filter(pk=profile_id).first()
+    if profile is None:
+        return {'profile_id': profile_id, 'stored': False}
+    stored = refresh_profile(profile)
+    return {'profile_id': profile_id, 'stored': stored is not None}
+
+
 @shared_task(
     bind=True,
     autoretry_for=(Exception,),
@@ -95,4 +206,52 @@ def ingest_training_data(self):
         'skipped': result.skipped,
         'failed': result.failed,
         'failed_track_ids': result.failed_track_ids,
+        'rows_per_second': result.rows_per_second,
     }
+
+
+@shared_task(bind=True, max_retries=3, name='recommender.tasks.ingest_training_data_parallel')
+def ingest_training_data_parallel(self, shard_size=None):
+    """Split pending tracks into shards in crawl order and ingest them as a chord across workers."""
+    shard_size = shard_size or INGEST_SHARD_SIZE
+    try:
+        track_ids = list(pending_tracks().values_list('pk', flat=True))
+        skipped = ingested_tracks().count()
+    except Exception as exc:
+        # Only planning is retried: once the chord is sent, a retry would dispatch a second one.
+        raise self.retry(exc=exc, countdown=2 ** self.request.retries)
+    shards = [track_ids[start:start + shard_size] for start in range(0, len(track_ids), shard_size)]
+    if not shards:
+        return {'shards': 0, 'tracks': 0, 'skipped': skipped}
+
+    chord(ingest_audio_shard.s(shard) for shard in shards)(
+        merge_ingest_results.s(skipped=skipped, started_at=time.time()),
+    )
+    logger.info('ingest_training_data_parallel: dispatched %d shards for %d tracks', len(shards), len(track_ids))
+    return {'shards': len(shards), 'tracks': len(track_ids), 'skipped': skipped}
+
+
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={'max_retries': 3},
+    name='recommender.tasks.ingest_audio_shard',
+)
+def ingest_audio_shard(self, track_ids):
+    # A retried shard only picks up the tracks its earlier attempt did not finish.
+    return asdict(ingest_tracks(track_ids))
+
+
+@shared_task(name='recommender.tasks.merge_ingest_results')
+def merge_ingest_results(shard_results, skipped=0, started_at=None):
+    result = merge_results(IngestResult(**shard_result) for shard_result in shard_results)
+    result.skipped += skipped
+    if started_at is not None:
+        result.seconds = round(time.time() - started_at, 3)
+    result.rows_per_second = round(result.ingested / result.seconds, 1) if result.seconds else 0.0
+    logger.info(
+        'ingest_training_data_parallel finished: shards=%d ingested=%d skipped=%d failed=%d rows/s=%.1f',
+        len(shard_results), result.ingested, result.skipped, result.failed, result.rows_per_second,
+    )
+    return {**asdict(result), 'shards': len(shard_results)}
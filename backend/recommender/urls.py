@@ -1,7 +1,14 @@
 from django.urls import path
 
-from recommender.views import RecommendationView
+from recommender.views import EngineStatsView, ItemNeighborsView, RecommendationView, StoredRecommendationView
 
 urlpatterns = [
     path('recommendations/', RecommendationView.as_view(), name='recommendations'),
+    path('recommendations/me/', StoredRecommendationView.as_view(), name='stored-recommendations'),
+    path('recommendations/engine-stats/', EngineStatsView.as_view(), name='engine-stats'),
+    path(
+        'recommendations/neighbors/<str:resource_type>/<int:item_id>/',
+        ItemNeighborsView.as_view(),
+        name='item-neighbors',
+    ),
 ]
@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import json
+import os
+
+from django.http import Http404
 from django.utils import timezone
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from recommender.serializers import (
+    ItemNeighborsResponseSerializer,
     RecommendationRequestSerializer,
     RecommendationResponseSerializer,
 )
-from recommender.services import client, taste
+from recommender.models import ProfileRecommendation
+from recommender.services import client, item_neighbors, response_cache, taste
 
 
 class RecommendationView(APIView):
@@ -30,12 +36,20 @@ class RecommendationView(APIView):
         if validated.get('resource_types'):
             profile_payload['resource_types'] = validated['resource_types']
 
+        cached = response_cache.get(profile_payload)
+        if cached is not None:
+            return Response(cached, status=status.HTTP_200_OK)
+
         engine_response = client.fetch_recommendations(profile_payload)
 
         normalized = self._normalize_response(engine_response)
         response_serializer = RecommendationResponseSerializer(data=normalized)
         response_serializer.is_valid(raise_exception=True)
-        return Response(response_serializer.data, status=status.HTTP_200_OK)
+        data = response_serializer.data
+        # Partial results (types that missed the engine deadline) are served but never cached.
+        if not engine_response.get('partial'):
+            response_cache.store(profile_payload, json.loads(json.dumps(data)))
+        return Response(data, status=status.HTTP_200_OK)
 
     def _normalize_response(self, engine_response):
         generated = engine_response.get('generated_at') or timezone.now().isoformat()
@@ -46,3 +60,57 @@ class RecommendationView(APIView):
             'model_version': engine_response.get('model_version', 'unknown'),
             'generated_at': generated,
         }
+
+
+class StoredRecommendationView(APIView):
+    """The signed-in user's precomputed recommendations; never calls the engine."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        stored = ProfileRecommendation.objects.filter(profile__user=request.user).first()
+        if stored is None:
+            raise Http404('No recommendations have been computed for this profile yet.')
+        limit = request.query_params.get('limit')
+        results = stored.results
+        if limit and limit.isdigit():
+            results = {resource_type: items[:int(limit)] for resource_type, items in results.items()}
+        serializer = RecommendationResponseSerializer({
+            **results,
+            'model_version': stored.model_version,
+            'generated_at': stored.generated_at,
+        })
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ItemNeighborsView(APIView):
+    """"More like this": the precomputed nearest neighbours of one artist, album or track."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, resource_type, item_id):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), item_neighbors.NEIGHBORS_K)
+        except ValueError:
+            return Response({'detail': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        found = item_neighbors.lookup(resource_type, item_id, limit)
+        if found is None:
+            raise Http404('No neighbours have been computed for this item.')
+        row, neighbors = found
+        serializer = ItemNeighborsResponseSerializer({
+            'resource_type': resource_type,
+            'item_id': item_id,
+            'neighbors': neighbors,
+            'model_version': row.model_version,
+            'computed_at': row.computed_at,
+        })
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class EngineStatsView(APIView):
+    """Staff-only view of this process's engine call counters and circuit breaker state."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), **client.call_stats()}, status=status.HTTP_200_OK)
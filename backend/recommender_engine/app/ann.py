@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+# Rows scored per block when assigning vectors to centroids; bounds the temporary score matrix.
+_ASSIGN_BLOCK_ROWS = 65536
+
+
+class IVFIndex:
+    """Inverted-file index over L2-normalized rows with a spherical k-means coarse quantizer.
+
+    Rows are bucketed by their nearest centroid. A query scores only the rows in
+    its ``nprobe`` closest buckets, trading a little recall for sub-linear work.
+    Bucket membership is stored CSR-style: ``rows[offsets[i]:offsets[i + 1]]`` are
+    the row ids in list ``i``.
+    """
+
+    def __init__(self, centroids: np.ndarray, labels: np.ndarray, default_nprobe: int):
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self.default_nprobe = max(1, min(default_nprobe, self.n_lists))
+        self.rows = np.argsort(self.labels, kind='stable').astype(np.int64)
+        counts = np.bincount(self.labels, minlength=self.n_lists)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    @property
+    def n_lists(self) -> int:
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        *,
+        n_lists: int = 0,
+        nprobe: int = 64,
+        iterations: int = 10,
+        train_size: int = 262144,
+        seed: int = 0,
+    ) -> IVFIndex:
+        """Train centroids on a sample of ``matrix`` and assign every row to a list.
+
+        ``n_lists`` of 0 picks roughly ``sqrt(N)`` lists, the usual IVF starting point.
+        """
+        rows = matrix.shape[0]
+        if not n_lists:
+            n_lists = int(math.sqrt(rows))
+        n_lists = max(1, min(n_lists, rows))
+        rng = np.random.default_rng(seed)
+        sample = matrix
+        if rows > train_size:
+            sample = matrix[np.sort(rng.choice(rows, size=train_size, replace=False))]
+        centroids = sample[rng.choice(sample.shape[0], size=n_lists, replace=False)].astype(np.float32)
+
+        for _ in range(iterations):
+            labels = _nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=n_lists)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty lists from random rows so every list stays useful.
+                sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()), replace=False)]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        return cls(centroids, _nearest(matrix, centroids), nprobe)
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        return _nearest(vectors, self.centroids)
+
+    def with_labels(self, labels: np.ndarray) -> IVFIndex:
+        """Same quantizer over a different row set, e.g. after an incremental index patch."""
+        return IVFIndex(self.centroids, labels, self.default_nprobe)
+
+    def candidates(self, query: np.ndarray, nprobe: int | None = None) -> np.ndarray:
+        """Row ids in the ``nprobe`` lists whose centroids are closest to ``query``."""
+        nprobe = max(1, min(nprobe or self.default_nprobe, self.n_lists))
+        centroid_scores = self.centroids @ query
+        if nprobe < self.n_lists:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.n_lists)
+        return np.concatenate([self.rows[self.offsets[probe]:self.offsets[probe + 1]] for probe in probes])
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], _ASSIGN_BLOCK_ROWS):
+        block = vectors[start:start + _ASSIGN_BLOCK_ROWS]
+        labels[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return labels
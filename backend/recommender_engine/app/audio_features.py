@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Iterator, Sequence
+
+import numpy as np
+
+# Written by the backend's export_audio_features command; see
+# recommender/services/audio_export.py for the layout. NumPy-only so notebooks can import it too.
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+FEATURE_COLUMNS = (
+    'energy',
+    'valence',
+    'tempo',
+    'danceability',
+    'acousticness',
+    'instrumentalness',
+    'liveness',
+    'speechiness',
+    'loudness',
+    'key',
+    'mode',
+    'time_signature',
+)
+
+
+def read_manifest(directory: str | Path) -> dict:
+    manifest = json.loads((Path(directory) / MANIFEST_FILE).read_text())
+    if manifest.get('format') != FORMAT_VERSION:
+        raise ValueError(f'Audio-feature export in {directory} has format {manifest.get("format")}; expected {FORMAT_VERSION}')
+    return manifest
+
+
+def iter_chunks(directory: str | Path, columns: Sequence[str] | None = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield each chunk as ``{column: array}``, memory-mapped read-only so nothing is copied up front."""
+    manifest = read_manifest(directory)
+    columns = list(columns or manifest['columns'])
+    for chunk in manifest['chunks']:
+        root = Path(directory) / chunk['name']
+        yield {column: np.load(root / f'{column}.npy', mmap_mode='r') for column in columns}
+
+
+def load_audio_features(directory: str | Path, columns: Sequence[str] | None = None) -> Dict[str, np.ndarray]:
+    """Every exported track once, as ``{column: array}`` aligned by row.
+
+    A track re-exported after its features changed keeps only its latest row. A
+    single chunk with no repeats is returned still memory-mapped.
+    """
+    columns = list(columns or read_manifest(directory)['columns'])
+    wanted = columns if 'track_ids' in columns else ['track_ids', *columns]
+    chunks = list(iter_chunks(directory, wanted))
+    if not chunks:
+        return {column: np.zeros(0) for column in columns}
+    track_ids = np.concatenate([chunk['track_ids'] for chunk in chunks])
+    # Last occurrence wins: unique over the reversed ids gives each track's final position.
+    _, reversed_first = np.unique(track_ids[::-1], return_index=True)
+    keep = np.sort(track_ids.size - 1 - reversed_first)
+    if len(chunks) == 1 and keep.size == track_ids.size:
+        return {column: chunks[0][column] for column in columns}
+    data = {}
+    for column in columns:
+        merged = np.concatenate([chunk[column] for chunk in chunks])
+        data[column] = merged if keep.size == merged.shape[0] else merged[keep]
+    return data
+
+
+def feature_matrix(data: Dict[str, np.ndarray], columns: Sequence[str] = FEATURE_COLUMNS) -> np.ndarray:
+    """Stack feature columns into an (N, len(columns)) float32 matrix for training."""
+    return np.column_stack([np.asarray(data[column], dtype=np.float32) for column in columns])
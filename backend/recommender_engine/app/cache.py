@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+def canonical_key(payload: Dict[str, Any]) -> str:
+    """Stable digest of a JSON-serializable payload; callers sort order-insensitive lists first."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class ResultCache:
+    """Thread-safe LRU cache with per-entry TTL and single-flight computation.
+
+    Entries are tagged with the generation they were computed for (the engine uses
+    the index version); the first lookup with a newer generation drops everything.
+    Concurrent misses on the same key wait for one computation instead of repeating
+    it. ``max_entries`` of 0 disables storage but keeps single-flight; values for which
+    ``cacheable`` returns False are handed to waiting callers but not stored.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, *, clock: Callable[[], float] = time.monotonic):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._generation: Any = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        *,
+        generation: Any = None,
+        cacheable: Callable[[Any], bool] | None = None,
+    ) -> Any:
+        with self._lock:
+            if generation != self._generation:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._generation = generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.collapsed += 1
+                leader = False
+            else:
+                flight = self._inflight[key] = _Flight()
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                store = flight.error is None and (cacheable is None or cacheable(flight.value))
+                if store and self._max_entries > 0 and generation == self._generation:
+                    self._entries[key] = (self._clock() + self._ttl, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self._max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+            flight.done.set()
+        return flight.value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.collapsed
+            return {
+                'entries': len(self._entries),
+                'max_entries': self._max_entries,
+                'ttl_seconds': self._ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'collapsed': self.collapsed,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                # Collapsed requests were served without their own computation, so they count as hits here.
+                'hit_ratio': round((self.hits + self.collapsed) / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from functools import lru_cache
+from typing import List, Sequence
+
+import numpy as np
+
+# Distinct tokens whose digests are kept between calls; genre and artist names repeat constantly.
+TOKEN_CACHE_SIZE = int(os.environ.get('RECOMMENDER_TOKEN_CACHE_SIZE', '65536'))
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha1(token.encode('utf-8')).digest()
+
+
+def _digest_matrix(tokens: Sequence[str], dim: int) -> np.ndarray:
+    width = min(dim, hashlib.sha1().digest_size)
+    digests = b''.join(_token_digest(token)[:width] for token in tokens)
+    return np.frombuffer(digests, dtype=np.uint8).reshape(len(tokens), width)
+
+
+def _normalized(sums: np.ndarray, dim: int) -> np.ndarray:
+    vector = np.zeros(dim)
+    vector[:sums.shape[0]] = sums
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector = vector / norm
+    return vector
+
+
+def hash_tokens(tokens: Sequence[str], dim: int) -> np.ndarray:
+    """Sum the leading bytes of each token's SHA-1 digest into a ``dim`` vector and L2-normalize it.
+
+    Digest bytes are summed as integers, so the float64 result is bit-identical to
+    adding them one token at a time regardless of order.
+    """
+    if not tokens:
+        tokens = ['unknown']
+    return _normalized(_digest_matrix(tokens, dim).sum(axis=0, dtype=np.int64), dim)
+
+
+def hash_token_lists(token_lists: Sequence[Sequence[str]], dim: int) -> np.ndarray:
+    """``hash_tokens`` for many token lists at once, one row per list."""
+    if not token_lists:
+        return np.zeros((0, dim))
+    token_lists = [list(tokens) or ['unknown'] for tokens in token_lists]
+    flat: List[str] = [token for tokens in token_lists for token in tokens]
+    offsets = np.cumsum([0] + [len(tokens) for tokens in token_lists[:-1]])
+    sums = np.add.reduceat(_digest_matrix(flat, dim).astype(np.int64), offsets, axis=0)
+    vectors = np.zeros((len(token_lists), dim))
+    vectors[:, :sums.shape[1]] = sums
+    # Squares of integer-valued sums add up exactly, so these norms match np.linalg.norm per row.
+    norms = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+    nonzero = norms > 0
+    vectors[nonzero] /= norms[nonzero, None]
+    return vectors
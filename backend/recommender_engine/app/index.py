@@ -0,0 +1,688 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from .ann import IVFIndex
+from .metrics import observe, timed
+from .quant import ScalarQuantizer, estimate_recall, spill
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+_BINARY_TYPES = (bytes, bytearray, memoryview)
+_STORED_DTYPE = np.dtype('<f4')
+
+
+def _as_array(raw_vector: Sequence[float] | bytes | None) -> np.ndarray:
+    if isinstance(raw_vector, _BINARY_TYPES):
+        return np.frombuffer(raw_vector, dtype=_STORED_DTYPE, count=len(raw_vector) // _STORED_DTYPE.itemsize)
+    if raw_vector is None:
+        return np.zeros(0, dtype=np.float32)
+    return np.asarray(raw_vector, dtype=np.float32)
+
+
+def _fit_dim(raw_vector: Sequence[float] | bytes | None, dim: int) -> np.ndarray:
+    values = _as_array(raw_vector).astype(np.float32, copy=False)
+    if values.size < dim:
+        values = np.pad(values, (0, dim - values.size))
+    elif values.size > dim:
+        values = values[:dim]
+    return values
+
+
+def _decode_matrix(raw_vectors: List[Any], dim: int) -> np.ndarray:
+    """Stack raw vectors into an (N, dim) float32 matrix.
+
+    When every vector is a packed float32 blob of the expected width the blobs are
+    joined once and viewed with ``np.frombuffer``; anything else is fitted row by row.
+    """
+    width = dim * _STORED_DTYPE.itemsize
+    if raw_vectors and all(isinstance(raw, _BINARY_TYPES) and len(raw) == width for raw in raw_vectors):
+        matrix = np.frombuffer(b''.join(raw_vectors), dtype=_STORED_DTYPE).reshape(len(raw_vectors), dim)
+        return matrix.astype(np.float32, copy=False)
+    if not raw_vectors:
+        return np.zeros((0, dim), dtype=np.float32)
+    return np.vstack([_fit_dim(raw, dim) for raw in raw_vectors])
+
+
+def _normalize_rows(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Positions of the rows with a usable norm, and those rows L2-normalized.
+
+    Full loads and patches both go through here: a 1-D ``np.linalg.norm`` takes a
+    different summation path and can differ by an ulp, which would make unchanged
+    rows look modified on every refresh.
+    """
+    norms = np.linalg.norm(matrix, axis=1)
+    valid = np.flatnonzero((norms > 0) & np.isfinite(norms))
+    return valid, matrix[valid] / norms[valid, None]
+
+
+def _normalized_row(row: Dict[str, Any], dim: int) -> np.ndarray | None:
+    if not isinstance(row.get('name'), str):
+        return None
+    valid, normalized = _normalize_rows(_fit_dim(row.get('vector'), dim)[None, :])
+    return normalized[0] if valid.size else None
+
+
+_NO_ROWS = np.zeros(0, dtype=np.int64)
+
+
+class NameIndex:
+    """Lowercased name -> row ids, stored as sorted 64-bit hashes rather than a dict of strings.
+
+    Lookups hash the query names, binary-search the hash array, and confirm each hit
+    against the real name so a hash collision can never exclude an unrelated row.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        hashes = np.fromiter((hash(name.lower()) for name in names), dtype=np.int64, count=len(names))
+        self.order = np.argsort(hashes, kind='stable')
+        self.hashes = hashes[self.order]
+
+    def rows(self, keys: Iterable[str], names: Sequence[str]) -> np.ndarray:
+        keys = set(keys)
+        if not keys or not self.hashes.size:
+            return _NO_ROWS
+        lookups = np.fromiter((hash(key) for key in keys), dtype=np.int64, count=len(keys))
+        left = np.searchsorted(self.hashes, lookups, side='left')
+        right = np.searchsorted(self.hashes, lookups, side='right')
+        hits = [self.order[low:high] for low, high in zip(left, right) if high > low]
+        if not hits:
+            return _NO_ROWS
+        rows = np.concatenate(hits)
+        return rows[[names[row].lower() in keys for row in rows]]
+
+
+@dataclass
+class ResourceIndex:
+    """Resident, pre-normalized embedding matrix for one resource type.
+
+    Row ``i`` of ``matrix`` belongs to ``names[i]``/``spotify_ids[i]``; rows are
+    L2-normalized at build time so cosine similarity is a single mat-vec product.
+    """
+
+    resource_type: str
+    matrix: np.ndarray
+    item_ids: List[int | None] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+    spotify_ids: List[str | None] = field(default_factory=list)
+    model_versions: List[str | None] = field(default_factory=list)
+    quality_scores: List[float | None] = field(default_factory=list)
+    metadata: List[Dict[str, Any]] = field(default_factory=list)
+    default_model_version: str = ''
+    # Newest ``modified_at`` seen among the rows; incremental refreshes resume from here.
+    watermark: datetime | None = None
+    # Approximate index over ``matrix``; None means every search is exact.
+    ann: IVFIndex | None = None
+    # int8 codes for coarse scoring; when set, ``matrix`` is only read to re-rank
+    # the best ``rerank`` coarse candidates and is usually memory-mapped.
+    quantizer: ScalarQuantizer | None = None
+    rerank: int = 256
+    spill_dir: str | None = None
+    # Recall@10 of quantized search against exact float32 search, measured at build time.
+    quantized_recall: float | None = None
+    # Built from ``names`` when the index is constructed; seed exclusion looks rows up here.
+    name_index: NameIndex | None = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.name_index is None:
+            self.name_index = NameIndex(self.names)
+
+    @classmethod
+    def from_rows(
+        cls,
+        resource_type: str,
+        rows: Iterable[Dict[str, Any]],
+        *,
+        dim: int,
+        default_model_version: str = '',
+    ) -> ResourceIndex:
+        rows = [row for row in rows if isinstance(row.get('name'), str)]
+        matrix = _decode_matrix([row.get('vector') for row in rows], dim)
+        valid, matrix = _normalize_rows(matrix)
+        rows = [rows[position] for position in valid]
+        item_ids, names, spotify_ids, model_versions, quality_scores, metadata = (
+            [list(column) for column in zip(*map(cls._column_values, rows))] if rows else [[] for _ in range(6)]
+        )
+        modified = [row['modified_at'] for row in rows if row.get('modified_at') is not None]
+        return cls(
+            resource_type=resource_type,
+            matrix=np.ascontiguousarray(matrix, dtype=np.float32),
+            item_ids=item_ids,
+            names=names,
+            spotify_ids=spotify_ids,
+            model_versions=model_versions,
+            quality_scores=quality_scores,
+            metadata=metadata,
+            default_model_version=default_model_version,
+            watermark=max(modified) if modified else None,
+        )
+
+    def patched(self, rows: Iterable[Dict[str, Any]]) -> ResourceIndex:
+        """Upsert ``rows`` by ``item_id`` into a copy of this index.
+
+        Rows whose vector is missing or degenerate are dropped, so a patch can also
+        remove an item that was previously indexed. When nothing but the watermark
+        changes, ``self`` is returned (with its watermark advanced) so callers can
+        tell that no swap is needed.
+        """
+        dim = self.matrix.shape[1]
+        watermark = self.watermark
+        updates: Dict[Any, tuple[Dict[str, Any], np.ndarray | None]] = {}
+        anonymous: List[tuple[Dict[str, Any], np.ndarray]] = []
+        for row in rows:
+            modified_at = row.get('modified_at')
+            if modified_at is not None and (watermark is None or modified_at > watermark):
+                watermark = modified_at
+            vector = _normalized_row(row, dim)
+            if row.get('item_id') is None:
+                if vector is not None:
+                    anonymous.append((row, vector))
+            else:
+                updates[row['item_id']] = (row, vector)
+
+        keep = np.ones(len(self), dtype=bool)
+        replaced: Dict[int, tuple[Dict[str, Any], np.ndarray]] = {}
+        for position, item_id in enumerate(self.item_ids):
+            update = updates.pop(item_id, None) if item_id is not None else None
+            if update is None:
+                continue
+            row, vector = update
+            if vector is None:
+                keep[position] = False
+            elif not self._row_matches(position, row, vector):
+                replaced[position] = (row, vector)
+        appended = [(row, vector) for row, vector in updates.values() if vector is not None] + anonymous
+
+        if not replaced and not appended and keep.all():
+            self.watermark = watermark
+            return self
+
+        columns = self._columns()
+        matrix = np.array(self.matrix, dtype=np.float32)
+        for position, (row, vector) in replaced.items():
+            matrix[position] = vector
+            for values, value in zip(columns, self._column_values(row)):
+                values[position] = value
+        matrix = matrix[keep]
+        columns = [[value for value, kept in zip(values, keep) if kept] for values in columns]
+        appended_matrix = np.asarray([vector for _, vector in appended], dtype=np.float32).reshape(-1, dim)
+        if appended:
+            matrix = np.vstack([matrix, appended_matrix])
+            for row, _ in appended:
+                for values, value in zip(columns, self._column_values(row)):
+                    values.append(value)
+
+        ann = None
+        if self.ann is not None:
+            # Keep the trained quantizer and only (re)assign rows that changed.
+            labels = self.ann.labels.copy()
+            if replaced:
+                changed = np.fromiter(replaced, dtype=np.int64)
+                labels[changed] = self.ann.assign(np.asarray([vector for _, vector in replaced.values()]))
+            labels = np.concatenate([labels[keep], self.ann.assign(appended_matrix)])
+            ann = self.ann.with_labels(labels)
+
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        quantizer = None
+        if self.quantizer is not None:
+            # Rows outside the trained range clip to the int8 limits; re-ranking absorbs the error.
+            quantizer = self.quantizer.with_codes(matrix)
+            matrix = spill(matrix, self.spill_dir)
+
+        item_ids, names, spotify_ids, model_versions, quality_scores, metadata = columns
+        return replace(
+            self,
+            matrix=matrix,
+            item_ids=item_ids,
+            names=names,
+            spotify_ids=spotify_ids,
+            model_versions=model_versions,
+            quality_scores=quality_scores,
+            metadata=metadata,
+            watermark=watermark,
+            ann=ann,
+            quantizer=quantizer,
+            name_index=None,
+        )
+
+    def subset(self, rows: np.ndarray) -> ResourceIndex:
+        """A plain copy holding only ``rows``; ANN and quantization are re-applied by the caller."""
+        pick = rows.tolist()
+        return ResourceIndex(
+            resource_type=self.resource_type,
+            matrix=np.ascontiguousarray(self.matrix[rows], dtype=np.float32),
+            item_ids=[self.item_ids[row] for row in pick],
+            names=[self.names[row] for row in pick],
+            spotify_ids=[self.spotify_ids[row] for row in pick],
+            model_versions=[self.model_versions[row] for row in pick],
+            quality_scores=[self.quality_scores[row] for row in pick],
+            metadata=[self.metadata[row] for row in pick],
+            default_model_version=self.default_model_version,
+            watermark=self.watermark,
+        )
+
+    def with_ann(self, *, min_rows: int, n_lists: int = 0, nprobe: int = 64) -> ResourceIndex:
+        """Attach an IVF index when the table has at least ``min_rows`` rows; ``min_rows`` 0 never does."""
+        if min_rows <= 0 or len(self) < min_rows:
+            return self
+        return replace(self, ann=IVFIndex.build(self.matrix, n_lists=n_lists, nprobe=nprobe))
+
+    def with_quantization(
+        self,
+        *,
+        rerank: int = 256,
+        spill_dir: str | None = None,
+        recall_queries: int = 32,
+    ) -> ResourceIndex:
+        """Score with int8 codes and keep the float32 matrix only for re-ranking.
+
+        The float matrix is moved to an unlinked temp file under ``spill_dir`` (a
+        snapshot matrix is already mapped) so resident memory is roughly the codes.
+        """
+        quantizer = ScalarQuantizer.fit(self.matrix)
+        recall = estimate_recall(self.matrix, quantizer, rerank=rerank, queries=recall_queries)
+        return replace(
+            self,
+            matrix=spill(self.matrix, spill_dir),
+            quantizer=quantizer,
+            rerank=max(rerank, 1),
+            spill_dir=spill_dir,
+            quantized_recall=recall,
+        )
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Bytes held by the index's vectors, split into resident and memory-mapped."""
+        float_bytes = int(self.matrix.nbytes)
+        mapped = isinstance(self.matrix, np.memmap)
+        resident = 0 if mapped else float_bytes
+        stats: Dict[str, Any] = {
+            'rows': len(self),
+            'dim': int(self.matrix.shape[1]),
+            'float32_bytes': float_bytes,
+            'float32_mapped': mapped,
+            'ann_lists': self.ann.n_lists if self.ann is not None else 0,
+            'quantized': self.quantizer is not None,
+        }
+        if self.quantizer is not None:
+            resident += self.quantizer.nbytes
+            stats.update({
+                'int8_bytes': int(self.quantizer.nbytes),
+                'rerank': self.rerank,
+                'recall_at_10': self.quantized_recall,
+                'recall_loss': None if self.quantized_recall is None else round(1.0 - self.quantized_recall, 4),
+            })
+        stats['resident_bytes'] = resident
+        stats['savings_ratio'] = round(float_bytes / resident, 2) if resident else None
+        return stats
+
+    def _columns(self) -> List[List[Any]]:
+        return [
+            list(self.item_ids),
+            list(self.names),
+            list(self.spotify_ids),
+            list(self.model_versions),
+            list(self.quality_scores),
+            list(self.metadata),
+        ]
+
+    @staticmethod
+    def _column_values(row: Dict[str, Any]) -> tuple:
+        return (
+            row.get('item_id'),
+            row.get('name'),
+            row.get('spotify_id'),
+            row.get('model_version'),
+            row.get('quality_score'),
+            row.get('metadata') or {},
+        )
+
+    def _row_matches(self, position: int, row: Dict[str, Any], vector: np.ndarray) -> bool:
+        current = (
+            self.item_ids[position],
+            self.names[position],
+            self.spotify_ids[position],
+            self.model_versions[position],
+            self.quality_scores[position],
+            self.metadata[position],
+        )
+        return current == self._column_values(row) and np.array_equal(self.matrix[position], vector)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def search(
+        self,
+        user_vector: np.ndarray,
+        *,
+        limit: int,
+        exclude: set[str],
+        nprobe: int | None = None,
+        exact: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Return the ``limit`` best rows by cosine similarity, skipping excluded names.
+
+        With an ANN index attached only the ``nprobe`` closest lists are scored; if they
+        cannot fill ``limit`` results the search falls back to scoring every row.
+        ``exact`` skips both the ANN index and int8 coarse scoring.
+        """
+        if not len(self) or limit <= 0:
+            return []
+        user = np.asarray(user_vector, dtype=np.float32)
+        user_norm = np.linalg.norm(user)
+        if not user_norm:
+            return []
+        user = user / user_norm
+
+        excluded = self.excluded_rows(exclude)
+        if exact:
+            with timed('scoring', self.resource_type):
+                scores = self.matrix @ user
+            return self._select(None, scores, limit, excluded)
+        if self.ann is not None:
+            with timed('scoring', self.resource_type):
+                rows = self.ann.candidates(user, nprobe)
+            ranked = self._ranked(rows, user, limit, excluded)
+            if len(ranked) == limit or rows.shape[0] == len(self):
+                return ranked
+        return self._ranked(None, user, limit, excluded)
+
+    def excluded_rows(self, exclude: Iterable[str]) -> np.ndarray:
+        """Row ids whose lowercased name is in ``exclude``."""
+        return self.name_index.rows(exclude, self.names)
+
+    def _ranked(self, rows: np.ndarray | None, user: np.ndarray, limit: int, excluded: np.ndarray) -> List[Dict[str, Any]]:
+        """Top-``limit`` among ``rows`` (all rows when None), shortlisting on int8 codes when quantized."""
+        if self.quantizer is None:
+            with timed('scoring', self.resource_type):
+                scores = (self.matrix if rows is None else self.matrix[rows]) @ user
+            return self._select(rows, scores, limit, excluded)
+        with timed('scoring', self.resource_type):
+            coarse = self.quantizer.scores(user, rows)
+        with timed('topk', self.resource_type):
+            self._mask(rows, coarse, excluded)
+            shortlist = self._top_k(coarse, min(coarse.shape[0], max(self.rerank, limit)))
+            shortlist = shortlist[coarse[shortlist] != -np.inf]
+            if rows is not None:
+                shortlist = rows[shortlist]
+            # Sorted row order keeps reads from a mapped matrix sequential.
+            shortlist = np.sort(shortlist)
+        with timed('scoring', self.resource_type):
+            scores = self.matrix[shortlist] @ user
+        return self._select(shortlist, scores, limit)
+
+    def search_batch(
+        self,
+        user_vectors: np.ndarray,
+        *,
+        limits: Sequence[int],
+        excludes: Sequence[set[str]],
+        max_block_cells: int = 1 << 26,
+    ) -> List[List[Dict[str, Any]]]:
+        """Exact top-k for many query vectors at once.
+
+        Queries are scored in row blocks with one GEMM per block (sized so a block's
+        score matrix stays under ``max_block_cells`` floats) and each row keeps its
+        own limit and exclusion set. The ANN index is not used here: batch callers
+        want throughput, and one dense GEMM beats many small probes. A quantized
+        index scores the block on int8 codes and re-ranks each row's shortlist.
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in range(user_vectors.shape[0])]
+        if not len(self) or not user_vectors.shape[0]:
+            return results
+        queries = np.asarray(user_vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1)
+        valid = np.flatnonzero(norms > 0)
+        queries = queries[valid] / norms[valid, None]
+        block_rows = max(1, max_block_cells // len(self))
+
+        for start in range(0, valid.shape[0], block_rows):
+            block = valid[start:start + block_rows]
+            block_queries = queries[start:start + block.shape[0]]
+            scoring_started = time.perf_counter()
+            if self.quantizer is not None:
+                scores = self.quantizer.scores_batch(block_queries)
+            else:
+                scores = block_queries @ self.matrix.T
+            observe('scoring', self.resource_type, time.perf_counter() - scoring_started)
+            topk_started = time.perf_counter()
+            for position, row in enumerate(block):
+                excluded = self.excluded_rows(excludes[row])
+                if excluded.size:
+                    scores[position, excluded] = -np.inf
+            widest = max(limits[row] for row in block)
+            if self.quantizer is not None:
+                widest = max(widest, self.rerank)
+            k = min(len(self), max(widest, 1))
+            if k < len(self):
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(len(self)), (block.shape[0], len(self)))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top = np.take_along_axis(top, order, axis=1)
+
+            for position, row in enumerate(block):
+                limit = limits[row]
+                if limit <= 0:
+                    continue
+                candidates = top[position]
+                candidate_scores = scores[position, candidates]
+                kept = candidate_scores != -np.inf
+                candidates, candidate_scores = candidates[kept], candidate_scores[kept]
+                if self.quantizer is not None:
+                    candidate_scores = self.matrix[candidates] @ block_queries[position]
+                    order = np.argsort(-candidate_scores, kind='stable')
+                    candidates, candidate_scores = candidates[order], candidate_scores[order]
+                results[row] = [
+                    self._item(candidate, score) for candidate, score in zip(candidates[:limit], candidate_scores[:limit])
+                ]
+            # Per-row re-ranking of a quantized shortlist is counted here with the selection it feeds.
+            observe('topk', self.resource_type, time.perf_counter() - topk_started)
+        return results
+
+    @staticmethod
+    def _mask(rows: np.ndarray | None, scores: np.ndarray, excluded: np.ndarray) -> None:
+        if not excluded.size:
+            return
+        if rows is None:
+            scores[excluded] = -np.inf
+        else:
+            scores[np.isin(rows, excluded)] = -np.inf
+
+    def _select(
+        self,
+        rows: np.ndarray | None,
+        scores: np.ndarray,
+        limit: int,
+        excluded: np.ndarray | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Top-``limit`` of ``scores``, where ``scores[i]`` belongs to ``rows[i]`` (or row ``i`` when ``rows`` is None).
+
+        Excluded rows are masked to -inf before the partition, so a single top-k
+        pass is enough however many rows the excluded names cover.
+        """
+        with timed('topk', self.resource_type):
+            if excluded is not None:
+                self._mask(rows, scores, excluded)
+            ranked: List[Dict[str, Any]] = []
+            for position in self._top_k(scores, min(scores.shape[0], limit)):
+                if scores[position] == -np.inf:
+                    continue
+                row = position if rows is None else int(rows[position])
+                ranked.append(self._item(row, scores[position]))
+            return ranked
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        if k < scores.shape[0]:
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(scores.shape[0])
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    def _item(self, row: int, score: float) -> Dict[str, Any]:
+        score = float(score)
+        if np.isnan(score):
+            score = 0.0
+        return {
+            'name': self.names[row],
+            'likeness': round(max(0.0, min(score, 1.0)), 2),
+            'extra': self._extra(row),
+            # Unrounded, for callers that merge rankings; RecommendationItem does not serialize it.
+            'score': score,
+        }
+
+    def _extra(self, row: int) -> Dict[str, Any]:
+        extra: Dict[str, Any] = {
+            'spotify_id': self.spotify_ids[row],
+            'model_version': self.model_versions[row] or self.default_model_version,
+        }
+        quality = self.quality_scores[row]
+        if quality is not None:
+            extra['quality_score'] = quality
+        metadata = self.metadata[row]
+        if metadata:
+            extra['metadata'] = metadata
+        return extra
+
+
+class IndexStore:
+    """Holds one ``ResourceIndex`` per resource type and swaps in refreshed copies.
+
+    Readers grab whatever index is current; refreshes build the replacement off to
+    the side and publish it with a single reference assignment, so queries never
+    see a half-patched index and never wait on a reload.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], ResourceIndex],
+        *,
+        changes: Callable[[str, datetime], List[Dict[str, Any]]] | None = None,
+        deletions: Callable[[str], Any] | None = None,
+        generation: Callable[[], Any] | None = None,
+        full_reload_seconds: float = 0,
+        overlap_seconds: float = 0,
+    ):
+        self._loader = loader
+        self._changes = changes
+        # Deleted rows leave no modified_at trail; a change in the source's deletion marker forces a full load.
+        self._deletions = deletions
+        self._deletion_marks: Dict[str, Any] = {}
+        # Identifies the loader's source (e.g. a snapshot version); a change forces a full load.
+        self._generation = generation
+        self._generations: Dict[str, Any] = {}
+        self._full_reload_seconds = full_reload_seconds
+        self._overlap = timedelta(seconds=overlap_seconds)
+        self._indexes: Dict[str, ResourceIndex] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # Lazy first loads take a per-type lock so cold requests for several types load them concurrently.
+        self._first_load_locks: Dict[str, threading.Lock] = {}
+        self._publish_lock = threading.Lock()
+        self.version = 0
+
+    def get(self, resource_type: str) -> ResourceIndex:
+        index = self._indexes.get(resource_type)
+        if index is not None:
+            return index
+        with self._lock:
+            first_load_lock = self._first_load_locks.setdefault(resource_type, threading.Lock())
+        with first_load_lock:
+            index = self._indexes.get(resource_type)
+            if index is None:
+                index = self._load(resource_type)
+            return index
+
+    def loaded_types(self) -> List[str]:
+        return list(self._indexes)
+
+    def reload(self, resource_types: Iterable[str]) -> Dict[str, int]:
+        with self._lock:
+            return {resource_type: len(self._load(resource_type)) for resource_type in resource_types}
+
+    def refresh(self, resource_type: str) -> bool:
+        """Patch rows changed since the index watermark; return True when a new index was swapped in."""
+        with self._lock:
+            current = self._indexes.get(resource_type)
+            if current is None:
+                return False
+            stale = (
+                self._full_reload_seconds
+                and time.monotonic() - self._loaded_at[resource_type] >= self._full_reload_seconds
+            )
+            if self._generation is not None and self._generation() != self._generations.get(resource_type):
+                stale = True
+            if self._deletions is not None and self._deletions(resource_type) != self._deletion_marks.get(resource_type):
+                stale = True
+            if stale or (self._changes is None and self._generation is None):
+                self._load(resource_type)
+                return True
+            if self._changes is None:
+                return False
+
+            since = current.watermark - self._overlap if current.watermark is not None else _EPOCH
+            rows = self._changes(resource_type, since)
+            patched = current.patched(rows)
+            if patched is current:
+                return False
+            self._publish(resource_type, patched)
+            logger.info('Patched %s index with %d changed rows (%d rows total)', resource_type, len(rows), len(patched))
+            return True
+
+    def _load(self, resource_type: str) -> ResourceIndex:
+        if self._generation is not None:
+            self._generations[resource_type] = self._generation()
+        if self._deletions is not None:
+            # Read before loading: a delete that lands mid-load moves the marker and triggers another load.
+            self._deletion_marks[resource_type] = self._deletions(resource_type)
+        index = self._loader(resource_type)
+        self._loaded_at[resource_type] = time.monotonic()
+        self._publish(resource_type, index)
+        logger.info('Loaded %s index with %d rows', resource_type, len(index))
+        return index
+
+    def _publish(self, resource_type: str, index: ResourceIndex) -> None:
+        with self._publish_lock:
+            self._indexes[resource_type] = index
+            self.version += 1
+
+
+class IndexRefresher:
+    """Background thread that periodically refreshes every loaded index."""
+
+    def __init__(self, store: IndexStore, interval_seconds: float):
+        self._store = store
+        self._interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='index-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._interval)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            for resource_type in self._store.loaded_types():
+                try:
+                    self._store.refresh(resource_type)
+                except Exception:
+                    logger.exception('Index refresh failed for %s', resource_type)
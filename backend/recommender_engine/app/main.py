@@ -1,47 +1,115 @@
 from __future__ import annotations
 
-import hashlib
 import logging
 import os
+import resource
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Any, Dict, List, Sequence
 
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel, Field
-from psycopg.rows import dict_row
-from psycopg_pool import ConnectionPool
+
+from .cache import ResultCache, canonical_key
+from .hashing import hash_token_lists, hash_tokens
+from .index import IndexRefresher, IndexStore, ResourceIndex
+from .metrics import REGISTRY, EngineCollector, timed
+from .shards import ShardCoordinator, ShardSpec, merge_ranked
+from .sources import (
+    EmbeddingSource,
+    PostgresSource,
+    ShardedSource,
+    SnapshotSource,
+    SourceUnavailable,
+    SyntheticSource,
+    database_conninfo,
+    parse_synthetic_rows,
+)
 
 MODEL_VERSION = os.environ.get('RECOMMENDER_MODEL_VERSION', 'v1.0.0')
 VECTOR_DIM = int(os.environ.get('RECOMMENDER_VECTOR_DIM', '32'))
 DB_POOL_MIN = int(os.environ.get('RECOMMENDER_DB_POOL_MIN', '1'))
 DB_POOL_MAX = int(os.environ.get('RECOMMENDER_DB_POOL_MAX', '10'))
+RESOURCE_TYPES = ('artists', 'albums', 'tracks')
+# How often the background refresher polls for embeddings changed since the index watermark (0 disables).
+INDEX_REFRESH_SECONDS = float(os.environ.get('RECOMMENDER_INDEX_REFRESH_SECONDS', '30'))
+# Re-read rows this far behind the watermark so writes committed out of order are not missed.
+INDEX_REFRESH_OVERLAP_SECONDS = float(os.environ.get('RECOMMENDER_INDEX_REFRESH_OVERLAP_SECONDS', '5'))
+# Periodic full rebuild as a backstop for catalog renames and other changes outside the embedding tables.
+INDEX_FULL_RELOAD_SECONDS = float(os.environ.get('RECOMMENDER_INDEX_FULL_RELOAD_SECONDS', '3600'))
+# Tables with at least this many rows get an IVF index; 0 (the default) searches every table exactly.
+# On the engine's hashed-token vectors exact search is faster than ANN at the recall floor below
+# 100k rows and only about 2x slower at 1M (bench/README.md), so ANN is opt-in.
+ANN_MIN_ROWS = int(os.environ.get('RECOMMENDER_ANN_MIN_ROWS', '0'))
+# Number of IVF lists (0 = about sqrt(rows)) and lists probed per query when the request does not say.
+# nprobe 64 keeps recall@10 at 0.95 or better on hashed-token vectors at 100k-1M rows with sqrt(rows) lists.
+ANN_LISTS = int(os.environ.get('RECOMMENDER_ANN_LISTS', '0'))
+ANN_NPROBE = int(os.environ.get('RECOMMENDER_ANN_NPROBE', '64'))
+# Upper bounds on profiles per /recommend/batch call and items per /embed/batch call; clients chunk larger jobs.
+BATCH_MAX_REQUESTS = int(os.environ.get('RECOMMENDER_BATCH_MAX_REQUESTS', '1000'))
+EMBED_BATCH_MAX_ITEMS = int(os.environ.get('RECOMMENDER_EMBED_BATCH_MAX_ITEMS', '1000'))
+# Directory written by the backend's export_embedding_snapshot command. When set, indexes are
+# memory-mapped from the CURRENT snapshot (shared by every worker on the host) and reloaded when
+# the version rotates, instead of being patched from Postgres; until a snapshot exists the
+# engine loads from Postgres as usual.
+SNAPSHOT_DIR = os.environ.get('RECOMMENDER_SNAPSHOT_DIR', '')
+# postgres | snapshot | synthetic. Defaults to snapshot when RECOMMENDER_SNAPSHOT_DIR is set, else postgres;
+# only the postgres source (or the snapshot source's implicit fallback) opens a database pool.
+EMBEDDING_SOURCE_KIND = os.environ.get('RECOMMENDER_EMBEDDING_SOURCE', '').strip().lower()
+# Rows per resource type for the synthetic source: "100000" or "artists=1000,albums=5000,tracks=10000000".
+SYNTHETIC_ROWS = os.environ.get('RECOMMENDER_SYNTHETIC_ROWS', '100000')
+SYNTHETIC_SEED = int(os.environ.get('RECOMMENDER_SYNTHETIC_SEED', '0'))
+# Resource types scored on int8 codes (e.g. "tracks"); the best RERANK_CANDIDATES coarse hits are
+# re-scored in float32, read from a matrix spilled to an unlinked file under SPILL_DIR.
+QUANTIZED_TYPES = {value.strip() for value in os.environ.get('RECOMMENDER_QUANTIZED_TYPES', '').split(',') if value.strip()}
+RERANK_CANDIDATES = int(os.environ.get('RECOMMENDER_RERANK_CANDIDATES', '256'))
+SPILL_DIR = os.environ.get('RECOMMENDER_SPILL_DIR') or None
+# /recommend responses cached per seed set and index version (0 entries disables caching).
+RESULT_CACHE_SIZE = int(os.environ.get('RECOMMENDER_RESULT_CACHE_SIZE', '4096'))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('RECOMMENDER_RESULT_CACHE_TTL_SECONDS', '300'))
+# /recommend ranks each requested resource type on its own thread from this shared pool.
+RANK_WORKERS = int(os.environ.get('RECOMMENDER_RANK_WORKERS', str(min(32, (os.cpu_count() or 1) * 2))))
+# Default per-request ranking budget for /recommend (0 = wait for every type). Types that miss it come
+# back empty and are listed in missing_types; such partial responses are never cached.
+RECOMMEND_DEADLINE_SECONDS = float(os.environ.get('RECOMMENDER_RECOMMEND_DEADLINE_SECONDS', '0'))
+# "<index>/<count>": serve only the items whose spotify_id hashes into this shard's range of the key space.
+SHARD = ShardSpec.parse(os.environ['RECOMMENDER_SHARD']) if os.environ.get('RECOMMENDER_SHARD') else None
+# Comma-separated shard engine URLs. When set this process is a coordinator: it loads no index and answers
+# /recommend by merging the shards' top-k lists; shards that fail or time out are reported in missing_shards.
+SHARD_URLS = [url.strip() for url in os.environ.get('RECOMMENDER_SHARD_URLS', '').split(',') if url.strip()]
+SHARD_TIMEOUT_SECONDS = float(os.environ.get('RECOMMENDER_SHARD_TIMEOUT_SECONDS', '2'))
 
 logger = logging.getLogger(__name__)
 
 
-def _database_conninfo() -> str:
-    url = os.environ.get('DATABASE_URL')
-    if url:
-        return url
-    name = os.environ.get('POSTGRES_NAME', 'postgres')
-    user = os.environ.get('POSTGRES_USER', 'postgres')
-    password = os.environ.get('POSTGRES_PASSWORD', 'postgres')
-    host = os.environ.get('POSTGRES_HOST') or os.environ.get('POSTGRES_HOSTNAME') or 'db'
-    port = os.environ.get('POSTGRES_PORT')
-    if not port:
-        raise ValueError("POSTGRES_PORT must be set")
-    return f"dbname={name} user={user} password={password} host={host} port={port}"
-
-
-DB_POOL = ConnectionPool(
-    conninfo=_database_conninfo(),
-    min_size=DB_POOL_MIN,
-    max_size=DB_POOL_MAX,
-    open=False,
-)
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    if SHARD_COORDINATOR is not None:
+        yield
+        SHARD_COORDINATOR.close()
+        RANK_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+        return
+    try:
+        INDEX_STORE.reload(RESOURCE_TYPES)
+    except Exception:
+        # The DB may not be migrated yet; indexes load lazily on first request instead.
+        logger.warning('Initial index load failed; deferring to first request', exc_info=True)
+    INDEX_REFRESHER.start()
+    yield
+    INDEX_REFRESHER.stop()
+    RANK_EXECUTOR.shutdown(wait=False, cancel_futures=True)
 
-app = FastAPI(title='Juke Recommender Engine')
+
+app = FastAPI(title='Juke Recommender Engine', lifespan=_lifespan)
+
+
+@app.exception_handler(SourceUnavailable)
+async def _source_unavailable(_request: Request, _exc: SourceUnavailable):
+    return JSONResponse(status_code=503, content={'detail': 'Recommender data unavailable'})
 
 
 class EmbedRequest(BaseModel):
@@ -56,6 +124,14 @@ class EmbedResponse(BaseModel):
     metadata: Dict[str, str] = Field(default_factory=dict)
 
 
+class EmbedBatchRequest(BaseModel):
+    items: List[EmbedRequest] = Field(..., max_length=EMBED_BATCH_MAX_ITEMS)
+
+
+class EmbedBatchResponse(BaseModel):
+    vectors: List[EmbedResponse] = Field(default_factory=list)
+
+
 class RecommendationRequest(BaseModel):
     artists: List[str] = Field(default_factory=list)
     albums: List[str] = Field(default_factory=list)
@@ -63,6 +139,12 @@ class RecommendationRequest(BaseModel):
     genres: List[str] = Field(default_factory=list)
     limit: int = 10
     resource_types: List[str] = Field(default_factory=lambda: ['artists', 'albums', 'tracks'])
+    nprobe: int | None = Field(None, ge=1, description='IVF lists to probe; defaults to RECOMMENDER_ANN_NPROBE')
+    exact: bool = Field(False, description='Skip the ANN index and int8 scoring; score every candidate in float32')
+    deadline_ms: int | None = Field(
+        None, ge=1, description='Ranking budget; defaults to RECOMMENDER_RECOMMEND_DEADLINE_SECONDS',
+    )
+    include_scores: bool = Field(False, description="Add each item's unrounded cosine score to extra['score']")
 
 
 class RecommendationItem(BaseModel):
@@ -77,78 +159,105 @@ class RecommendationResponse(BaseModel):
     tracks: List[RecommendationItem] = Field(default_factory=list)
     model_version: str = MODEL_VERSION
     generated_at: datetime = Field(default_factory=datetime.utcnow)
+    partial: bool = False
+    missing_types: List[str] = Field(default_factory=list)
+    missing_shards: List[str] = Field(default_factory=list)
 
 
-_EMBEDDING_QUERIES = {
-    'artists': """
-        SELECT a.name, a.spotify_id, e.vector, e.model_version, e.quality_score, e.metadata
-        FROM recommender_artistembedding e
-        JOIN catalog_artist a ON a.id = e.artist_id
-        WHERE e.vector IS NOT NULL
-          AND jsonb_typeof(e.vector) = 'array'
-          AND jsonb_array_length(e.vector) > 0
-    """,
-    'albums': """
-        SELECT al.name, al.spotify_id, e.vector, e.model_version, e.quality_score, e.metadata
-        FROM recommender_albumembedding e
-        JOIN catalog_album al ON al.id = e.album_id
-        WHERE e.vector IS NOT NULL
-          AND jsonb_typeof(e.vector) = 'array'
-          AND jsonb_array_length(e.vector) > 0
-    """,
-    'tracks': """
-        SELECT t.name, t.spotify_id, e.vector, e.model_version, e.quality_score, e.metadata
-        FROM recommender_trackembedding e
-        JOIN catalog_track t ON t.id = e.track_id
-        WHERE e.vector IS NOT NULL
-          AND jsonb_typeof(e.vector) = 'array'
-          AND jsonb_array_length(e.vector) > 0
-    """,
-}
-
-
-def _ensure_pool_connection() -> ConnectionPool:
-    try:
-        if DB_POOL.closed:
-            DB_POOL.open()
-        return DB_POOL
-    except Exception as exc:  # pragma: no cover - startup issues should bubble up
-        logger.exception('Unable to open database pool')
-        raise HTTPException(status_code=503, detail='Recommender data unavailable') from exc
+class NeighborsResponse(BaseModel):
+    resource_type: str
+    item_id: int
+    items: List[RecommendationItem] = Field(default_factory=list)
+    model_version: str
+    computed_at: datetime
 
 
-def _run_query(sql: str) -> List[Dict[str, Any]]:
-    pool = _ensure_pool_connection()
-    try:
-        with pool.connection() as conn:
-            with conn.cursor(row_factory=dict_row) as cur:
-                cur.execute(sql)
-                return list(cur.fetchall())
-    except HTTPException:
-        raise
-    except Exception as exc:
-        logger.exception('Database query failed')
-        raise HTTPException(status_code=503, detail='Recommender data unavailable') from exc
-
-
-def _fetch_embeddings(resource_type: str) -> List[Dict[str, Any]]:
-    sql = _EMBEDDING_QUERIES.get(resource_type)
-    if not sql:
-        raise HTTPException(status_code=400, detail=f'Unsupported resource type: {resource_type}')
-    return _run_query(sql)
+class BatchRecommendationRequest(BaseModel):
+    requests: List[RecommendationRequest] = Field(..., max_length=BATCH_MAX_REQUESTS)
 
 
-def _vector_from_tokens(tokens: Sequence[str]) -> np.ndarray:
-    return _hash_tokens(list(tokens))
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse] = Field(default_factory=list)
+    model_version: str = MODEL_VERSION
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+def _embedding_source(kind: str) -> EmbeddingSource:
+    if kind == 'synthetic':
+        return SyntheticSource(
+            parse_synthetic_rows(SYNTHETIC_ROWS, list(RESOURCE_TYPES)),
+            dim=VECTOR_DIM,
+            model_version=MODEL_VERSION,
+            seed=SYNTHETIC_SEED,
+        )
+    if kind == 'snapshot':
+        if not SNAPSHOT_DIR:
+            raise ValueError('RECOMMENDER_SNAPSHOT_DIR must be set for the snapshot source')
+        # Without an explicit source choice, Postgres serves until the first snapshot is published.
+        fallback = None if EMBEDDING_SOURCE_KIND else _embedding_source('postgres')
+        return SnapshotSource(SNAPSHOT_DIR, dim=VECTOR_DIM, model_version=MODEL_VERSION, fallback=fallback)
+    if kind == 'postgres':
+        return PostgresSource(
+            database_conninfo(),
+            dim=VECTOR_DIM,
+            model_version=MODEL_VERSION,
+            pool_min=DB_POOL_MIN,
+            pool_max=DB_POOL_MAX,
+        )
+    raise ValueError(f'Unknown RECOMMENDER_EMBEDDING_SOURCE: {kind}')
+
+
+EMBEDDING_SOURCE = _embedding_source(EMBEDDING_SOURCE_KIND or ('snapshot' if SNAPSHOT_DIR else 'postgres'))
+if SHARD is not None:
+    EMBEDDING_SOURCE = ShardedSource(EMBEDDING_SOURCE, SHARD)
+
+
+def _load_index(resource_type: str) -> ResourceIndex:
+    index = EMBEDDING_SOURCE.load(resource_type)
+    index = index.with_ann(min_rows=ANN_MIN_ROWS, n_lists=ANN_LISTS, nprobe=ANN_NPROBE)
+    if resource_type in QUANTIZED_TYPES:
+        index = index.with_quantization(rerank=RERANK_CANDIDATES, spill_dir=SPILL_DIR)
+    return index
+
+
+INDEX_STORE = IndexStore(
+    _load_index,
+    changes=EMBEDDING_SOURCE.changes,
+    deletions=EMBEDDING_SOURCE.deletions,
+    generation=EMBEDDING_SOURCE.generation,
+    full_reload_seconds=INDEX_FULL_RELOAD_SECONDS,
+    overlap_seconds=INDEX_REFRESH_OVERLAP_SECONDS,
+)
+INDEX_REFRESHER = IndexRefresher(INDEX_STORE, INDEX_REFRESH_SECONDS)
+RESULT_CACHE = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_SECONDS)
+RANK_EXECUTOR = ThreadPoolExecutor(max_workers=RANK_WORKERS, thread_name_prefix='rank')
+SHARD_COORDINATOR = (
+    ShardCoordinator(SHARD_URLS, timeout=SHARD_TIMEOUT_SECONDS, executor=RANK_EXECUTOR) if SHARD_URLS else None
+)
+
+
+def _database_source() -> PostgresSource | None:
+    # A shard wraps the real source, and a snapshot source only touches the database through its fallback.
+    source = getattr(EMBEDDING_SOURCE, 'inner', EMBEDDING_SOURCE)
+    source = getattr(source, 'fallback', None) or source
+    return source if isinstance(source, PostgresSource) else None
 
 
-def _prepare_candidate_vector(raw_vector: Sequence[float] | None) -> np.ndarray:
-    values = np.array(raw_vector or [], dtype=np.float32)
-    if values.size < VECTOR_DIM:
-        values = np.pad(values, (0, VECTOR_DIM - values.size))
-    elif values.size > VECTOR_DIM:
-        values = values[:VECTOR_DIM]
-    return values
+def _pool_stats() -> Dict[str, int] | None:
+    source = _database_source()
+    return source.pool.get_stats() if source is not None else None
+
+
+REGISTRY.register(EngineCollector(
+    index_rows=lambda: {resource_type: len(INDEX_STORE.get(resource_type)) for resource_type in INDEX_STORE.loaded_types()},
+    index_version=lambda: INDEX_STORE.version,
+    cache_stats=RESULT_CACHE.stats,
+    pool_stats=_pool_stats,
+))
+
+
+def _vector_from_tokens(tokens: Sequence[str]) -> np.ndarray:
+    return _hash_tokens(list(tokens))
 
 
 def _build_seed_set(payload: RecommendationRequest) -> set[str]:
@@ -162,56 +271,14 @@ def _build_seed_set(payload: RecommendationRequest) -> set[str]:
 
 def _rank_candidates(
     user_vector: np.ndarray,
-    candidates: List[Dict[str, Any]],
+    index: ResourceIndex,
     *,
     limit: int,
     exclude: set[str],
+    nprobe: int | None = None,
+    exact: bool = False,
 ) -> List[Dict[str, Any]]:
-    if not candidates:
-        return []
-    user = np.array(user_vector, dtype=np.float32)
-    user_norm = np.linalg.norm(user)
-    if not user_norm:
-        return []
-
-    ranked: List[Dict[str, Any]] = []
-    for row in candidates:
-        name = row.get('name')
-        if not isinstance(name, str):
-            continue
-        if name.lower() in exclude:
-            continue
-
-        candidate_vector = _prepare_candidate_vector(row.get('vector'))
-        cand_norm = np.linalg.norm(candidate_vector)
-        if not cand_norm:
-            continue
-        score = float(np.dot(user, candidate_vector) / (user_norm * cand_norm))
-        if np.isnan(score):
-            continue
-        score = max(0.0, min(score, 1.0))
-        ranked.append({
-            'name': name,
-            'likeness': round(score, 2),
-            'extra': _build_extra_payload(row),
-        })
-
-    ranked.sort(key=lambda item: item['likeness'], reverse=True)
-    return ranked[:limit]
-
-
-def _build_extra_payload(row: Dict[str, Any]) -> Dict[str, Any]:
-    extra: Dict[str, Any] = {
-        'spotify_id': row.get('spotify_id'),
-        'model_version': row.get('model_version') or MODEL_VERSION,
-    }
-    quality = row.get('quality_score')
-    if quality is not None:
-        extra['quality_score'] = quality
-    metadata = row.get('metadata') or {}
-    if metadata:
-        extra['metadata'] = metadata
-    return extra
+    return index.search(user_vector, limit=limit, exclude=exclude, nprobe=nprobe, exact=exact)
 
 
 def _hash_tokens(tokens: List[str]) -> np.ndarray:
@@ -223,50 +290,273 @@ def _hash_tokens(tokens: List[str]) -> np.ndarray:
     :return: Normalized vector representation of the tokens
     :rtype: np.ndarray
     """
-    if not tokens:
-        tokens = ['unknown']
-    vector = np.zeros(VECTOR_DIM)
-    for token in tokens:
-        digest = hashlib.sha1(token.encode('utf-8')).digest()
-        sample = np.frombuffer(digest[:VECTOR_DIM], dtype=np.uint8)
-        vector[: len(sample)] += sample
-    norm = np.linalg.norm(vector)
-    if norm:
-        vector = vector / norm
-    return vector
+    return hash_tokens(tokens, VECTOR_DIM)
 
 
-@app.post('/embed', response_model=EmbedResponse)
-def embed(request: EmbedRequest):
+def _attribute_tokens(attributes: Dict[str, List[str] | str]) -> List[str]:
     tokens: List[str]
-    if isinstance(request.attributes, dict):
+    if isinstance(attributes, dict):
         tokens = []
-        for value in request.attributes.values():
+        for value in attributes.values():
             if isinstance(value, list):
                 tokens.extend(value)
             elif isinstance(value, str):
                 tokens.append(value)
     else:
-        tokens = [str(request.attributes)]
-    vector = _hash_tokens(tokens).tolist()
+        tokens = [str(attributes)]
+    return tokens
+
+
+def _embed_one(request: EmbedRequest) -> EmbedResponse:
+    vector = _hash_tokens(_attribute_tokens(request.attributes)).tolist()
     return EmbedResponse(vector=vector, metadata={'resource_type': request.resource_type})
 
 
-@app.post('/recommend', response_model=RecommendationResponse)
-def recommend(request: RecommendationRequest):
-    resource_types = request.resource_types or ['artists', 'albums', 'tracks']
+@app.post('/embed', response_model=EmbedResponse)
+def embed(request: EmbedRequest):
+    return _embed_one(request)
+
+
+@app.post('/embed/batch', response_model=EmbedBatchResponse)
+def embed_batch(request: EmbedBatchRequest):
+    """Embed many entities in one round trip; vectors come back in request order."""
+    vectors = hash_token_lists([_attribute_tokens(item.attributes) for item in request.items], VECTOR_DIM)
+    return EmbedBatchResponse(vectors=[
+        EmbedResponse(vector=vector.tolist(), metadata={'resource_type': item.resource_type})
+        for item, vector in zip(request.items, vectors)
+    ])
+
+
+def _validated_seeds(request: RecommendationRequest, label: str = '') -> List[str]:
     seeds = request.artists + request.albums + request.tracks + request.genres
     if not seeds:
-        raise HTTPException(status_code=400, detail='At least one seed is required.')
+        raise HTTPException(status_code=400, detail=f'{label}At least one seed is required.')
+    for resource_type in request.resource_types:
+        if resource_type not in RESOURCE_TYPES:
+            raise HTTPException(status_code=400, detail=f'{label}Unsupported resource type: {resource_type}')
+    return seeds
+
+
+def _recommendation_key(request: RecommendationRequest, resource_types: List[str]) -> str:
+    # Seed order never changes the user vector (integer-valued sums), so lists are sorted.
+    return canonical_key({
+        'artists': sorted(request.artists),
+        'albums': sorted(request.albums),
+        'tracks': sorted(request.tracks),
+        'genres': sorted(request.genres),
+        'limit': request.limit,
+        'resource_types': resource_types,
+        'nprobe': request.nprobe,
+        'exact': request.exact,
+        'include_scores': request.include_scores,
+    })
+
+
+def _json_response(model: BaseModel) -> Response:
+    # Serialized here rather than by FastAPI so the cost shows up in the serialization histogram.
+    with timed('serialization'):
+        return Response(content=model.model_dump_json(), media_type='application/json')
 
-    user_vector = _vector_from_tokens(seeds)
-    exclude = _build_seed_set(request)
-    response = RecommendationResponse()
 
+@app.post('/recommend', response_model=RecommendationResponse)
+def recommend(request: RecommendationRequest):
+    _validated_seeds(request)
+    resource_types = request.resource_types or ['artists', 'albums', 'tracks']
+    compute = _recommend_from_shards if SHARD_COORDINATOR is not None else _recommend
+    response = RESULT_CACHE.get_or_compute(
+        _recommendation_key(request, resource_types),
+        # A coordinator holds no index, so its version never moves and entries only expire by TTL.
+        lambda: compute(request, resource_types),
+        generation=INDEX_STORE.version,
+        cacheable=lambda response: not response.partial,
+    )
+    return _json_response(response)
+
+
+def _rank_type(resource_type: str, user_vector: np.ndarray, exclude: set[str], request: RecommendationRequest):
+    ranked = _rank_candidates(
+        user_vector,
+        INDEX_STORE.get(resource_type),
+        limit=request.limit,
+        exclude=exclude,
+        nprobe=request.nprobe,
+        exact=request.exact,
+    )
+    return _with_scores(ranked) if request.include_scores else ranked
+
+
+def _with_scores(ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{**item, 'extra': {**item['extra'], 'score': item['score']}} for item in ranked]
+
+
+def _merged_shard_results(
+    shard_results: List[Dict[str, Any]],
+    resource_types: Sequence[str],
+    *,
+    limit: int,
+    include_scores: bool,
+) -> Dict[str, List[Dict[str, Any]]]:
+    merged: Dict[str, List[Dict[str, Any]]] = {}
     for resource_type in resource_types:
-        embeddings = _fetch_embeddings(resource_type)
-        ranked = _rank_candidates(user_vector, embeddings, limit=request.limit, exclude=exclude)
-        setattr(response, resource_type, ranked)
+        ranked = merge_ranked([result.get(resource_type, []) for result in shard_results], limit)
+        if not include_scores:
+            ranked = [{**item, 'extra': {key: value for key, value in item['extra'].items() if key != 'score'}} for item in ranked]
+        merged[resource_type] = ranked
+    return merged
+
+
+def _recommend_from_shards(request: RecommendationRequest, resource_types: List[str]) -> RecommendationResponse:
+    payload = request.model_dump(mode='json')
+    payload.update(resource_types=resource_types, include_scores=True)
+    deadline = request.deadline_ms / 1000 if request.deadline_ms else RECOMMEND_DEADLINE_SECONDS
+    responses, failed = SHARD_COORDINATOR.scatter('/recommend', payload, timeout=deadline or None)
+    results = _merged_shard_results(
+        responses, dict.fromkeys(resource_types), limit=request.limit, include_scores=request.include_scores,
+    )
+    missing = sorted({resource_type for response in responses for resource_type in response.get('missing_types', [])})
+    return RecommendationResponse(
+        **results,
+        generated_at=datetime.utcnow(),
+        partial=bool(failed or missing),
+        missing_types=missing,
+        missing_shards=failed,
+    )
+
+
+def _recommend(request: RecommendationRequest, resource_types: List[str]) -> RecommendationResponse:
+    seeds = request.artists + request.albums + request.tracks + request.genres
+    with timed('vector_prep'):
+        user_vector = _vector_from_tokens(seeds)
+        exclude = _build_seed_set(request)
+    deadline = request.deadline_ms / 1000 if request.deadline_ms else RECOMMEND_DEADLINE_SECONDS
+    # Scoring is NumPy work that releases the GIL, so the types (and any cold index loads) run in
+    # parallel and the request takes about as long as its slowest type.
+    futures = {
+        resource_type: RANK_EXECUTOR.submit(_rank_type, resource_type, user_vector, exclude, request)
+        for resource_type in dict.fromkeys(resource_types)
+    }
+    wait(futures.values(), timeout=deadline or None)
+
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    missing: List[str] = []
+    for resource_type, future in futures.items():
+        if future.done():
+            results[resource_type] = future.result()
+        else:
+            # A type that has not started yet is dropped; one mid-scoring finishes in the background.
+            future.cancel()
+            missing.append(resource_type)
+    if missing:
+        logger.warning('Recommendation deadline of %.3fs missed for %s', deadline, ', '.join(missing))
+    return RecommendationResponse(
+        **results, generated_at=datetime.utcnow(), partial=bool(missing), missing_types=missing,
+    )
+
+
+@app.post('/recommend/batch', response_model=BatchRecommendationResponse)
+def recommend_batch(request: BatchRecommendationRequest):
+    """Score many profiles in one pass: a seed matrix against each resource matrix per GEMM."""
+    seed_lists = [_validated_seeds(item, f'Request {position}: ') for position, item in enumerate(request.requests)]
+    if SHARD_COORDINATOR is not None:
+        return _json_response(_recommend_batch_from_shards(request))
+    with timed('vector_prep'):
+        user_vectors = hash_token_lists(seed_lists, VECTOR_DIM)
+        excludes = [_build_seed_set(item) for item in request.requests]
+    results: List[Dict[str, List[Dict[str, Any]]]] = [{} for _ in request.requests]
+
+    for resource_type in RESOURCE_TYPES:
+        rows = [
+            position for position, item in enumerate(request.requests)
+            if resource_type in (item.resource_types or RESOURCE_TYPES)
+        ]
+        if not rows:
+            continue
+        ranked = INDEX_STORE.get(resource_type).search_batch(
+            user_vectors[rows],
+            limits=[request.requests[row].limit for row in rows],
+            excludes=[excludes[row] for row in rows],
+        )
+        for row, items in zip(rows, ranked):
+            results[row][resource_type] = _with_scores(items) if request.requests[row].include_scores else items
+
+    generated_at = datetime.utcnow()
+    return _json_response(BatchRecommendationResponse(
+        results=[RecommendationResponse(**items, generated_at=generated_at) for items in results],
+        generated_at=generated_at,
+    ))
+
+
+def _recommend_batch_from_shards(request: BatchRecommendationRequest) -> BatchRecommendationResponse:
+    payload = request.model_dump(mode='json')
+    for item in payload['requests']:
+        item['include_scores'] = True
+    responses, failed = SHARD_COORDINATOR.scatter('/recommend/batch', payload)
+    generated_at = datetime.utcnow()
+    results = []
+    for position, item in enumerate(request.requests):
+        shard_results = [response['results'][position] for response in responses]
+        merged = _merged_shard_results(
+            shard_results, item.resource_types or RESOURCE_TYPES, limit=item.limit, include_scores=item.include_scores,
+        )
+        results.append(RecommendationResponse(
+            **merged, generated_at=generated_at, partial=bool(failed), missing_shards=failed,
+        ))
+    return BatchRecommendationResponse(results=results, generated_at=generated_at)
+
+
+@app.get('/neighbors/{resource_type}/{item_id}', response_model=NeighborsResponse)
+def neighbors(resource_type: str, item_id: int, limit: int = Query(10, ge=1, le=1000)):
+    """Precomputed "more like this" neighbours of one catalog item, read from the backend's neighbour table."""
+    if resource_type not in RESOURCE_TYPES:
+        raise HTTPException(status_code=400, detail=f'Unsupported resource type: {resource_type}')
+    source = _database_source()
+    if source is None:
+        raise HTTPException(status_code=404, detail='Neighbour lookups need the postgres embedding source')
+    found = source.neighbors(resource_type, item_id, limit)
+    if found is None:
+        raise HTTPException(status_code=404, detail='No neighbours have been computed for this item')
+    return NeighborsResponse(
+        resource_type=resource_type,
+        item_id=item_id,
+        items=[
+            RecommendationItem(
+                name=item['name'],
+                likeness=round(max(0.0, min(item['score'], 1.0)), 2),
+                extra={'item_id': item['item_id'], 'spotify_id': item['spotify_id'], 'score': item['score']},
+            )
+            for item in found['items']
+        ],
+        model_version=found['model_version'],
+        computed_at=found['computed_at'],
+    )
+
+
+@app.post('/index/reload')
+def reload_index():
+    if SHARD_COORDINATOR is not None:
+        responses, failed = SHARD_COORDINATOR.scatter('/index/reload', {})
+        return {'shards': responses, 'missing_shards': failed}
+    rows = INDEX_STORE.reload(RESOURCE_TYPES)
+    return {'rows': rows, 'version': INDEX_STORE.version}
+
+
+@app.get('/stats')
+def stats():
+    """Index sizes, memory footprint, quantization recall, and result-cache counters."""
+    indexes = {resource_type: INDEX_STORE.get(resource_type).memory_stats() for resource_type in INDEX_STORE.loaded_types()}
+    return {
+        'model_version': MODEL_VERSION,
+        'index_version': INDEX_STORE.version,
+        # ru_maxrss is reported in KiB on Linux.
+        'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'indexes': indexes,
+        'result_cache': RESULT_CACHE.stats(),
+        'shard': str(SHARD) if SHARD is not None else None,
+        'shard_urls': SHARD_URLS,
+    }
+
 
-    response.generated_at = datetime.utcnow()
-    return response
+@app.get('/metrics')
+def metrics():
+    """Prometheus exposition: per-stage latency histograms plus index, cache and pool gauges."""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+from prometheus_client import CollectorRegistry, Histogram, ProcessCollector
+from prometheus_client.core import GaugeMetricFamily
+
+# Each uvicorn worker exposes its own registry; scrape every worker or aggregate by instance.
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+
+STAGE_SECONDS = Histogram(
+    'recommender_stage_seconds',
+    'Time spent in each stage of serving a request, by resource type.',
+    ['stage', 'resource_type'],
+    # Ranking stages sit in the tens of microseconds to tens of milliseconds.
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0),
+    registry=REGISTRY,
+)
+
+
+def observe(stage: str, resource_type: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage, resource_type).observe(seconds)
+
+
+@contextmanager
+def timed(stage: str, resource_type: str = 'all') -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, resource_type, time.perf_counter() - started)
+
+
+_POOL_GAUGES = {
+    'pool_size': 'Connections currently open in the database pool.',
+    'pool_available': 'Idle connections in the database pool.',
+    'requests_waiting': 'Callers waiting for a database connection.',
+}
+
+
+class EngineCollector:
+    """Gauges computed at scrape time from the engine's live objects."""
+
+    def __init__(
+        self,
+        *,
+        index_rows: Callable[[], Dict[str, int]],
+        index_version: Callable[[], int],
+        cache_stats: Callable[[], Dict[str, Any]],
+        pool_stats: Callable[[], Dict[str, int] | None],
+    ):
+        self._index_rows = index_rows
+        self._index_version = index_version
+        self._cache_stats = cache_stats
+        self._pool_stats = pool_stats
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        rows = GaugeMetricFamily('recommender_index_rows', 'Rows in each loaded index.', labels=['resource_type'])
+        for resource_type, count in self._index_rows().items():
+            rows.add_metric([resource_type], count)
+        yield rows
+        yield GaugeMetricFamily(
+            'recommender_index_version', 'Bumped whenever any index is reloaded or patched.', value=self._index_version(),
+        )
+
+        cache = self._cache_stats()
+        yield GaugeMetricFamily(
+            'recommender_result_cache_hit_ratio',
+            'Share of /recommend lookups served from the result cache, including collapsed concurrent requests.',
+            value=cache['hit_ratio'] or 0.0,
+        )
+        yield GaugeMetricFamily('recommender_result_cache_entries', 'Entries in the result cache.', value=cache['entries'])
+
+        pool = self._pool_stats()
+        if pool is not None:
+            for key, help_text in _POOL_GAUGES.items():
+                yield GaugeMetricFamily(f'recommender_db_{key}', help_text, value=pool.get(key, 0))
+            in_use = pool.get('pool_size', 0) - pool.get('pool_available', 0)
+            yield GaugeMetricFamily(
+                'recommender_db_pool_utilization',
+                'Connections in use as a fraction of the pool maximum.',
+                value=in_use / pool['pool_max'] if pool.get('pool_max') else 0.0,
+            )
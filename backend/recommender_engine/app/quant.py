@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import tempfile
+
+import numpy as np
+
+# Rows decoded to float32 per block while scoring; bounds the temporary copy of the codes.
+_SCORE_BLOCK_ROWS = 65536
+
+
+class ScalarQuantizer:
+    """Per-dimension int8 scalar quantization of an embedding matrix.
+
+    Each dimension ``d`` is mapped linearly onto the int8 range so that
+    ``x[d] ~= offset[d] + scale[d] * code[d]``. A dot product with a float query
+    then needs no decoding: ``q . x ~= (q * scale) . code + q . offset``. Codes take
+    a quarter of the float32 matrix's memory; the error they introduce is only used
+    to shortlist candidates, which are re-scored exactly by the caller.
+    """
+
+    def __init__(self, scale: np.ndarray, offset: np.ndarray, codes: np.ndarray):
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.offset = np.asarray(offset, dtype=np.float32)
+        self.codes = np.ascontiguousarray(codes, dtype=np.int8)
+
+    @classmethod
+    def fit(cls, matrix: np.ndarray) -> ScalarQuantizer:
+        if not matrix.shape[0]:
+            dim = matrix.shape[1]
+            return cls(np.ones(dim), np.zeros(dim), np.zeros((0, dim), dtype=np.int8))
+        low = matrix.min(axis=0).astype(np.float32)
+        high = matrix.max(axis=0).astype(np.float32)
+        scale = (high - low) / 255.0
+        scale[scale == 0] = 1.0
+        offset = low + 128.0 * scale
+        quantizer = cls(scale, offset, np.zeros((0, matrix.shape[1]), dtype=np.int8))
+        return quantizer.with_codes(matrix)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        codes = np.empty(matrix.shape, dtype=np.int8)
+        for start in range(0, matrix.shape[0], _SCORE_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + _SCORE_BLOCK_ROWS], dtype=np.float32)
+            codes[start:start + block.shape[0]] = np.clip(np.rint((block - self.offset) / self.scale), -128, 127)
+        return codes
+
+    def with_codes(self, matrix: np.ndarray) -> ScalarQuantizer:
+        """Same scale/offset over a different row set, e.g. after an incremental index patch."""
+        return ScalarQuantizer(self.scale, self.offset, self.encode(matrix))
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scale.nbytes + self.offset.nbytes
+
+    def scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Approximate ``matrix[rows] @ query`` (every row when ``rows`` is None)."""
+        codes = self.codes if rows is None else self.codes[rows]
+        weights = (query * self.scale).astype(np.float32)
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], _SCORE_BLOCK_ROWS):
+            block = codes[start:start + _SCORE_BLOCK_ROWS]
+            scores[start:start + block.shape[0]] = block.astype(np.float32) @ weights
+        return scores + np.float32(query @ self.offset)
+
+    def scores_batch(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate ``queries @ matrix.T`` for a block of queries."""
+        weights = (queries * self.scale).astype(np.float32)
+        scores = np.empty((queries.shape[0], self.codes.shape[0]), dtype=np.float32)
+        for start in range(0, self.codes.shape[0], _SCORE_BLOCK_ROWS):
+            block = self.codes[start:start + _SCORE_BLOCK_ROWS]
+            scores[:, start:start + block.shape[0]] = weights @ block.astype(np.float32).T
+        return scores + (queries @ self.offset)[:, None]
+
+
+def spill(matrix: np.ndarray, directory: str | None = None) -> np.ndarray:
+    """Move ``matrix`` into an unlinked temporary file and return a read-only mapping of it.
+
+    The kernel pages rows in on demand, so a float32 matrix that is only read for
+    re-ranking a shortlist stops counting against resident memory.
+    """
+    if isinstance(matrix, np.memmap) or not matrix.size:
+        return matrix
+    handle = tempfile.TemporaryFile(dir=directory, prefix='engine-matrix-')
+    with handle:
+        np.ascontiguousarray(matrix, dtype=np.float32).tofile(handle)
+        handle.flush()
+        return np.memmap(handle, dtype=np.float32, mode='r', shape=matrix.shape)
+
+
+def estimate_recall(
+    matrix: np.ndarray,
+    quantizer: ScalarQuantizer,
+    *,
+    rerank: int,
+    k: int = 10,
+    queries: int = 32,
+    seed: int = 0,
+) -> float | None:
+    """Recall@k of shortlist-and-rerank against exact float32 search.
+
+    Queries are sampled rows with a little noise added so the trivial self-match
+    does not dominate. Returns None for matrices too small to measure.
+    """
+    rows = matrix.shape[0]
+    if rows <= k or queries <= 0:
+        return None
+    rng = np.random.default_rng(seed)
+    sample = np.asarray(matrix[rng.choice(rows, size=min(queries, rows), replace=False)], dtype=np.float32)
+    sample = sample + rng.normal(scale=0.1, size=sample.shape).astype(np.float32)
+    sample /= np.linalg.norm(sample, axis=1, keepdims=True)
+
+    exact = np.asarray(matrix, dtype=np.float32)
+    found = 0
+    for query in sample:
+        truth = np.argpartition(-(exact @ query), k - 1)[:k]
+        shortlist = np.argpartition(-quantizer.scores(query), min(rerank, rows) - 1)[:min(rerank, rows)]
+        reranked = shortlist[np.argpartition(-(exact[shortlist] @ query), min(k, shortlist.size) - 1)[:k]]
+        found += np.intersect1d(truth, reranked).size
+    return found / (k * sample.shape[0])
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_KEY_SPACE = 1 << 64
+
+
+def shard_key(spotify_id: str | None, name: str = '') -> int:
+    """Stable 64-bit position of a catalog item in the shard key space.
+
+    Items without a Spotify id fall back to their name so every row lands on exactly one shard.
+    """
+    key = spotify_id if spotify_id else f'name:{name}'
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    """Shard ``index`` of ``count`` owns an equal, contiguous range of the 64-bit key space."""
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> ShardSpec:
+        """``"2/4"`` is the third of four shards."""
+        index, _, count = value.partition('/')
+        spec = cls(int(index), int(count))
+        if spec.count < 1 or not 0 <= spec.index < spec.count:
+            raise ValueError(f'Invalid shard {value!r}; expected "<index>/<count>" with 0 <= index < count')
+        return spec
+
+    @property
+    def bounds(self) -> tuple[int, int]:
+        return self.index * _KEY_SPACE // self.count, (self.index + 1) * _KEY_SPACE // self.count
+
+    def owns(self, spotify_id: str | None, name: str = '') -> bool:
+        low, high = self.bounds
+        return low <= shard_key(spotify_id, name) < high
+
+    def owned_rows(self, spotify_ids: Sequence[str | None], names: Sequence[str]) -> np.ndarray:
+        return np.flatnonzero([self.owns(spotify_id, name) for spotify_id, name in zip(spotify_ids, names)])
+
+    def __str__(self) -> str:
+        return f'{self.index}/{self.count}'
+
+
+def merge_ranked(ranked_lists: Sequence[List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+    """Merge per-shard top-k lists (items carrying ``extra['score']``) into one global top-k.
+
+    Each shard returns its own best ``limit`` rows, so the global best ``limit`` are
+    among them. Ties keep shard order.
+    """
+    items = [item for ranked in ranked_lists for item in ranked]
+    items.sort(key=lambda item: item['extra'].get('score', item['likeness']), reverse=True)
+    return items[:limit]
+
+
+class ShardCoordinator:
+    """Fans engine requests out to shard engines and collects whatever comes back in time."""
+
+    def __init__(self, urls: Sequence[str], *, timeout: float, executor: Executor, pool_size: int = 32):
+        self.urls = [url.rstrip('/') for url in urls]
+        self.timeout = timeout
+        self._executor = executor
+        # One pooled client for every shard; httpx clients are safe to share across threads.
+        self._client = httpx.Client(limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size))
+
+    def scatter(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        *,
+        timeout: float | None = None,
+    ) -> tuple[List[Dict[str, Any]], List[str]]:
+        """POST ``payload`` to ``path`` on every shard; return the JSON bodies that succeeded and the failed shard URLs."""
+        timeout = timeout or self.timeout
+        futures = [
+            (url, self._executor.submit(self._client.post, f'{url}{path}', json=payload, timeout=timeout))
+            for url in self.urls
+        ]
+        responses: List[Dict[str, Any]] = []
+        failed: List[str] = []
+        for url, future in futures:
+            try:
+                # The httpx timeout bounds each phase; the extra second covers executor queueing.
+                response = future.result(timeout=timeout + 1)
+                response.raise_for_status()
+                responses.append(response.json())
+            except Exception:
+                logger.warning('Shard %s failed for %s', url, path, exc_info=True)
+                future.cancel()
+                failed.append(url)
+        return responses, failed
+
+    def close(self) -> None:
+        self._client.close()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .index import ResourceIndex
+
+# Written by the backend's export_embedding_snapshot command; see
+# recommender/services/embedding_snapshot.py for the layout.
+CURRENT_FILE = 'CURRENT'
+
+
+def current_version(directory: str) -> str | None:
+    """Name of the live snapshot version, or None when nothing has been exported yet."""
+    try:
+        return (Path(directory) / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_snapshot(
+    directory: str,
+    version: str,
+    resource_type: str,
+    *,
+    dim: int,
+    default_model_version: str = '',
+) -> ResourceIndex:
+    """Map one resource type of a snapshot version into a read-only ``ResourceIndex``.
+
+    The matrix is opened with ``mmap_mode='r'``, so every worker process on the host
+    shares the same page-cache copy and nothing is decoded at startup. Rows were
+    normalized by the exporter; only the sidecar columns are parsed here. A
+    hand-built ``<type>.npz`` is accepted in place of the ``.npy``/sidecar pair.
+    """
+    root = Path(directory) / version
+    if not (root / f'{resource_type}.npy').exists():
+        if (root / f'{resource_type}.npz').exists():
+            return _load_archive(root / f'{resource_type}.npz', resource_type, dim, default_model_version)
+        # Hand-built snapshot directories may carry only some resource types.
+        return ResourceIndex(resource_type, np.zeros((0, dim), dtype=np.float32), default_model_version=default_model_version)
+    matrix = np.load(root / f'{resource_type}.npy', mmap_mode='r')
+    with open(root / f'{resource_type}.rows.json') as handle:
+        sidecar = json.load(handle)
+    if matrix.ndim != 2 or matrix.shape[1] != dim or matrix.dtype != np.float32:
+        raise ValueError(
+            f'Snapshot {version}/{resource_type} has shape {matrix.shape} {matrix.dtype}; expected (N, {dim}) float32'
+        )
+    if len(sidecar['item_ids']) != matrix.shape[0]:
+        raise ValueError(f'Snapshot {version}/{resource_type} sidecar does not match its matrix')
+    watermark = sidecar.get('watermark')
+    return ResourceIndex(
+        resource_type=resource_type,
+        matrix=matrix,
+        item_ids=sidecar['item_ids'],
+        names=sidecar['names'],
+        spotify_ids=sidecar['spotify_ids'],
+        model_versions=sidecar['model_versions'],
+        quality_scores=sidecar['quality_scores'],
+        metadata=sidecar['metadata'],
+        default_model_version=default_model_version,
+        watermark=datetime.fromisoformat(watermark) if watermark else None,
+    )
+
+
+def _load_archive(path: Path, resource_type: str, dim: int, default_model_version: str) -> ResourceIndex:
+    """Load a ``.npz`` with ``vectors`` and ``names`` arrays (``item_ids``/``spotify_ids`` optional).
+
+    Archives are compressed or zipped, so they are read into memory rather than mapped.
+    """
+    with np.load(path) as archive:
+        # NpzFile decompresses on every item access, so pull each array out once.
+        vectors = archive['vectors']
+        names = [str(name) for name in archive['names']]
+        item_ids = archive['item_ids'].tolist() if 'item_ids' in archive else range(1, len(names) + 1)
+        spotify_ids = [str(value) for value in archive['spotify_ids']] if 'spotify_ids' in archive else [None] * len(names)
+    rows = [
+        {'item_id': item_id, 'name': name, 'spotify_id': spotify_id, 'vector': vector}
+        for item_id, name, spotify_id, vector in zip(item_ids, names, spotify_ids, vectors)
+    ]
+    return ResourceIndex.from_rows(resource_type, rows, dim=dim, default_model_version=default_model_version)
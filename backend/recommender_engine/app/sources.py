@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import logging
+import os
+import struct
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+
+from .index import ResourceIndex
+from .metrics import timed
+from .shards import ShardSpec
+from .snapshot import current_version, load_snapshot
+from .synthetic import clustered_vectors
+
+logger = logging.getLogger(__name__)
+
+
+class SourceUnavailable(RuntimeError):
+    """The embedding source cannot serve data right now (database down, no snapshot yet)."""
+
+
+class EmbeddingSource:
+    """Where the engine's indexes come from.
+
+    ``load`` builds a full ``ResourceIndex`` for one resource type. Sources that can
+    report incremental changes, a deletion marker, or a version identifier override the
+    matching hook; hooks left as None tell the ``IndexStore`` the capability is absent.
+    """
+
+    name = ''
+    changes: Callable[[str, datetime], List[Dict[str, Any]]] | None = None
+    deletions: Callable[[str], Any] | None = None
+    generation: Callable[[], Any] | None = None
+
+    def __init__(self, *, dim: int, model_version: str):
+        self.dim = dim
+        self.model_version = model_version
+
+    def load(self, resource_type: str) -> ResourceIndex:
+        raise NotImplementedError
+
+
+_EMBEDDING_TABLES = {
+    'artists': ('recommender_artistembedding', 'artist_id', 'catalog_artist'),
+    'albums': ('recommender_albumembedding', 'album_id', 'catalog_album'),
+    'tracks': ('recommender_trackembedding', 'track_id', 'catalog_track'),
+}
+
+# vector_data is packed little-endian float32, decoded with np.frombuffer.
+_EMBEDDING_SELECT = """
+    SELECT c.id AS item_id, c.name, c.spotify_id, e.vector_data AS vector, e.model_version, e.quality_score,
+           e.metadata, e.modified_at
+    FROM {table} e
+    JOIN {catalog} c ON c.id = e.{fk}
+"""
+
+_VALID_VECTOR = "e.vector_dim > 0 AND e.vector_norm > 0"
+
+_EMBEDDING_QUERIES = {
+    resource_type: _EMBEDDING_SELECT.format(table=table, fk=fk, catalog=catalog) + f'WHERE {_VALID_VECTOR}'
+    for resource_type, (table, fk, catalog) in _EMBEDDING_TABLES.items()
+}
+
+# Changed rows are fetched regardless of validity so vectors that were cleared drop out of the index.
+_EMBEDDING_CHANGES_QUERIES = {
+    resource_type: _EMBEDDING_SELECT.format(table=table, fk=fk, catalog=catalog) + 'WHERE e.modified_at > %(since)s'
+    for resource_type, (table, fk, catalog) in _EMBEDDING_TABLES.items()
+}
+
+# Cumulative rows deleted from the table, from Postgres' statistics: a catalog lookup rather than a
+# count(*) scan, and unaffected by rows inserted while a poll runs. Stats lag commits by a second or so.
+_EMBEDDING_DELETES_QUERY = """
+    SELECT coalesce(n_tup_del, 0) AS deletes FROM pg_stat_user_tables WHERE relid = %(table)s::regclass
+"""
+
+
+# Written by the backend's compute_item_neighbors job: packed little-endian int64 ids and float32 scores.
+_NEIGHBORS_QUERY = """
+    SELECT neighbor_ids, scores, model_version, computed_at
+    FROM recommender_itemneighbors
+    WHERE resource_type = %(resource_type)s AND item_id = %(item_id)s
+"""
+
+_CATALOG_LOOKUP_QUERIES = {
+    resource_type: f'SELECT id, name, spotify_id FROM {catalog} WHERE id = ANY(%(ids)s)'
+    for resource_type, (_, _, catalog) in _EMBEDDING_TABLES.items()
+}
+
+
+def database_conninfo() -> str:
+    url = os.environ.get('DATABASE_URL')
+    if url:
+        return url
+    name = os.environ.get('POSTGRES_NAME', 'postgres')
+    user = os.environ.get('POSTGRES_USER', 'postgres')
+    password = os.environ.get('POSTGRES_PASSWORD', 'postgres')
+    host = os.environ.get('POSTGRES_HOST') or os.environ.get('POSTGRES_HOSTNAME') or 'db'
+    port = os.environ.get('POSTGRES_PORT')
+    if not port:
+        raise ValueError("POSTGRES_PORT must be set")
+    return f"dbname={name} user={user} password={password} host={host} port={port}"
+
+
+class PostgresSource(EmbeddingSource):
+    """Reads the backend's embedding tables directly; supports incremental refresh."""
+
+    name = 'postgres'
+
+    def __init__(self, conninfo: str, *, dim: int, model_version: str, pool_min: int = 1, pool_max: int = 10):
+        super().__init__(dim=dim, model_version=model_version)
+        self.pool = ConnectionPool(conninfo=conninfo, min_size=pool_min, max_size=pool_max, open=False)
+
+    def load(self, resource_type: str) -> ResourceIndex:
+        sql = _EMBEDDING_QUERIES.get(resource_type)
+        if not sql:
+            raise ValueError(f'Unsupported resource type: {resource_type}')
+        with timed('db_fetch', resource_type):
+            rows = self._run_query(sql)
+        return ResourceIndex.from_rows(
+            resource_type,
+            rows,
+            dim=self.dim,
+            default_model_version=self.model_version,
+        )
+
+    def changes(self, resource_type: str, since: datetime) -> List[Dict[str, Any]]:
+        with timed('db_fetch', resource_type):
+            return self._run_query(_EMBEDDING_CHANGES_QUERIES[resource_type], {'since': since})
+
+    def deletions(self, resource_type: str) -> int:
+        with timed('db_fetch', resource_type):
+            found = self._run_query(_EMBEDDING_DELETES_QUERY, {'table': _EMBEDDING_TABLES[resource_type][0]})
+        return found[0]['deletes'] if found else 0
+
+    def neighbors(self, resource_type: str, item_id: int, limit: int) -> Dict[str, Any] | None:
+        """Precomputed neighbours of one catalog item: two indexed lookups, independent of catalog size."""
+        with timed('db_fetch', resource_type):
+            found = self._run_query(_NEIGHBORS_QUERY, {'resource_type': resource_type, 'item_id': item_id})
+            if not found:
+                return None
+            row = found[0]
+            data = bytes(row['neighbor_ids'])
+            ids = list(struct.unpack(f'<{len(data) // 8}q', data))[:limit]
+            scores = np.frombuffer(bytes(row['scores']), dtype='<f4')[:limit].tolist()
+            catalog = {
+                entity['id']: entity
+                for entity in self._run_query(_CATALOG_LOOKUP_QUERIES[resource_type], {'ids': ids})
+            }
+        return {
+            'model_version': row['model_version'],
+            'computed_at': row['computed_at'],
+            'items': [
+                {'item_id': neighbor_id, 'name': catalog[neighbor_id]['name'],
+                 'spotify_id': catalog[neighbor_id]['spotify_id'], 'score': score}
+                for neighbor_id, score in zip(ids, scores) if neighbor_id in catalog
+            ],
+        }
+
+    def _ensure_pool_connection(self) -> ConnectionPool:
+        try:
+            if self.pool.closed:
+                self.pool.open()
+            return self.pool
+        except Exception as exc:  # pragma: no cover - startup issues should bubble up
+            logger.exception('Unable to open database pool')
+            raise SourceUnavailable('Unable to open database pool') from exc
+
+    def _run_query(self, sql: str, params: Dict[str, Any] | None = None) -> List[Dict[str, Any]]:
+        pool = self._ensure_pool_connection()
+        try:
+            with pool.connection() as conn:
+                with conn.cursor(row_factory=dict_row) as cur:
+                    cur.execute(sql, params)
+                    return list(cur.fetchall())
+        except Exception as exc:
+            logger.exception('Database query failed')
+            raise SourceUnavailable('Database query failed') from exc
+
+
+class SnapshotSource(EmbeddingSource):
+    """Memory-maps the CURRENT version of a snapshot directory; reloads when it rotates.
+
+    ``fallback`` serves loads while no snapshot has been exported yet.
+    """
+
+    name = 'snapshot'
+
+    def __init__(self, directory: str, *, dim: int, model_version: str, fallback: EmbeddingSource | None = None):
+        super().__init__(dim=dim, model_version=model_version)
+        self.directory = directory
+        self.fallback = fallback
+
+    def generation(self) -> str | None:
+        return current_version(self.directory)
+
+    def load(self, resource_type: str) -> ResourceIndex:
+        version = self.generation()
+        if version:
+            return load_snapshot(
+                self.directory,
+                version,
+                resource_type,
+                dim=self.dim,
+                default_model_version=self.model_version,
+            )
+        if self.fallback is not None:
+            return self.fallback.load(resource_type)
+        raise SourceUnavailable(f'No snapshot has been published in {self.directory}')
+
+
+class SyntheticSource(EmbeddingSource):
+    """Clustered random vectors generated in memory, for load tests and benchmarks without a database."""
+
+    name = 'synthetic'
+
+    def __init__(self, rows: Dict[str, int], *, dim: int, model_version: str, seed: int = 0):
+        super().__init__(dim=dim, model_version=model_version)
+        self.rows = rows
+        self.seed = seed
+
+    def load(self, resource_type: str) -> ResourceIndex:
+        rows = self.rows.get(resource_type, 0)
+        # Offset the seed per type so artists, albums and tracks are not the same vectors.
+        seed = self.seed + (list(self.rows).index(resource_type) if resource_type in self.rows else 0)
+        prefix = resource_type.rstrip('s')
+        names = [f'{prefix} {row}' for row in range(rows)]
+        return ResourceIndex(
+            resource_type=resource_type,
+            matrix=clustered_vectors(rows, self.dim, seed=seed),
+            item_ids=list(range(1, rows + 1)),
+            names=names,
+            spotify_ids=[f'{prefix}-{row}' for row in range(rows)],
+            model_versions=[None] * rows,
+            quality_scores=[None] * rows,
+            metadata=[{}] * rows,
+            default_model_version=self.model_version,
+        )
+
+
+class ShardedSource(EmbeddingSource):
+    """Keeps only the rows whose ``spotify_id`` hashes into this engine's shard range.
+
+    The inner source's deletion marker covers the whole table, so any deletion reloads
+    every shard. Items that move between shards are picked up by the periodic full reload.
+    """
+
+    def __init__(self, inner: EmbeddingSource, shard: ShardSpec):
+        super().__init__(dim=inner.dim, model_version=inner.model_version)
+        self.inner = inner
+        self.shard = shard
+        self.name = f'{inner.name}[{shard}]'
+        self.generation = inner.generation
+        self.deletions = inner.deletions
+        if inner.changes is not None:
+            self.changes = self._changes
+
+    def load(self, resource_type: str) -> ResourceIndex:
+        index = self.inner.load(resource_type)
+        return index.subset(self.shard.owned_rows(index.spotify_ids, index.names))
+
+    def _changes(self, resource_type: str, since: datetime) -> List[Dict[str, Any]]:
+        rows = self.inner.changes(resource_type, since)
+        return [row for row in rows if self.shard.owns(row.get('spotify_id'), row.get('name') or '')]
+
+
+def parse_synthetic_rows(value: str, resource_types: List[str]) -> Dict[str, int]:
+    """``"100000"`` applies to every type; ``"artists=1000,tracks=10000000"`` sets them individually."""
+    if '=' not in value:
+        return {resource_type: int(value) for resource_type in resource_types}
+    rows = {resource_type: 0 for resource_type in resource_types}
+    for part in value.split(','):
+        resource_type, _, count = part.partition('=')
+        rows[resource_type.strip()] = int(count)
+    return rows
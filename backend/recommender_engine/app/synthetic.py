@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def clustered_vectors(rows: int, dim: int, *, clusters: int = 256, spread: float = 1.0, seed: int = 0) -> np.ndarray:
+    """L2-normalized float32 vectors drawn from a Gaussian mixture.
+
+    Real embedding tables are clumpy (genres, eras, scenes), so a mixture gives
+    far more honest ANN and cache numbers than uniform noise does.
+    """
+    rng = np.random.default_rng(seed)
+    clusters = max(1, min(clusters, rows or 1))
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    matrix = centers[rng.integers(0, clusters, size=rows)]
+    matrix += rng.standard_normal((rows, dim)).astype(np.float32) * (spread / np.sqrt(dim))
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
@@ -0,0 +1,154 @@
+"""Recall@k vs latency report for the engine's IVF index.
+
+Compares approximate search at several ``nprobe`` settings against exact search
+(what ``_rank_candidates`` does with ``exact=True``) on the same index, so ANN
+settings can be chosen from measured numbers rather than guesses.
+
+    python -m bench.ann_recall --rows 1000000 --nprobe 4 8 16 32 64
+    python -m bench.ann_recall --data hashed --rows 100000 --nprobe 16 64 128
+
+``--data hashed`` builds rows the way the engine embeds tracks (name, spotify id,
+album and artist names through ``hash_token_lists``) and queries the way
+``/recommend`` embeds seeds, which is what the serving indexes actually hold.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.hashing import hash_token_lists
+from app.index import ResourceIndex
+from app.synthetic import clustered_vectors
+
+DATASETS = ('clustered', 'hashed', 'uniform')
+
+
+def _synthetic_index(matrix: np.ndarray) -> ResourceIndex:
+    rows = matrix.shape[0]
+    names = [f'item-{row}' for row in range(rows)]
+    return ResourceIndex(
+        resource_type='tracks',
+        matrix=matrix,
+        item_ids=list(range(rows)),
+        names=names,
+        spotify_ids=names,
+        model_versions=[None] * rows,
+        quality_scores=[None] * rows,
+        metadata=[{}] * rows,
+    )
+
+
+def hashed_token_vectors(rows: int, queries: int, dim: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Track-like token vectors and seed-like query vectors, as the engine hashes them."""
+    rng = np.random.default_rng(seed)
+    artists = [f'artist {n}' for n in range(max(rows // 50, 1))]
+    albums = max(rows // 10, 1)
+    album_artists = [rng.choice(len(artists), size=rng.integers(1, 3), replace=False) for _ in range(albums)]
+    token_lists = []
+    for row in range(rows):
+        album = row % albums
+        token_lists.append([f'track {row}', f'sp-{row}', f'album {album}', *(artists[a] for a in album_artists[album])])
+    seeds = [[artists[a] for a in rng.choice(len(artists), size=rng.integers(1, 6), replace=False)] for _ in range(queries)]
+    return (
+        hash_token_lists(token_lists, dim).astype(np.float32),
+        hash_token_lists(seeds, dim).astype(np.float32),
+    )
+
+
+def _dataset(data: str, rows: int, queries: int, dim: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    if data == 'hashed':
+        return hashed_token_vectors(rows, queries, dim, seed)
+    if data == 'uniform':
+        vectors = np.random.default_rng(seed).normal(size=(rows + queries, dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    else:
+        # Queries come from the same distribution as the catalog but are not rows of it.
+        vectors = clustered_vectors(rows + queries, dim, seed=seed)
+    return vectors[:rows], vectors[rows:]
+
+
+def _timed_search(index: ResourceIndex, queries: np.ndarray, k: int, **kwargs) -> tuple[list[set[str]], np.ndarray]:
+    results = []
+    latencies = np.empty(queries.shape[0])
+    for position, query in enumerate(queries):
+        started = time.perf_counter()
+        ranked = index.search(query, limit=k, exclude=set(), **kwargs)
+        latencies[position] = time.perf_counter() - started
+        results.append({item['extra']['spotify_id'] for item in ranked})
+    return results, latencies
+
+
+def _latency_summary(latencies: np.ndarray) -> dict:
+    return {
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+        'p95_ms': round(float(np.percentile(latencies, 95)) * 1000, 3),
+        'mean_ms': round(float(latencies.mean()) * 1000, 3),
+    }
+
+
+def run(
+    rows: int, dim: int, queries: int, k: int, n_lists: int, nprobes: list[int], seed: int, data: str = 'clustered',
+) -> dict:
+    matrix, query_matrix = _dataset(data, rows, queries, dim, seed)
+    index = _synthetic_index(matrix)
+    started = time.perf_counter()
+    index = index.with_ann(min_rows=1, n_lists=n_lists)
+    build_seconds = time.perf_counter() - started
+
+    exact, exact_latencies = _timed_search(index, query_matrix, k, exact=True)
+    report = {
+        'data': data,
+        'rows': rows,
+        'dim': dim,
+        'queries': queries,
+        'k': k,
+        'n_lists': index.ann.n_lists,
+        'build_seconds': round(build_seconds, 3),
+        'exact': _latency_summary(exact_latencies),
+        'ann': [],
+    }
+    for nprobe in nprobes:
+        approximate, latencies = _timed_search(index, query_matrix, k, nprobe=nprobe)
+        recall = np.mean([len(found & truth) / len(truth) for found, truth in zip(approximate, exact) if truth])
+        report['ann'].append({'nprobe': nprobe, f'recall@{k}': round(float(recall), 4), **_latency_summary(latencies)})
+    return report
+
+
+def _print_report(report: dict) -> None:
+    k = report['k']
+    print(
+        f"data={report['data']} rows={report['rows']} dim={report['dim']} lists={report['n_lists']} "
+        f"build={report['build_seconds']}s queries={report['queries']} k={k}"
+    )
+    print(f"{'search':>12} {'recall@' + str(k):>10} {'p50 ms':>9} {'p95 ms':>9}")
+    exact = report['exact']
+    print(f"{'exact':>12} {1.0:>10.4f} {exact['p50_ms']:>9.3f} {exact['p95_ms']:>9.3f}")
+    for row in report['ann']:
+        print(f"{'nprobe=' + str(row['nprobe']):>12} {row[f'recall@{k}']:>10.4f} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', choices=DATASETS, default='clustered', help='Vector distribution to index')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--dim', type=int, default=32)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--lists', type=int, default=0, help='IVF lists (0 = about sqrt(rows))')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Also write the report to this path')
+    args = parser.parse_args()
+
+    report = run(args.rows, args.dim, args.queries, args.k, args.lists, args.nprobe, args.seed, args.data)
+    _print_report(report)
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
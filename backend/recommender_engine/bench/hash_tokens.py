@@ -0,0 +1,88 @@
+"""Per-call cost of token hashing: the original per-token loop vs the memoized, vectorized path.
+
+Also checks that both produce bit-identical vectors, since stored embeddings and
+seed vectors depend on it.
+
+    python -m bench.hash_tokens --sizes 1 10 1000
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from app import hashing
+
+
+def _reference_hash_tokens(tokens: List[str], dim: int) -> np.ndarray:
+    # The engine's original implementation, kept verbatim as the baseline.
+    if not tokens:
+        tokens = ['unknown']
+    vector = np.zeros(dim)
+    for token in tokens:
+        digest = hashlib.sha1(token.encode('utf-8')).digest()
+        sample = np.frombuffer(digest[:dim], dtype=np.uint8)
+        vector[: len(sample)] += sample
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector = vector / norm
+    return vector
+
+
+def _per_call_us(function: Callable[[], object], repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def run(sizes: List[int], dim: int, repeat: int) -> dict:
+    report = {'dim': dim, 'repeat': repeat, 'sizes': []}
+    for size in sizes:
+        tokens = [f'token-{size}-{position}' for position in range(size)]
+        reference = _reference_hash_tokens(tokens, dim)
+        hashing._token_digest.cache_clear()
+        cold_started = time.perf_counter()
+        vector = hashing.hash_tokens(tokens, dim)
+        cold_us = (time.perf_counter() - cold_started) * 1e6
+        batch = hashing.hash_token_lists([tokens] * 64, dim)
+        if not (np.array_equal(vector, reference) and all(np.array_equal(row, reference) for row in batch)):
+            raise AssertionError(f'hash mismatch for {size} tokens')
+        report['sizes'].append({
+            'tokens': size,
+            'reference_us': round(_per_call_us(lambda: _reference_hash_tokens(tokens, dim), repeat), 2),
+            'cold_us': round(cold_us, 2),
+            'warm_us': round(_per_call_us(lambda: hashing.hash_tokens(tokens, dim), repeat), 2),
+            'batch64_per_list_us': round(
+                _per_call_us(lambda: hashing.hash_token_lists([tokens] * 64, dim), max(1, repeat // 64)) / 64, 2
+            ),
+        })
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 1000])
+    parser.add_argument('--dim', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--json', help='Also write the report to this path')
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.dim, args.repeat)
+    print(f"{'tokens':>7} {'original us':>12} {'cold us':>9} {'warm us':>9} {'batch/list us':>14}")
+    for row in report['sizes']:
+        print(
+            f"{row['tokens']:>7} {row['reference_us']:>12.2f} {row['cold_us']:>9.2f} "
+            f"{row['warm_us']:>9.2f} {row['batch64_per_list_us']:>14.2f}"
+        )
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
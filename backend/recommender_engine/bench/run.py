@@ -0,0 +1,199 @@
+"""End-to-end latency and throughput of /recommend and /embed on synthetic catalogs.
+
+Each catalog size runs in a fresh subprocess that serves the engine from the
+synthetic embedding source, so index build time and peak RSS are measured per
+size rather than accumulated. Requests go through FastAPI's TestClient in-process:
+numbers include routing, validation and serialization but no network.
+
+    python -m bench.run --rows 10000 100000 1000000 10000000 --concurrency 1 4 16 --json bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def _latency_summary(latencies: List[float], wall_seconds: float) -> Dict[str, float]:
+    values = np.asarray(latencies)
+    return {
+        'requests': int(values.size),
+        'p50_ms': round(float(np.percentile(values, 50)) * 1000, 3),
+        'p95_ms': round(float(np.percentile(values, 95)) * 1000, 3),
+        'p99_ms': round(float(np.percentile(values, 99)) * 1000, 3),
+        'mean_ms': round(float(values.mean()) * 1000, 3),
+        'throughput_rps': round(values.size / wall_seconds, 1),
+    }
+
+
+def _drive(send: Callable[[int], None], requests: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def timed(position: int) -> None:
+        started = time.perf_counter()
+        send(position)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(requests)))
+    return _latency_summary(latencies, time.perf_counter() - started)
+
+
+def _max_rss_bytes() -> int:
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _worker(args: argparse.Namespace) -> dict:
+    """Benchmark one catalog size inside this process; configured through the environment first."""
+    os.environ.update({
+        'RECOMMENDER_EMBEDDING_SOURCE': 'synthetic',
+        'RECOMMENDER_SYNTHETIC_ROWS': ','.join(f'{resource_type}={args.rows[0]}' for resource_type in args.types),
+        'RECOMMENDER_SYNTHETIC_SEED': str(args.seed),
+        'RECOMMENDER_INDEX_REFRESH_SECONDS': '0',
+        'RECOMMENDER_RESULT_CACHE_SIZE': str(args.cache_size),
+    })
+    if args.dim:
+        os.environ['RECOMMENDER_VECTOR_DIM'] = str(args.dim)
+
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    started = time.perf_counter()
+    main.INDEX_STORE.reload(main.RESOURCE_TYPES)
+    build_seconds = time.perf_counter() - started
+    rss_after_build = _max_rss_bytes()
+
+    names = main.INDEX_STORE.get(args.types[0]).names
+    # Drawn up front: Generator is not thread-safe, and every level then replays the same requests.
+    seed_rows = np.random.default_rng(args.seed).integers(0, max(len(names), 1), size=(args.requests, args.seeds))
+    local = threading.local()
+
+    def client() -> TestClient:
+        # One client per thread; the app and its indexes are shared.
+        if not hasattr(local, 'client'):
+            local.client = TestClient(main.app)
+        return local.client
+
+    def recommend(position: int) -> None:
+        seeds = [names[row] for row in seed_rows[position % args.requests]] if names else ['unknown']
+        response = client().post(
+            '/recommend',
+            json={'tracks': seeds, 'limit': args.limit, 'resource_types': args.types},
+        )
+        response.raise_for_status()
+
+    def embed(position: int) -> None:
+        response = client().post(
+            '/embed',
+            json={'resource_type': 'track', 'attributes': {'name': f'track {position}', 'artists': ['artist a', 'artist b']}},
+        )
+        response.raise_for_status()
+
+    endpoints: Dict[str, Dict[str, dict]] = {'recommend': {}, 'embed': {}}
+    for concurrency in args.concurrency:
+        _drive(recommend, min(args.warmup, args.requests), concurrency)
+        endpoints['recommend'][str(concurrency)] = _drive(recommend, args.requests, concurrency)
+        endpoints['embed'][str(concurrency)] = _drive(embed, args.requests, concurrency)
+
+    return {
+        'rows': args.rows[0],
+        'types': args.types,
+        'dim': main.VECTOR_DIM,
+        'index_build_seconds': round(build_seconds, 3),
+        'rss_after_build_bytes': rss_after_build,
+        'peak_rss_bytes': _max_rss_bytes(),
+        'indexes': {resource_type: main.INDEX_STORE.get(resource_type).memory_stats() for resource_type in args.types},
+        'endpoints': endpoints,
+    }
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        # Anything the caller exported (ANN, quantization, cache settings) shapes the results.
+        'settings': {key: value for key, value in sorted(os.environ.items()) if key.startswith('RECOMMENDER_')},
+    }
+
+
+def _print_run(run: dict) -> None:
+    print(
+        f"rows={run['rows']:,} dim={run['dim']} build={run['index_build_seconds']}s "
+        f"peak_rss={run['peak_rss_bytes'] / 2**20:.0f}MiB"
+    )
+    print(f"  {'endpoint':<10} {'conc':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+    for endpoint, levels in run['endpoints'].items():
+        for concurrency, summary in levels.items():
+            print(
+                f"  {endpoint:<10} {concurrency:>5} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} "
+                f"{summary['p99_ms']:>9.2f} {summary['throughput_rps']:>9.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--types', nargs='+', default=['tracks'], help='Resource types to populate and query')
+    parser.add_argument('--dim', type=int, default=0, help='Vector width (default: RECOMMENDER_VECTOR_DIM)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and concurrency level')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--seeds', type=int, default=5, help='Seed names per /recommend request')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--cache-size', type=int, default=0, help='Result cache entries (0 measures uncached ranking)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the report to this path')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        json.dump(_worker(args), sys.stdout)
+        return
+
+    report = {'environment': _environment(), 'runs': []}
+    for rows in args.rows:
+        command = [sys.executable, '-m', 'bench.run', '--worker', '--rows', str(rows)]
+        for flag in ('types', 'concurrency'):
+            command += [f'--{flag}', *map(str, getattr(args, flag))]
+        for flag in ('dim', 'requests', 'warmup', 'seeds', 'limit', 'cache_size', 'seed'):
+            command += [f"--{flag.replace('_', '-')}", str(getattr(args, flag))]
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+        run = json.loads(completed.stdout)
+        report['runs'].append(run)
+        _print_run(run)
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Sharded engines behind a coordinator, checked against one unsharded engine.
+
+Launches one reference engine, ``--shards`` shard engines and a coordinator as
+separate uvicorn processes on consecutive ports, all serving the same synthetic
+catalog. Every query goes to the reference and to the coordinator with
+``exact: true``; the merged top-k must match. One shard is then stopped to show
+the coordinator answering from the healthy shards with ``partial: true``.
+
+    python -m bench.shards --shards 4 --rows 200000 --queries 200
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+from bench.run import _latency_summary
+
+
+def _launch(port: int, env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning'],
+        env={**os.environ, **env},
+    )
+
+
+def _wait_ready(client: httpx.Client, url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get(f'{url}/stats').status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'{url} did not start within {timeout}s')
+
+
+def _names(body: dict, resource_type: str) -> List[str]:
+    return [item['name'] for item in body[resource_type]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shards', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=100000, help='Synthetic rows per resource type')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--base-port', type=int, default=8700)
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='Write the report to this path')
+    args = parser.parse_args()
+
+    common = {
+        'RECOMMENDER_EMBEDDING_SOURCE': 'synthetic',
+        'RECOMMENDER_SYNTHETIC_ROWS': str(args.rows),
+        'RECOMMENDER_SYNTHETIC_SEED': str(args.seed),
+        'RECOMMENDER_INDEX_REFRESH_SECONDS': '0',
+        'RECOMMENDER_RESULT_CACHE_SIZE': '0',
+    }
+    reference_url = f'http://127.0.0.1:{args.base_port}'
+    shard_urls = [f'http://127.0.0.1:{args.base_port + 1 + shard}' for shard in range(args.shards)]
+    coordinator_url = f'http://127.0.0.1:{args.base_port + 1 + args.shards}'
+
+    processes = [_launch(args.base_port, common)]
+    processes += [
+        _launch(args.base_port + 1 + shard, {**common, 'RECOMMENDER_SHARD': f'{shard}/{args.shards}'})
+        for shard in range(args.shards)
+    ]
+    processes.append(_launch(args.base_port + 1 + args.shards, {**common, 'RECOMMENDER_SHARD_URLS': ','.join(shard_urls)}))
+    client = httpx.Client(timeout=30)
+    try:
+        for url in [reference_url, *shard_urls, coordinator_url]:
+            _wait_ready(client, url, args.startup_timeout)
+        shard_rows = [client.get(f'{url}/stats').json()['indexes'] for url in shard_urls]
+
+        rng = np.random.default_rng(args.seed)
+        seed_rows = rng.integers(0, args.rows, size=(args.queries, args.seeds))
+        latencies: Dict[str, List[float]] = {'reference': [], 'coordinator': []}
+        matched = 0
+        for seeds in seed_rows:
+            payload = {'tracks': [f'track {row}' for row in seeds], 'limit': args.limit, 'exact': True}
+            bodies = {}
+            for label, url in (('reference', reference_url), ('coordinator', coordinator_url)):
+                started = time.perf_counter()
+                response = client.post(f'{url}/recommend', json=payload)
+                latencies[label].append(time.perf_counter() - started)
+                response.raise_for_status()
+                bodies[label] = response.json()
+            matched += all(
+                _names(bodies['reference'], resource_type) == _names(bodies['coordinator'], resource_type)
+                for resource_type in ('artists', 'albums', 'tracks')
+            )
+
+        processes[args.shards].terminate()
+        processes[args.shards].wait()
+        degraded = client.post(
+            f'{coordinator_url}/recommend', json={'tracks': ['track 1'], 'limit': args.limit, 'exact': True},
+        ).json()
+
+        report = {
+            'shards': args.shards,
+            'rows_per_type': args.rows,
+            'shard_rows': [{resource_type: stats['rows'] for resource_type, stats in rows.items()} for rows in shard_rows],
+            'queries': args.queries,
+            'identical_results': matched,
+            'latency': {label: _latency_summary(values, sum(values)) for label, values in latencies.items()},
+            'one_shard_down': {
+                'partial': degraded['partial'],
+                'missing_shards': degraded['missing_shards'],
+                'tracks_returned': len(degraded['tracks']),
+            },
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        client.close()
+
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
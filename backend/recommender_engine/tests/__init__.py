@@ -0,0 +1,6 @@
+"""Engine tests; run from recommender_engine with ``python -m unittest discover -s tests -t .``."""
+import os
+
+# app.main builds its embedding source at import time; serve small synthetic tables instead of Postgres.
+os.environ.setdefault('RECOMMENDER_EMBEDDING_SOURCE', 'synthetic')
+os.environ.setdefault('RECOMMENDER_SYNTHETIC_ROWS', '2000')
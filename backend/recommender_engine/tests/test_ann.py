@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import unittest
+
+from app import main
+from app.index import ResourceIndex
+from bench.ann_recall import _synthetic_index, hashed_token_vectors
+
+
+class AnnDefaultsTests(unittest.TestCase):
+    def setUp(self):
+        matrix, self.queries = hashed_token_vectors(5000, 20, 32, seed=1)
+        self.index: ResourceIndex = _synthetic_index(matrix)
+
+    def test_exact_search_is_the_default(self):
+        self.assertEqual(main.ANN_MIN_ROWS, 0)
+        self.assertIsNone(self.index.with_ann(min_rows=main.ANN_MIN_ROWS).ann)
+
+    def test_min_rows_gates_the_ivf_index(self):
+        self.assertIsNone(self.index.with_ann(min_rows=5001).ann)
+        self.assertEqual(self.index.with_ann(min_rows=5000, nprobe=main.ANN_NPROBE).ann.default_nprobe, main.ANN_NPROBE)
+
+
+if __name__ == '__main__':
+    unittest.main()
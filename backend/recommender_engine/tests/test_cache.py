@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+import unittest
+
+from app.cache import ResultCache, canonical_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ResultCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = _Clock()
+        self.cache = ResultCache(8, 60, clock=self.clock)
+
+    def test_concurrent_misses_compute_once(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'ranked'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(self.cache.get_or_compute('key', compute)))
+        leader.start()
+        self.assertTrue(started.wait(5))
+        followers = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_compute('key', compute))) for _ in range(4)
+        ]
+        for follower in followers:
+            follower.start()
+        # Followers register as collapsed under the lock before they block on the leader.
+        while self.cache.stats()['collapsed'] < len(followers):
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['ranked'] * 5)
+        stats = self.cache.stats()
+        self.assertEqual((stats['misses'], stats['collapsed'], stats['hits']), (1, 4, 0))
+        self.assertEqual(self.cache.get_or_compute('key', compute), 'ranked')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_followers_see_the_leaders_error_and_nothing_is_stored(self):
+        def compute():
+            raise RuntimeError('index not ready')
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_compute('key', compute)
+        self.assertEqual(self.cache.get_or_compute('key', lambda: 'ranked'), 'ranked')
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_new_generation_drops_every_entry(self):
+        self.cache.get_or_compute('a', lambda: 'v1 a', generation='v1')
+        self.cache.get_or_compute('b', lambda: 'v1 b', generation='v1')
+        self.assertEqual(self.cache.get_or_compute('a', lambda: 'unused', generation='v1'), 'v1 a')
+
+        self.assertEqual(self.cache.get_or_compute('a', lambda: 'v2 a', generation='v2'), 'v2 a')
+        self.assertEqual(self.cache.get_or_compute('b', lambda: 'v2 b', generation='v2'), 'v2 b')
+        stats = self.cache.stats()
+        self.assertEqual(stats['invalidations'], 1)
+        self.assertEqual(stats['entries'], 2)
+
+    def test_result_computed_across_a_generation_change_is_not_stored(self):
+        def compute():
+            # Another request sees the new index version while this one is still ranking.
+            self.cache.get_or_compute('other', lambda: 'v2 other', generation='v2')
+            return 'v1 a'
+
+        self.assertEqual(self.cache.get_or_compute('a', compute, generation='v1'), 'v1 a')
+        self.assertEqual(self.cache.get_or_compute('a', lambda: 'v2 a', generation='v2'), 'v2 a')
+
+    def test_entries_expire_and_uncacheable_values_are_not_stored(self):
+        self.cache.get_or_compute('a', lambda: 'old')
+        self.clock.now = 61
+        self.assertEqual(self.cache.get_or_compute('a', lambda: 'new'), 'new')
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+        self.cache.get_or_compute('partial', lambda: 'partial', cacheable=lambda value: False)
+        self.assertEqual(self.cache.get_or_compute('partial', lambda: 'complete'), 'complete')
+
+    def test_lru_eviction(self):
+        for position in range(10):
+            self.cache.get_or_compute(position, lambda position=position: position)
+        stats = self.cache.stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (8, 2))
+        self.assertEqual(self.cache.get_or_compute(0, lambda: 'recomputed'), 'recomputed')
+
+    def test_canonical_key_ignores_key_order(self):
+        self.assertEqual(canonical_key({'a': 1, 'b': [2]}), canonical_key({'b': [2], 'a': 1}))
+        self.assertNotEqual(canonical_key({'a': 1}), canonical_key({'a': 2}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+
+from app import hashing
+from bench.hash_tokens import _reference_hash_tokens
+
+
+class HashTokensTests(unittest.TestCase):
+    token_lists = [
+        [],
+        ['radiohead'],
+        ['radiohead', 'ok computer', 'alternative rock', 'radiohead'],
+        ['Sigur Rós', 'ágætis byrjun', '🎧', ''],
+        [f'token {position}' for position in range(500)],
+    ]
+
+    def test_single_lists_match_per_token_hashing_bit_for_bit(self):
+        for dim in (8, 20, 32, 64):
+            for tokens in self.token_lists:
+                with self.subTest(dim=dim, tokens=len(tokens)):
+                    self.assertTrue(np.array_equal(hashing.hash_tokens(tokens, dim), _reference_hash_tokens(tokens, dim)))
+
+    def test_batched_rows_match_per_token_hashing_bit_for_bit(self):
+        for dim in (8, 32, 64):
+            with self.subTest(dim=dim):
+                batch = hashing.hash_token_lists(self.token_lists, dim)
+                self.assertEqual(batch.shape, (len(self.token_lists), dim))
+                for row, tokens in zip(batch, self.token_lists):
+                    self.assertTrue(np.array_equal(row, _reference_hash_tokens(tokens, dim)))
+
+    def test_digest_cache_does_not_change_results(self):
+        tokens = self.token_lists[2]
+        hashing._token_digest.cache_clear()
+        cold = hashing.hash_tokens(tokens, 32)
+        self.assertTrue(np.array_equal(hashing.hash_tokens(tokens, 32), cold))
+
+    def test_empty_batch(self):
+        self.assertEqual(hashing.hash_token_lists([], 32).shape, (0, 32))
+
+
+if __name__ == '__main__':
+    unittest.main()
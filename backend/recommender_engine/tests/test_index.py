@@ -0,0 +1,95 @@
+"""Run from recommender_engine with ``python -m unittest discover -s tests -t .``."""
+from __future__ import annotations
+
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.index import IndexStore, ResourceIndex
+
+
+def _rows(count: int, dim: int, modified_at: datetime) -> list[dict]:
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(count, dim)).astype('<f4')
+    return [
+        {
+            'item_id': position,
+            'name': f'item {position}',
+            'spotify_id': f'sp-{position}',
+            'vector': vectors[position].tobytes(),
+            'model_version': 'v1',
+            'quality_score': 0.0,
+            'metadata': {},
+            'modified_at': modified_at + timedelta(microseconds=position),
+        }
+        for position in range(count)
+    ]
+
+
+class IndexRefreshTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = _rows(2000, 32, datetime(2026, 1, 1))
+        self.store = IndexStore(
+            lambda resource_type: ResourceIndex.from_rows(resource_type, self.rows, dim=32),
+            # Every row sits inside the overlap window, so each refresh re-reads all of them.
+            changes=lambda resource_type, since: [row for row in self.rows if row['modified_at'] > since],
+            overlap_seconds=5,
+        )
+
+    def test_refresh_with_unchanged_overlap_window_keeps_the_index(self):
+        index = self.store.get('artists')
+        version = self.store.version
+
+        self.assertFalse(self.store.refresh('artists'))
+        self.assertEqual(self.store.version, version)
+        self.assertIs(self.store.get('artists'), index)
+
+    def test_refresh_swaps_in_a_changed_row(self):
+        self.store.get('artists')
+        version = self.store.version
+        self.rows[7] = {**self.rows[7], 'vector': np.ones(32, dtype='<f4').tobytes()}
+
+        self.assertTrue(self.store.refresh('artists'))
+        self.assertEqual(self.store.version, version + 1)
+        np.testing.assert_allclose(self.store.get('artists').matrix[7], np.full(32, 32 ** -0.5), rtol=1e-6)
+
+
+
+class IndexDeletionTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = _rows(50, 8, datetime(2026, 1, 1))
+        self.deleted = {'artists': 0}
+        self.loads = 0
+
+        def load(resource_type):
+            self.loads += 1
+            return ResourceIndex.from_rows(resource_type, self.rows, dim=8)
+
+        self.store = IndexStore(
+            load,
+            changes=lambda resource_type, since: [row for row in self.rows if row['modified_at'] > since],
+            deletions=lambda resource_type: self.deleted[resource_type],
+        )
+        self.store.get('artists')
+
+    def test_rows_inserted_between_polls_are_patched_without_a_full_load(self):
+        self.rows.append({**_rows(51, 8, datetime(2026, 1, 2))[50], 'item_id': 50})
+
+        self.assertTrue(self.store.refresh('artists'))
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(len(self.store.get('artists')), 51)
+
+    def test_a_deletion_forces_a_full_load(self):
+        del self.rows[3]
+        self.deleted['artists'] += 1
+
+        self.assertTrue(self.store.refresh('artists'))
+        self.assertEqual(self.loads, 2)
+        self.assertNotIn(3, self.store.get('artists').item_ids)
+        self.assertFalse(self.store.refresh('artists'))
+        self.assertEqual(self.loads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+
+from app.quant import ScalarQuantizer, estimate_recall
+from bench.ann_recall import _synthetic_index, hashed_token_vectors
+
+
+def _recall_at(index, exact_index, queries: np.ndarray, k: int = 10) -> float:
+    found = 0
+    for query in queries:
+        truth = {item['name'] for item in exact_index.search(query, limit=k, exclude=set(), exact=True)}
+        found += len(truth & {item['name'] for item in index.search(query, limit=k, exclude=set())})
+    return found / (k * queries.shape[0])
+
+
+class QuantizedIndexTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        matrix, cls.queries = hashed_token_vectors(20000, 50, 64, seed=2)
+        cls.exact = _synthetic_index(matrix)
+        cls.quantized = cls.exact.with_quantization(rerank=256)
+
+    def test_recall_against_exact_search(self):
+        self.assertGreaterEqual(_recall_at(self.quantized, self.exact, self.queries), 0.99)
+        self.assertGreaterEqual(self.quantized.quantized_recall, 0.99)
+
+    def test_codes_take_a_quarter_of_the_float32_matrix(self):
+        stats = self.quantized.memory_stats()
+        self.assertTrue(stats['quantized'])
+        self.assertTrue(stats['float32_mapped'])
+        self.assertEqual(stats['float32_bytes'], 20000 * 64 * 4)
+        # int8 codes plus one float32 scale and offset per dimension.
+        self.assertEqual(stats['int8_bytes'], 20000 * 64 + 2 * 64 * 4)
+        self.assertEqual(stats['resident_bytes'], stats['int8_bytes'])
+        self.assertGreater(stats['savings_ratio'], 3.9)
+
+    def test_scores_approximate_the_float_dot_product(self):
+        matrix = np.asarray(self.exact.matrix)
+        quantizer = ScalarQuantizer.fit(matrix)
+        exact = matrix @ self.queries[0]
+        approximate = quantizer.scores(self.queries[0])
+        # Each dimension is off by at most half a quantization step.
+        bound = 0.5 * np.abs(self.queries[0]) @ quantizer.scale
+        self.assertLessEqual(float(np.max(np.abs(approximate - exact))), bound + 1e-5)
+        rows = np.array([3, 70, 1999])
+        np.testing.assert_allclose(quantizer.scores(self.queries[0], rows), approximate[rows], rtol=1e-6)
+        np.testing.assert_allclose(quantizer.scores_batch(self.queries[:4])[0], approximate, rtol=1e-5, atol=1e-6)
+
+    def test_recall_estimate_needs_enough_rows(self):
+        matrix = np.asarray(self.exact.matrix)[:10]
+        self.assertIsNone(estimate_recall(matrix, ScalarQuantizer.fit(matrix), rerank=5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+
+from bench.ann_recall import _synthetic_index
+
+
+def _matrix(rows: int, dim: int, seed: int) -> np.ndarray:
+    matrix = np.random.default_rng(seed).normal(size=(rows, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+class SearchBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.index = _synthetic_index(_matrix(3000, 32, seed=5))
+        self.queries = np.random.default_rng(6).normal(size=(12, 32)).astype(np.float32)
+        self.limits = [10, 1, 25, 0, 10, 50, 3, 10, 10, 7, 2, 10]
+        self.excludes = [set() for _ in self.queries]
+        # Exclude each query's own top hits so masking is exercised alongside the limits.
+        for position in (0, 4, 9):
+            top = self.index.search(self.queries[position], limit=5, exclude=set(), exact=True)
+            self.excludes[position] = {item['name'] for item in top}
+
+    def assertSameRanking(self, batch_items, single_items):
+        self.assertEqual([item['name'] for item in batch_items], [item['name'] for item in single_items])
+        for batch_item, single_item in zip(batch_items, single_items):
+            self.assertAlmostEqual(batch_item['score'], single_item['score'], places=5)
+            self.assertEqual(batch_item['likeness'], single_item['likeness'])
+            self.assertEqual(batch_item['extra'], single_item['extra'])
+
+    def test_batch_rows_equal_single_exact_searches(self):
+        batch = self.index.search_batch(self.queries, limits=self.limits, excludes=self.excludes)
+        for query, limit, exclude, items in zip(self.queries, self.limits, self.excludes, batch):
+            self.assertSameRanking(items, self.index.search(query, limit=limit, exclude=exclude, exact=True))
+
+    def test_small_blocks_give_the_same_rows(self):
+        whole = self.index.search_batch(self.queries, limits=self.limits, excludes=self.excludes)
+        blocked = self.index.search_batch(self.queries, limits=self.limits, excludes=self.excludes, max_block_cells=3000 * 5)
+        for whole_items, blocked_items in zip(whole, blocked):
+            self.assertSameRanking(blocked_items, whole_items)
+
+    def test_batch_ignores_the_ann_index(self):
+        ann_index = self.index.with_ann(min_rows=1, n_lists=64, nprobe=1)
+        batch = ann_index.search_batch(self.queries, limits=self.limits, excludes=self.excludes)
+        for query, limit, exclude, items in zip(self.queries, self.limits, self.excludes, batch):
+            self.assertSameRanking(items, self.index.search(query, limit=limit, exclude=exclude, exact=True))
+
+    def test_quantized_batch_rows_equal_single_quantized_searches(self):
+        quantized = self.index.with_quantization(rerank=200)
+        batch = quantized.search_batch(self.queries, limits=self.limits, excludes=self.excludes)
+        for query, limit, exclude, items in zip(self.queries, self.limits, self.excludes, batch):
+            self.assertSameRanking(items, quantized.search(query, limit=limit, exclude=exclude))
+
+    def test_zero_queries_and_zero_vectors_return_empty_rows(self):
+        queries = np.vstack([np.zeros(32, dtype=np.float32), self.queries[0]])
+        batch = self.index.search_batch(queries, limits=[10, 10], excludes=[set(), set()])
+        self.assertEqual(batch[0], [])
+        self.assertSameRanking(batch[1], self.index.search(self.queries[0], limit=10, exclude=set(), exact=True))
+        self.assertEqual(self.index.search_batch(queries[:0], limits=[], excludes=[]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
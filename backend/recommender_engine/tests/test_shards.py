@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from unittest import mock
+
+import httpx
+import numpy as np
+
+from app import main
+from app.shards import ShardCoordinator, ShardSpec, merge_ranked
+from bench.ann_recall import _synthetic_index
+
+
+def _shard(index, spec: ShardSpec):
+    rows = spec.owned_rows(index.spotify_ids, index.names)
+    return replace(
+        index,
+        matrix=index.matrix[rows],
+        item_ids=[index.item_ids[row] for row in rows],
+        names=[index.names[row] for row in rows],
+        spotify_ids=[index.spotify_ids[row] for row in rows],
+        model_versions=[index.model_versions[row] for row in rows],
+        quality_scores=[index.quality_scores[row] for row in rows],
+        metadata=[index.metadata[row] for row in rows],
+    )
+
+
+class ShardSpecTests(unittest.TestCase):
+    def test_every_row_belongs_to_exactly_one_shard(self):
+        spotify_ids = [f'sp-{position}' if position % 7 else None for position in range(5000)]
+        names = [f'item {position}' for position in range(5000)]
+        owned = [ShardSpec(index, 4).owned_rows(spotify_ids, names) for index in range(4)]
+        self.assertTrue(np.array_equal(np.sort(np.concatenate(owned)), np.arange(5000)))
+        # The hash spreads rows evenly enough that no shard is more than 10% over its share.
+        self.assertLess(max(rows.size for rows in owned), 1250 * 1.1)
+
+    def test_parse(self):
+        self.assertEqual(ShardSpec.parse('2/4'), ShardSpec(2, 4))
+        self.assertEqual(str(ShardSpec.parse('0/1')), '0/1')
+        for value in ('4/4', '-1/2', '0/0', 'one'):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                ShardSpec.parse(value)
+
+
+class MergeRankedTests(unittest.TestCase):
+    def test_merge_keeps_the_global_top_k(self):
+        first = [{'name': 'a', 'likeness': 0.9, 'extra': {'score': 0.91}}, {'name': 'c', 'likeness': 0.5, 'extra': {'score': 0.5}}]
+        second = [{'name': 'b', 'likeness': 0.9, 'extra': {'score': 0.93}}, {'name': 'd', 'likeness': 0.2, 'extra': {'score': 0.2}}]
+        self.assertEqual([item['name'] for item in merge_ranked([first, second, []], 3)], ['b', 'a', 'c'])
+
+    def test_equal_scores_keep_shard_order(self):
+        first = [{'name': 'a', 'likeness': 0.5, 'extra': {'score': 0.5}}]
+        second = [{'name': 'b', 'likeness': 0.5, 'extra': {'score': 0.5}}]
+        self.assertEqual([item['name'] for item in merge_ranked([first, second], 2)], ['a', 'b'])
+
+
+class ShardedRecommendTests(unittest.TestCase):
+    def setUp(self):
+        matrix = np.random.default_rng(4).normal(size=(4000, main.VECTOR_DIM)).astype(np.float32)
+        self.index = _synthetic_index(matrix / np.linalg.norm(matrix, axis=1, keepdims=True))
+        self.shards = {f'http://shard-{position}': _shard(self.index, ShardSpec(position, 3)) for position in range(3)}
+        self.down: set[str] = set()
+        self.calls = 0
+        self.executor = ThreadPoolExecutor(max_workers=3)
+        self.coordinator = ShardCoordinator(list(self.shards), timeout=1, executor=self.executor)
+        self.coordinator._client.close()
+        self.coordinator._client = httpx.Client(transport=httpx.MockTransport(self._handle))
+        main.RESULT_CACHE.clear()
+        patcher = mock.patch.object(main, 'SHARD_COORDINATOR', self.coordinator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.coordinator.close()
+        self.executor.shutdown()
+        main.RESULT_CACHE.clear()
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        url = f'{request.url.scheme}://{request.url.host}'
+        if url in self.down:
+            return httpx.Response(503)
+        payload = json.loads(request.content)
+        self.assertTrue(payload['include_scores'])
+        user_vector = main._vector_from_tokens(payload['tracks'])
+        ranked = self.shards[url].search(user_vector, limit=payload['limit'], exclude=set(), exact=True)
+        return httpx.Response(200, json={'tracks': main._with_scores(ranked), 'missing_types': []})
+
+    def _recommend(self) -> dict:
+        request = main.RecommendationRequest(tracks=['seed track'], resource_types=['tracks'], limit=15)
+        return json.loads(main.recommend(request).body)
+
+    def test_merged_shards_match_a_single_index(self):
+        expected = self.index.search(main._vector_from_tokens(['seed track']), limit=15, exclude=set(), exact=True)
+        body = self._recommend()
+        self.assertFalse(body['partial'])
+        self.assertEqual(body['missing_shards'], [])
+        self.assertEqual([item['name'] for item in body['tracks']], [item['name'] for item in expected])
+        self.assertNotIn('score', body['tracks'][0]['extra'])
+
+    def test_failed_shard_is_reported_and_the_partial_response_is_not_cached(self):
+        self.down.add('http://shard-1')
+        body = self._recommend()
+        self.assertTrue(body['partial'])
+        self.assertEqual(body['missing_shards'], ['http://shard-1'])
+        expected = merge_ranked([
+            main._with_scores(self.shards[url].search(main._vector_from_tokens(['seed track']), limit=15, exclude=set(), exact=True))
+            for url in ('http://shard-0', 'http://shard-2')
+        ], 15)
+        self.assertEqual([item['name'] for item in body['tracks']], [item['name'] for item in expected])
+
+        self.down.clear()
+        body = self._recommend()
+        self.assertFalse(body['partial'])
+        self.assertEqual(self.calls, 6)
+        self._recommend()
+        self.assertEqual(self.calls, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -300,6 +300,15 @@ CELERY_TASK_ROUTES = {
     'catalog.tasks.sync_spotify_genres': {'queue': 'catalog'},
     'catalog.tasks.crawl_catalog': {'queue': 'catalog'},
     'recommender.tasks.ingest_training_data': {'queue': 'recommender'},
+    'recommender.tasks.ingest_training_data_parallel': {'queue': 'recommender'},
+    'recommender.tasks.ingest_audio_shard': {'queue': 'recommender'},
+    'recommender.tasks.merge_ingest_results': {'queue': 'recommender'},
+    'recommender.tasks.sync_stale_embeddings': {'queue': 'recommender'},
+    'recommender.tasks.export_embedding_snapshot': {'queue': 'recommender'},
+    'recommender.tasks.refresh_engine_model_version': {'queue': 'recommender'},
+    'recommender.tasks.compute_item_neighbors': {'queue': 'recommender'},
+    'recommender.tasks.refresh_profile_recommendations': {'queue': 'recommender'},
+    'recommender.tasks.refresh_profile_recommendation': {'queue': 'recommender'},
 }
 CELERY_BEAT_SCHEDULE = {
     'sync-spotify-genres-daily': {
@@ -310,6 +319,22 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'catalog.tasks.refresh_featured_genres',
         'schedule': 60 * 60 * 24,  # 24 hours
     },
+    'export-embedding-snapshot-hourly': {
+        'task': 'recommender.tasks.export_embedding_snapshot',
+        'schedule': 60 * 60,  # 1 hour; no-op unless RECOMMENDER_SNAPSHOT_DIR is set
+    },
+    'refresh-engine-model-version-minutely': {
+        'task': 'recommender.tasks.refresh_engine_model_version',
+        'schedule': 60,  # 1 minute; bounds how long cached responses outlive an engine model change
+    },
+    'compute-item-neighbors-hourly': {
+        'task': 'recommender.tasks.compute_item_neighbors',
+        'schedule': 60 * 60,  # 1 hour; only newly embedded or changed items
+    },
+    'refresh-profile-recommendations-daily': {
+        'task': 'recommender.tasks.refresh_profile_recommendations',
+        'schedule': 60 * 60 * 24,  # 24 hours; edits to favourites refresh a single profile immediately
+    },
 }
 # Keep Redis-queued tasks invisible long enough for workers to finish after fetching.
 CELERY_BROKER_TRANSPORT_OPTIONS = {
@@ -320,8 +345,64 @@ CELERY_WORKER_DISABLE_PREFETCH = True
 # With prefetch disabled we still cap to one task per worker process for deterministic flow.
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 
+# One cache for every web and worker process, so the recommendation response cache, its model-version
+# pointer and OAuth state are shared; defaults to the broker's Redis. Tests keep a per-process LocMemCache.
+DJANGO_CACHE_URL = os.environ.get('DJANGO_CACHE_URL', CELERY_BROKER_URL)
+if DJANGO_CACHE_URL.startswith(('redis://', 'rediss://')) and _cmd != 'test':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': DJANGO_CACHE_URL,
+            'KEY_PREFIX': 'juke',
+        },
+    }
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
 RECOMMENDER_ENGINE_BASE_URL = _required_env("RECOMMENDER_ENGINE_BASE_URL")
 RECOMMENDER_ENGINE_TIMEOUT = int(os.environ.get('RECOMMENDER_ENGINE_TIMEOUT', '15'))
+RECOMMENDER_ENGINE_BATCH_SIZE = int(os.environ.get('RECOMMENDER_ENGINE_BATCH_SIZE', '500'))
+# Pooled keep-alive connections to the engine, and retries for transient failures with jittered backoff.
+RECOMMENDER_ENGINE_POOL_SIZE = int(os.environ.get('RECOMMENDER_ENGINE_POOL_SIZE', '10'))
+RECOMMENDER_ENGINE_RETRIES = int(os.environ.get('RECOMMENDER_ENGINE_RETRIES', '2'))
+RECOMMENDER_ENGINE_RETRY_BACKOFF = float(os.environ.get('RECOMMENDER_ENGINE_RETRY_BACKOFF', '0.1'))
+# Consecutive engine failures that open the circuit, and seconds before a trial call is let through.
+RECOMMENDER_ENGINE_BREAKER_THRESHOLD = int(os.environ.get('RECOMMENDER_ENGINE_BREAKER_THRESHOLD', '5'))
+RECOMMENDER_ENGINE_BREAKER_RESET_SECONDS = float(os.environ.get('RECOMMENDER_ENGINE_BREAKER_RESET_SECONDS', '30'))
+# Milliseconds after it starts before a slow engine call is hedged with a second copy (0 disables),
+# and how many hedges may be in flight per process.
+RECOMMENDER_ENGINE_HEDGE_AFTER_MS = int(os.environ.get('RECOMMENDER_ENGINE_HEDGE_AFTER_MS', '0'))
+RECOMMENDER_ENGINE_HEDGE_POOL_SIZE = int(os.environ.get('RECOMMENDER_ENGINE_HEDGE_POOL_SIZE', '2'))
+# Seconds between each process's "engine call stats" log line (0 disables).
+RECOMMENDER_ENGINE_STATS_LOG_SECONDS = float(os.environ.get('RECOMMENDER_ENGINE_STATS_LOG_SECONDS', '300'))
+# Seconds a validated /recommendations response is reused for the same taste payload (0 disables).
+RECOMMENDER_RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RECOMMENDER_RESPONSE_CACHE_TTL_SECONDS', '300'))
+RECOMMENDER_MODEL_VERSION = os.environ.get('RECOMMENDER_MODEL_VERSION', 'v1.0.0')
+# model_version stamped on embeddings built locally from TrackAudioFeatures (build_audio_embeddings), and the
+# snapshot directory they are published to; they stay out of the serving tables, which hold engine vectors.
+RECOMMENDER_AUDIO_MODEL_VERSION = os.environ.get('RECOMMENDER_AUDIO_MODEL_VERSION', 'audio-v1')
+RECOMMENDER_AUDIO_EMBEDDING_DIR = os.environ.get('RECOMMENDER_AUDIO_EMBEDDING_DIR', '')
+# Entities per /embed/batch call when re-syncing stored embeddings.
+RECOMMENDER_EMBED_CHUNK_SIZE = int(os.environ.get('RECOMMENDER_EMBED_CHUNK_SIZE', '500'))
+RECOMMENDER_VECTOR_DIM = int(os.environ.get('RECOMMENDER_VECTOR_DIM', '32'))
+# Directory shared with the engine for memory-mapped embedding snapshots (empty disables export).
+RECOMMENDER_SNAPSHOT_DIR = os.environ.get('RECOMMENDER_SNAPSHOT_DIR', '')
+RECOMMENDER_SNAPSHOT_KEEP = int(os.environ.get('RECOMMENDER_SNAPSHOT_KEEP', '3'))
+# Columnar TrackAudioFeatures export for training code and the engine (export_audio_features).
+RECOMMENDER_AUDIO_EXPORT_DIR = os.environ.get('RECOMMENDER_AUDIO_EXPORT_DIR', '')
+RECOMMENDER_AUDIO_EXPORT_CHUNK_ROWS = int(os.environ.get('RECOMMENDER_AUDIO_EXPORT_CHUNK_ROWS', '100000'))
+# Seconds incremental exports re-read behind their watermark for rows committed out of order.
+RECOMMENDER_AUDIO_EXPORT_OVERLAP_SECONDS = float(os.environ.get('RECOMMENDER_AUDIO_EXPORT_OVERLAP_SECONDS', '30'))
+# Neighbours stored per item for "more like this", and scoring threads for the job (0 = up to 4 CPUs).
+RECOMMENDER_NEIGHBORS_K = int(os.environ.get('RECOMMENDER_NEIGHBORS_K', '50'))
+RECOMMENDER_NEIGHBORS_WORKERS = int(os.environ.get('RECOMMENDER_NEIGHBORS_WORKERS', '0'))
+# Items per resource type stored for each profile's precomputed "for you" results.
+RECOMMENDER_PROFILE_RESULT_LIMIT = int(os.environ.get('RECOMMENDER_PROFILE_RESULT_LIMIT', '20'))
+# Tracks per parallel audio-feature ingest shard (one Celery task each).
+RECOMMENDER_INGEST_SHARD_SIZE = int(os.environ.get('RECOMMENDER_INGEST_SHARD_SIZE', '1000'))
+# Spotify calls per second across every ingest worker; counted in this Redis (defaults to the broker) when it is one.
+RECOMMENDER_SPOTIFY_CALLS_PER_SECOND = float(os.environ.get('RECOMMENDER_SPOTIFY_CALLS_PER_SECOND', '5'))
+RECOMMENDER_RATE_LIMIT_REDIS_URL = os.environ.get('RECOMMENDER_RATE_LIMIT_REDIS_URL', CELERY_BROKER_URL)
 
 # OpenAI / TuneTrivia
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
@@ -1,10 +1,16 @@
+import struct
 from unittest import mock
 
+from django.core.cache import cache
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from juke_auth.models import JukeUser
+from catalog.models import Artist
+from juke_auth.models import JukeUser, MusicProfile
+from recommender.models import ItemNeighbors, ProfileRecommendation, pack_vector
+from recommender.services import client as client_module
+from recommender.tasks import refresh_engine_model_version
 
 
 class RecommendationEndpointTests(APITestCase):
@@ -12,6 +18,8 @@ class RecommendationEndpointTests(APITestCase):
 
     def setUp(self):
         self.user = JukeUser.objects.create_user(username='tester', password='secret', email='tester@example.com')
+        cache.clear()
+        self.addCleanup(cache.clear)
 
     def test_requires_authentication_returns_unauthorized(self):
         response = self.client.post(self.url, data={}, format='json')
@@ -86,3 +94,170 @@ class RecommendationEndpointTests(APITestCase):
         expected = fixed.isoformat().replace('+00:00', 'Z')
         self.assertEqual(response.data['generated_at'], expected)
         self.assertEqual(response.data['model_version'], 'v2')
+
+    @mock.patch('recommender.views.client.fetch_recommendations')
+    def test_repeat_payload_is_served_from_cache(self, mock_fetch):
+        mock_fetch.return_value = {
+            'artists': [{'name': 'Deftones', 'likeness': 0.8}],
+            'model_version': 'v1.0.0',
+            'generated_at': '2026-01-18T00:00:00Z',
+        }
+        self.client.force_login(self.user)
+
+        first = self.client.post(self.url, data={'artists': ['Tool', 'Isis'], 'limit': 5}, format='json')
+        second = self.client.post(self.url, data={'artists': ['Isis', 'Tool'], 'limit': 5}, format='json')
+        other_limit = self.client.post(self.url, data={'artists': ['Tool', 'Isis'], 'limit': 6}, format='json')
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(other_limit.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_fetch.call_count, 2)
+
+    @mock.patch('recommender.views.client.fetch_recommendations')
+    def test_new_engine_model_version_invalidates_cache(self, mock_fetch):
+        mock_fetch.return_value = {'artists': [], 'model_version': 'v1.0.0', 'generated_at': '2026-01-18T00:00:00Z'}
+        self.client.force_login(self.user)
+        payload = {'artists': ['Tool']}
+        self.client.post(self.url, data=payload, format='json')
+
+        # Another request (e.g. different seeds) sees the engine roll to a new model.
+        mock_fetch.return_value = {'artists': [], 'model_version': 'v2.0.0', 'generated_at': '2026-01-19T00:00:00Z'}
+        self.client.post(self.url, data={'artists': ['Isis']}, format='json')
+        response = self.client.post(self.url, data=payload, format='json')
+
+        self.assertEqual(mock_fetch.call_count, 3)
+        self.assertEqual(response.data['model_version'], 'v2.0.0')
+
+    @mock.patch('recommender.tasks.fetch_engine_stats')
+    @mock.patch('recommender.views.client.fetch_recommendations')
+    def test_engine_model_change_reaches_keys_that_only_ever_hit(self, mock_fetch, mock_stats):
+        mock_fetch.return_value = {'artists': [], 'model_version': 'v1.0.0', 'generated_at': '2026-01-18T00:00:00Z'}
+        self.client.force_login(self.user)
+        payload = {'artists': ['Tool']}
+        self.client.post(self.url, data=payload, format='json')
+        self.client.post(self.url, data=payload, format='json')
+        self.assertEqual(mock_fetch.call_count, 1)
+
+        mock_stats.return_value = {'model_version': 'v1.0.0', 'index_version': 3}
+        self.assertEqual(refresh_engine_model_version.delay().get(), {'model_version': 'v1.0.0'})
+        self.client.post(self.url, data=payload, format='json')
+        self.assertEqual(mock_fetch.call_count, 1)
+
+        mock_stats.return_value = {'model_version': 'v2.0.0', 'index_version': 4}
+        refresh_engine_model_version.delay()
+        mock_fetch.return_value = {'artists': [], 'model_version': 'v2.0.0', 'generated_at': '2026-01-19T00:00:00Z'}
+        response = self.client.post(self.url, data=payload, format='json')
+
+        self.assertEqual(mock_fetch.call_count, 2)
+        self.assertEqual(response.data['model_version'], 'v2.0.0')
+
+    @mock.patch('recommender.views.client.fetch_recommendations')
+    def test_partial_engine_response_is_not_cached(self, mock_fetch):
+        mock_fetch.return_value = {
+            'artists': [], 'model_version': 'v1.0.0', 'generated_at': '2026-01-18T00:00:00Z', 'partial': True,
+        }
+        self.client.force_login(self.user)
+        for _ in range(2):
+            self.client.post(self.url, data={'artists': ['Tool']}, format='json')
+
+        self.assertEqual(mock_fetch.call_count, 2)
+
+
+class ItemNeighborsEndpointTests(APITestCase):
+    def setUp(self):
+        self.user = JukeUser.objects.create_user(username='tester', password='secret', email='tester@example.com')
+        self.artists = [Artist.objects.create(name=f'Artist {n}', spotify_id=f'artist-{n}') for n in range(3)]
+        ItemNeighbors.objects.create(
+            resource_type='artists',
+            item_id=self.artists[0].pk,
+            neighbor_ids=struct.pack('<2q', self.artists[2].pk, self.artists[1].pk),
+            scores=pack_vector([0.9, 0.4]),
+            model_version='v1',
+            source_modified_at=timezone.now(),
+        )
+
+    def url(self, item_id, resource_type='artists'):
+        return f'/api/v1/recommendations/neighbors/{resource_type}/{item_id}/'
+
+    def test_requires_authentication(self):
+        response = self.client.get(self.url(self.artists[0].pk))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_returns_ranked_neighbors(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url(self.artists[0].pk), {'limit': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['model_version'], 'v1')
+        self.assertEqual(len(response.data['neighbors']), 1)
+        neighbor = response.data['neighbors'][0]
+        self.assertEqual((neighbor['id'], neighbor['name'], neighbor['spotify_id']), (self.artists[2].pk, 'Artist 2', 'artist-2'))
+        self.assertAlmostEqual(neighbor['likeness'], 0.9, places=4)
+
+    def test_missing_item_returns_not_found(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url(self.artists[1].pk)).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.url(self.artists[0].pk, 'playlists')).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StoredRecommendationEndpointTests(APITestCase):
+    url = '/api/v1/recommendations/me/'
+
+    def setUp(self):
+        self.user = JukeUser.objects.create_user(username='tester', password='secret', email='tester@example.com')
+        self.profile = MusicProfile.objects.create(user=self.user)
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @mock.patch('recommender.views.client.fetch_recommendations')
+    def test_serves_stored_results_without_engine(self, mock_fetch):
+        ProfileRecommendation.objects.create(
+            profile=self.profile,
+            results={
+                'artists': [{'name': 'A Perfect Circle', 'likeness': 0.92}, {'name': 'Deftones', 'likeness': 0.8}],
+                'albums': [],
+                'tracks': [],
+            },
+            seed_digest='digest',
+            model_version='v1-test',
+            generated_at='2026-01-18T00:00:00Z',
+        )
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.url, {'limit': 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['artists']], ['A Perfect Circle'])
+        self.assertEqual(response.data['model_version'], 'v1-test')
+        mock_fetch.assert_not_called()
+
+    def test_not_found_before_first_computation(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EngineStatsEndpointTests(APITestCase):
+    url = '/api/v1/recommendations/engine-stats/'
+
+    def setUp(self):
+        self.user = JukeUser.objects.create_user(username='tester', password='secret', email='tester@example.com')
+
+    def test_requires_staff(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reports_engine_call_counters(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        stats = client_module.CallStats()
+        stats.record('/recommend', 'ok', 0.02)
+
+        with mock.patch.object(client_module, 'STATS', stats):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['breaker'], 'closed')
+        self.assertEqual(response.data['endpoints']['/recommend']['outcomes'], {'ok': 1})
+        self.assertIn('pid', response.data)
@@ -1,6 +1,7 @@
+import tempfile
 from datetime import date
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from catalog.models import Album, Artist, AlbumImageResource
@@ -32,8 +33,10 @@ class AlbumTests(TestCase):
         al = create_album(name='some-album', total_tracks=10, release_date=date(year=1970, month=1, day=10))
         image1 = SimpleUploadedFile('file1.png', b'file_content', content_type='image/png')
         image2 = SimpleUploadedFile('file2.png', b'file_content', content_type='image/png')
-        AlbumImageResource.objects.create(image=image1, album=al)
-        AlbumImageResource.objects.create(image=image2, album=al)
+        # Uploads land under MEDIA_ROOT; keep them out of the source tree.
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            AlbumImageResource.objects.create(image=image1, album=al)
+            AlbumImageResource.objects.create(image=image2, album=al)
         self.assertEqual(al.images.count(), 2)
 
     def test_get_or_create_normalizes_release_date_precision(self):
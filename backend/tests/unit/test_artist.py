@@ -1,4 +1,6 @@
-from django.test import TestCase
+import tempfile
+
+from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from catalog.models import Artist, ArtistImageResource
@@ -20,6 +22,8 @@ class ArtistTests(TestCase):
         a1 = create_artist(name='some-artist')
         image1 = SimpleUploadedFile('file1.png', b'file_content', content_type='image/png')
         image2 = SimpleUploadedFile('file2.png', b'file_content', content_type='image/png')
-        ArtistImageResource.objects.create(image=image1, artist=a1)
-        ArtistImageResource.objects.create(image=image2, artist=a1)
+        # Uploads land under MEDIA_ROOT; keep them out of the source tree.
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            ArtistImageResource.objects.create(image=image1, artist=a1)
+            ArtistImageResource.objects.create(image=image2, artist=a1)
         self.assertEqual(a1.images.count(), 2)
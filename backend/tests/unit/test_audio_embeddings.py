@@ -0,0 +1,113 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import TestCase
+
+from catalog import spotify_stub
+from catalog.models import Album, Artist, Track
+from recommender.models import AlbumEmbedding, ArtistEmbedding, TrackAudioFeatures, TrackEmbedding
+from recommender.services import audio_embeddings, embedding_snapshot
+from recommender.services.audio_ingest import _AUDIO_FIELDS
+
+
+class BuildAudioEmbeddingsTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.artist_a = Artist.objects.create(name='Artist A', spotify_id='artist-a')
+        self.artist_b = Artist.objects.create(name='Artist B', spotify_id='artist-b')
+        self.albums = []
+        self.tracks = []
+        for n in range(3):
+            album = Album.objects.create(
+                name=f'Album {n}', spotify_id=f'album-{n}', album_type='ALBUM', total_tracks=2, release_date='2020-01-01',
+            )
+            self.albums.append(album)
+            for number in (1, 2):
+                track = Track.objects.create(
+                    name=f'Track {n}-{number}', spotify_id=f'track-{n}-{number}', album=album,
+                    track_number=number, duration_ms=100000 * number,
+                )
+                payload = spotify_stub.audio_features([track.spotify_id])[0]
+                TrackAudioFeatures.objects.create(track=track, **{name: payload[name] for name in _AUDIO_FIELDS})
+                self.tracks.append(track)
+        self.albums[0].artists.add(self.artist_a)
+        self.albums[1].artists.add(self.artist_a, self.artist_b)
+        self.albums[2].artists.add(self.artist_b)
+        # No audio features: neither the album nor its only artist gets a vector.
+        Artist.objects.create(name='Silent', spotify_id='silent').albums.add(
+            Album.objects.create(name='Empty', spotify_id='empty', album_type='ALBUM', total_tracks=0, release_date='2020-01-01'),
+        )
+
+    def _snapshot(self, result, resource_type):
+        root = Path(result.path)
+        sidecar = json.loads((root / f'{resource_type}.rows.json').read_text())
+        return np.load(root / f'{resource_type}.npy'), sidecar
+
+    def _unit(self, vector):
+        return vector / np.linalg.norm(vector)
+
+    def test_encodes_tracks_and_aggregates_albums_and_artists(self):
+        result = audio_embeddings.build_audio_embeddings(dim=32, directory=self.directory)
+
+        self.assertEqual(result.built, {'tracks': 6, 'albums': 3, 'artists': 2})
+        self.assertEqual(embedding_snapshot.current_version(self.directory), result.version)
+        raw = audio_embeddings.project(audio_embeddings.encode_features(audio_embeddings._load_corpus()), 32)
+        self.assertEqual(raw.shape, (6, 32))
+        width = len(audio_embeddings.CONTINUOUS_FIELDS)
+        np.testing.assert_allclose(raw[:, :width].mean(axis=0), 0, atol=1e-5)
+        np.testing.assert_allclose(raw[:, :width].std(axis=0), 1, atol=1e-4)
+        np.testing.assert_array_equal(raw[:, width:width + audio_embeddings.KEYS].sum(axis=1), 1)
+        self.assertFalse(raw[:, audio_embeddings.FEATURE_DIM:].any())
+
+        tracks, sidecar = self._snapshot(result, 'tracks')
+        self.assertEqual(sidecar['item_ids'], [track.pk for track in self.tracks])
+        self.assertEqual(sidecar['spotify_ids'], [track.spotify_id for track in self.tracks])
+        np.testing.assert_allclose(tracks, raw / np.linalg.norm(raw, axis=1, keepdims=True), atol=1e-6)
+
+        albums, sidecar = self._snapshot(result, 'albums')
+        self.assertEqual(sidecar['names'], [album.name for album in self.albums])
+        album_means = []
+        for n in range(3):
+            # Track 2 is twice as long as track 1.
+            album_means.append((raw[2 * n] + 2 * raw[2 * n + 1]) / 3)
+            np.testing.assert_allclose(albums[n], self._unit(album_means[-1]), atol=1e-5)
+
+        artists, sidecar = self._snapshot(result, 'artists')
+        self.assertEqual(sidecar['item_ids'], [self.artist_a.pk, self.artist_b.pk])
+        self.assertEqual(sidecar['model_versions'], [audio_embeddings.AUDIO_MODEL_VERSION] * 2)
+        self.assertEqual(sidecar['metadata'][0], {'source': 'audio_features', 'tracks': 4})
+        np.testing.assert_allclose(artists[0], self._unit((album_means[0] + album_means[1]) / 2), atol=1e-5)
+        np.testing.assert_allclose(artists[1], self._unit((album_means[1] + album_means[2]) / 2), atol=1e-5)
+
+    def test_numeric_spotify_mode_encodes_as_major(self):
+        TrackAudioFeatures.objects.filter(track__in=self.tracks[:3]).update(mode='1')
+        TrackAudioFeatures.objects.filter(track__in=self.tracks[3:]).update(mode='0')
+
+        corpus = audio_embeddings._load_corpus()
+        features = audio_embeddings.encode_features(corpus)
+
+        self.assertEqual(corpus.major.tolist(), [True] * 3 + [False] * 3)
+        mode_column = len(audio_embeddings.CONTINUOUS_FIELDS) + audio_embeddings.KEYS
+        self.assertEqual(features[:, mode_column].tolist(), [1.0] * 3 + [0.0] * 3)
+
+    def test_leaves_the_serving_tables_alone(self):
+        TrackEmbedding.objects.create(track=self.tracks[0], vector=[1.0, 0.0], model_version='v1.0.0')
+
+        audio_embeddings.build_audio_embeddings(['tracks'], dim=4, directory=self.directory)
+
+        self.assertEqual(list(TrackEmbedding.objects.values_list('model_version', 'vector_dim')), [('v1.0.0', 2)])
+        self.assertFalse(AlbumEmbedding.objects.exists() or ArtistEmbedding.objects.exists())
+
+    def test_rebuild_publishes_a_new_version_with_narrower_vectors(self):
+        first = audio_embeddings.build_audio_embeddings(['tracks'], dim=32, directory=self.directory)
+        second = audio_embeddings.build_audio_embeddings(['tracks'], dim=4, directory=self.directory)
+
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(embedding_snapshot.current_version(self.directory), second.version)
+        tracks, sidecar = self._snapshot(second, 'tracks')
+        self.assertEqual((tracks.shape, sidecar['dim']), ((6, 4), 4))
+        self.assertFalse((Path(second.path) / 'albums.npy').exists())
@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase
+from django.utils.dateparse import parse_datetime
+
+from catalog import spotify_stub
+from catalog.models import Album, Track
+from recommender.models import TrackAudioFeatures
+from recommender.services import audio_export
+from recommender.services.audio_ingest import _AUDIO_FIELDS
+
+
+class ExportAudioFeaturesTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        album = Album.objects.create(
+            name='Album', spotify_id='album', album_type='ALBUM', total_tracks=5, release_date='2020-01-01',
+        )
+        self.tracks = [
+            Track.objects.create(name=f'Track {n}', spotify_id=f'track-{n}', album=album, track_number=n, duration_ms=1000)
+            for n in range(5)
+        ]
+        self.features = [self._features(track) for track in self.tracks[:3]]
+
+    def _features(self, track):
+        payload = spotify_stub.audio_features([track.spotify_id])[0]
+        return TrackAudioFeatures.objects.create(track=track, **{name: payload[name] for name in _AUDIO_FIELDS})
+
+    def _column(self, chunk, column):
+        return np.load(self.directory / chunk / f'{column}.npy', mmap_mode='r')
+
+    def test_full_export_writes_one_array_per_column_in_chunks(self):
+        result = audio_export.export_audio_features(self.directory, chunk_rows=2)
+
+        self.assertTrue(result.full)
+        self.assertEqual((result.rows, result.chunks), (3, ['chunk-000000', 'chunk-000001']))
+        manifest = audio_export.read_manifest(self.directory)
+        self.assertEqual([chunk['rows'] for chunk in manifest['chunks']], [2, 1])
+        self.assertEqual(manifest['rows'], 3)
+        self.assertEqual(set(path.stem for path in (self.directory / 'chunk-000000').iterdir()), set(audio_export.COLUMNS))
+
+        spotify_ids = np.concatenate([self._column(chunk, 'spotify_ids') for chunk in result.chunks])
+        self.assertEqual(spotify_ids.tolist(), [b'track-0', b'track-1', b'track-2'])
+        energy = self._column('chunk-000000', 'energy')
+        self.assertEqual(energy.dtype, np.float32)
+        self.assertAlmostEqual(float(energy[0]), self.features[0].energy, places=5)
+        mode = self._column('chunk-000000', 'mode')
+        self.assertEqual(mode.tolist(), [int(feature.mode == 'major') for feature in self.features[:2]])
+
+    def test_numeric_spotify_mode_exports_as_major(self):
+        TrackAudioFeatures.objects.filter(pk=self.features[0].pk).update(mode='1')
+        TrackAudioFeatures.objects.filter(pk=self.features[1].pk).update(mode='0')
+        TrackAudioFeatures.objects.filter(pk=self.features[2].pk).update(mode='major')
+
+        audio_export.export_audio_features(self.directory)
+
+        self.assertEqual(self._column('chunk-000000', 'mode').tolist(), [1, 0, 1])
+
+    def test_incremental_export_appends_only_changed_rows(self):
+        audio_export.export_audio_features(self.directory)
+        self.assertEqual(audio_export.export_audio_features(self.directory).chunks, [])
+
+        self.features[1].energy = 0.25
+        self.features[1].save()
+        self._features(self.tracks[3])
+        result = audio_export.export_audio_features(self.directory)
+
+        self.assertFalse(result.full)
+        self.assertEqual((result.rows, result.chunks), (2, ['chunk-000001']))
+        self.assertEqual(self._column('chunk-000001', 'track_ids').tolist(), [self.tracks[1].pk, self.tracks[3].pk])
+        self.assertEqual(float(self._column('chunk-000001', 'energy')[0]), 0.25)
+        self.assertEqual(audio_export.read_manifest(self.directory)['rows'], 5)
+
+    def test_row_committed_behind_the_watermark_is_exported_next_run(self):
+        audio_export.export_audio_features(self.directory)
+        watermark = parse_datetime(audio_export.read_manifest(self.directory)['watermark'])
+        # Stamped before the export read, committed after it.
+        late = self._features(self.tracks[3])
+        TrackAudioFeatures.objects.filter(pk=late.pk).update(modified_at=watermark - timedelta(seconds=1))
+
+        result = audio_export.export_audio_features(self.directory)
+
+        self.assertEqual(result.chunks, ['chunk-000001'])
+        self.assertEqual(self._column('chunk-000001', 'track_ids').tolist(), [self.tracks[3].pk])
+        self.assertEqual(audio_export.export_audio_features(self.directory).chunks, [])
+
+    def test_full_export_replaces_old_chunks(self):
+        audio_export.export_audio_features(self.directory)
+        self.features[0].save()
+        audio_export.export_audio_features(self.directory)
+
+        result = audio_export.export_audio_features(self.directory, full=True)
+
+        self.assertEqual(result.chunks, ['chunk-000002'])
+        on_disk = sorted(entry.name for entry in self.directory.iterdir() if entry.is_dir())
+        self.assertEqual(on_disk, ['chunk-000002'])
+        self.assertEqual(audio_export.read_manifest(self.directory)['rows'], 3)
+
+    def test_run_after_an_interrupted_export_clears_its_orphaned_chunks(self):
+        audio_export.export_audio_features(self.directory)
+        for feature in self.features:
+            feature.save()
+        write_chunk = audio_export._write_chunk
+        calls = []
+
+        def fail_second(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise OSError('disk full')
+            return write_chunk(*args)
+
+        with mock.patch.object(audio_export, '_write_chunk', side_effect=fail_second):
+            with self.assertRaises(OSError):
+                audio_export.export_audio_features(self.directory, chunk_rows=1)
+        self.assertTrue((self.directory / 'chunk-000001').is_dir())
+        self.assertEqual([chunk['name'] for chunk in audio_export.read_manifest(self.directory)['chunks']], ['chunk-000000'])
+
+        result = audio_export.export_audio_features(self.directory)
+        self.assertEqual((result.rows, result.chunks), (3, ['chunk-000001']))
+
+        (self.directory / 'chunk-000009').mkdir()
+        result = audio_export.export_audio_features(self.directory, full=True)
+        self.assertEqual(result.chunks, ['chunk-000002'])
+        on_disk = sorted(entry.name for entry in self.directory.iterdir() if entry.is_dir())
+        self.assertEqual(on_disk, ['chunk-000002'])
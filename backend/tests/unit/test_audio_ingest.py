@@ -1,10 +1,13 @@
 from unittest import mock
 
+from django.db import DatabaseError
 from django.test import TestCase, override_settings
 
 from catalog.models import Artist, Album, Track
 from recommender.models import TrackAudioFeatures
-from recommender.services.audio_ingest import ingest_training_data
+from catalog import spotify_stub
+from recommender import tasks
+from recommender.services.audio_ingest import _audio_features_row, _bulk_upsert, ingest_training_data, pending_tracks
 
 
 # ---------------------------------------------------------------------------
@@ -124,14 +127,32 @@ class IngestTrainingDataTests(TestCase):
         mock_fetch.side_effect = capture
         ingest_training_data()
 
-        # All 4 tracks fit in one batch (< 50), so we get two calls:
-        # first Artist A's album, then Artist B's album.
-        self.assertEqual(len(call_order), 2)
+        # All 4 tracks fit in one batch (< 50), so a single call carries both
+        # albums: Artist A's first, then Artist B's, track_number 1 before 2.
+        self.assertEqual(call_order, [['a-track-1', 'a-track-2', 'b-track-1', 'b-track-2']])
 
-        # Within Artist A's batch: track_number 1 before 2.
-        self.assertEqual(call_order[0], ['a-track-1', 'a-track-2'])
-        # Within Artist B's batch: track_number 1 before 2.
-        self.assertEqual(call_order[1], ['b-track-1', 'b-track-2'])
+    @mock.patch('recommender.services.audio_ingest._BATCH_SIZE', 3)
+    @mock.patch('recommender.services.audio_ingest._fetch_audio_features')
+    def test_batches_fill_across_albums_and_skip_ingested_tracks(self, mock_fetch):
+        from catalog import spotify_stub
+
+        mock_fetch.side_effect = spotify_stub.audio_features
+        TrackAudioFeatures.objects.create(
+            track=self.catalog['tracks']['a2'],
+            energy=0.5, valence=0.5, tempo=120.0, key=5, mode='minor',
+            danceability=0.5, acousticness=0.5, instrumentalness=0.5,
+            liveness=0.1, speechiness=0.1, loudness=-20.0, time_signature=4,
+        )
+        # A second credited artist sorting after Artist A does not visit the album twice.
+        self.catalog['albums'][0].artists.add(Artist.objects.create(name='Artist C', spotify_id='artist-c-id'))
+
+        result = ingest_training_data()
+
+        self.assertEqual(
+            [call.args[0] for call in mock_fetch.call_args_list],
+            [['a-track-1', 'b-track-1', 'b-track-2']],
+        )
+        self.assertEqual((result.ingested, result.skipped), (3, 1))
 
     # --- resume / skip ------------------------------------------------------
 
@@ -165,9 +186,10 @@ class IngestTrainingDataTests(TestCase):
 
     # --- failure handling ---------------------------------------------------
 
+    @mock.patch('recommender.services.audio_ingest._BATCH_SIZE', 2)
     @mock.patch('recommender.services.audio_ingest._fetch_audio_features')
     def test_batch_fetch_failure_logs_and_continues(self, mock_fetch):
-        """If the Spotify call fails for one album's batch, the other album still runs."""
+        """If the Spotify call fails for one batch, the next batch still runs."""
         call_count = {'n': 0}
 
         def fail_first_succeed_rest(track_ids):
@@ -199,6 +221,109 @@ class IngestTrainingDataTests(TestCase):
         mock_fetch.side_effect = drop_one
         result = ingest_training_data()
 
-        # Each album batch loses its first track → 2 failures, 2 successes.
-        self.assertEqual(result.failed, 2)
-        self.assertEqual(result.ingested, 2)
+        # The single batch loses its first track → 1 failure, 3 successes.
+        self.assertEqual(result.failed, 1)
+        self.assertEqual(result.ingested, 3)
+
+    # --- bulk write ----------------------------------------------------------
+
+    @mock.patch('recommender.services.audio_ingest._fetch_audio_features')
+    def test_bad_row_is_isolated_by_bisection(self, mock_fetch):
+        """One payload the database rejects fails alone; the rest of the batch is written."""
+        def corrupt_one(track_ids):
+            from catalog import spotify_stub
+            results = spotify_stub.audio_features(track_ids)
+            results[2]['energy'] = None
+            return results
+
+        mock_fetch.side_effect = corrupt_one
+        with mock.patch.object(
+            TrackAudioFeatures.objects, 'bulk_create', wraps=TrackAudioFeatures.objects.bulk_create,
+        ) as bulk_create:
+            result = ingest_training_data()
+
+        self.assertEqual(result.ingested, 3)
+        self.assertEqual(result.failed_track_ids, ['b-track-1'])
+        self.assertFalse(TrackAudioFeatures.objects.filter(track__spotify_id='b-track-1').exists())
+        # [4] -> [2, 2] -> the good pair, then [1, 1] for the pair holding the bad row.
+        self.assertEqual([len(call.args[0]) for call in bulk_create.call_args_list], [4, 2, 2, 1, 1])
+
+    def test_reingest_updates_existing_rows_and_reports_throughput(self):
+        track_a1 = self.catalog['tracks']['a1']
+        TrackAudioFeatures.objects.create(
+            track=track_a1,
+            energy=0.5, valence=0.5, tempo=120.0, key=5, mode='minor',
+            danceability=0.5, acousticness=0.5, instrumentalness=0.5,
+            liveness=0.1, speechiness=0.1, loudness=-20.0, time_signature=4,
+        )
+        rows = [_audio_features_row(track_a1, spotify_stub.audio_features(['a-track-1'])[0])]
+
+        self.assertEqual(_bulk_upsert(rows), [])
+        self.assertEqual(TrackAudioFeatures.objects.count(), 1)
+        self.assertNotEqual(TrackAudioFeatures.objects.get(track=track_a1).energy, 0.5)
+
+        TrackAudioFeatures.objects.all().delete()
+        result = ingest_training_data()
+        self.assertGreater(result.rows_per_second, 0)
+        self.assertGreater(result.seconds, 0)
+
+
+@override_settings(SPOTIFY_USE_STUB_DATA=True)
+class ParallelIngestTests(TestCase):
+    def setUp(self):
+        self.catalog = _seed_catalog()
+
+    @mock.patch('recommender.services.audio_ingest._fetch_audio_features')
+    def test_shards_run_as_a_chord_and_merge(self, mock_fetch):
+        mock_fetch.side_effect = spotify_stub.audio_features
+        TrackAudioFeatures.objects.create(
+            track=self.catalog['tracks']['b2'],
+            energy=0.5, valence=0.5, tempo=120.0, key=5, mode='minor',
+            danceability=0.5, acousticness=0.5, instrumentalness=0.5,
+            liveness=0.1, speechiness=0.1, loudness=-20.0, time_signature=4,
+        )
+
+        with mock.patch('recommender.tasks.merge_ingest_results.run', wraps=tasks.merge_ingest_results.run) as merge:
+            dispatched = tasks.ingest_training_data_parallel.apply(kwargs={'shard_size': 2}).get()
+
+        self.assertEqual(dispatched, {'shards': 2, 'tracks': 3, 'skipped': 1})
+        # Shards keep crawl order: Artist A's album, then what is left of Artist B's.
+        self.assertEqual(
+            [call.args[0] for call in mock_fetch.call_args_list],
+            [['a-track-1', 'a-track-2'], ['b-track-1']],
+        )
+        merged = merge.call_args.args[0]
+        self.assertEqual([shard['ingested'] for shard in merged], [2, 1])
+        self.assertEqual(TrackAudioFeatures.objects.count(), 4)
+
+    def test_planning_failure_is_retried(self):
+        with (
+            mock.patch('recommender.tasks.pending_tracks', side_effect=[DatabaseError('gone away'), pending_tracks()]),
+            mock.patch('recommender.tasks.chord') as dispatch,
+        ):
+            dispatched = tasks.ingest_training_data_parallel.apply(kwargs={'shard_size': 2}).get()
+
+        self.assertEqual(dispatched['shards'], 2)
+        dispatch.assert_called_once()
+
+    def test_dispatch_failure_is_not_retried(self):
+        with mock.patch('recommender.tasks.chord') as dispatch:
+            dispatch.return_value.side_effect = ConnectionError('broker down')
+            result = tasks.ingest_training_data_parallel.apply(kwargs={'shard_size': 2})
+
+        self.assertIsInstance(result.result, ConnectionError)
+        dispatch.assert_called_once()
+
+    def test_merge_results_sums_shards(self):
+        result = tasks.merge_ingest_results.run(
+            [
+                {'ingested': 3, 'skipped': 0, 'failed': 1, 'failed_track_ids': ['x'], 'seconds': 1.0, 'rows_per_second': 3.0},
+                {'ingested': 5, 'skipped': 0, 'failed': 0, 'failed_track_ids': [], 'seconds': 2.0, 'rows_per_second': 2.5},
+            ],
+            skipped=4,
+        )
+
+        self.assertEqual(result['shards'], 2)
+        self.assertEqual((result['ingested'], result['skipped'], result['failed']), (8, 4, 1))
+        self.assertEqual(result['failed_track_ids'], ['x'])
+        self.assertEqual(result['rows_per_second'], 4.0)
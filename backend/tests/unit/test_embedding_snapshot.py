@@ -0,0 +1,43 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from django.test import TestCase
+
+from catalog.models import Artist
+from recommender.models import ArtistEmbedding
+from recommender.services import embedding_snapshot
+
+
+class ExportSnapshotTests(TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.artists = [Artist.objects.create(name=f'Artist {n}', spotify_id=f'artist-{n}') for n in range(3)]
+        ArtistEmbedding.objects.create(artist=self.artists[0], vector=[3.0, 4.0], model_version='v1')
+        ArtistEmbedding.objects.create(artist=self.artists[1], vector=[1.0], model_version='v1', quality_score=0.5)
+        ArtistEmbedding.objects.create(artist=self.artists[2], vector=[], model_version='v1')
+
+    def test_writes_normalized_matrix_and_sidecar(self):
+        result = embedding_snapshot.export_snapshot(self.directory, dim=2)
+
+        self.assertEqual(result.rows, {'artists': 2, 'albums': 0, 'tracks': 0})
+        self.assertEqual(embedding_snapshot.current_version(self.directory), result.version)
+        matrix = np.load(self.directory / result.version / 'artists.npy', mmap_mode='r')
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_allclose(matrix, [[0.6, 0.8], [1.0, 0.0]], rtol=1e-6)
+        sidecar = json.loads((self.directory / result.version / 'artists.rows.json').read_text())
+        self.assertEqual(sidecar['names'], ['Artist 0', 'Artist 1'])
+        self.assertEqual(sidecar['item_ids'], [self.artists[0].pk, self.artists[1].pk])
+        self.assertEqual(sidecar['quality_scores'], [0.0, 0.5])
+        self.assertIsNotNone(sidecar['watermark'])
+
+    def test_rotation_keeps_bounded_versions(self):
+        versions = [embedding_snapshot.export_snapshot(self.directory, dim=2, keep=2).version for _ in range(3)]
+
+        on_disk = sorted(entry.name for entry in self.directory.iterdir() if entry.is_dir())
+        self.assertEqual(on_disk, versions[1:])
+        self.assertEqual(embedding_snapshot.current_version(self.directory), versions[-1])
+        self.assertFalse(any(entry.name.startswith('.') for entry in self.directory.iterdir()))
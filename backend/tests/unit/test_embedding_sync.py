@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from catalog.models import Album, Artist, Track
+from recommender.models import AlbumEmbedding, ArtistEmbedding, TrackEmbedding
+from recommender.services import embedding_sync
+
+
+def _fake_batch(items):
+    return [
+        {
+            'vector': [float(len(item['attributes']['name']))],
+            'model_version': embedding_sync.MODEL_VERSION,
+            'quality': 0.9,
+            'metadata': {'resource_type': item['resource_type']},
+        }
+        for item in items
+    ]
+
+
+@mock.patch('recommender.services.embedding_sync.generate_embeddings_batch', side_effect=_fake_batch)
+class SyncStaleEmbeddingsTests(TestCase):
+    def setUp(self):
+        self.artists = [Artist.objects.create(name=f'Artist {n}', spotify_id=f'artist-{n}') for n in range(5)]
+        self.album = Album.objects.create(
+            name='Album', spotify_id='album-1', total_tracks=1, release_date='2020-01-01',
+        )
+        self.album.artists.add(self.artists[0], self.artists[1])
+        self.track = Track.objects.create(
+            name='Track', spotify_id='track-1', album=self.album,
+            track_number=1, disc_number=1, duration_ms=1000, explicit=False,
+        )
+
+    def test_embeds_missing_rows_in_chunks(self, mock_batch):
+        result = embedding_sync.sync_stale_embeddings(['artist'], chunk_size=2)
+
+        self.assertEqual(result.synced, {'artist': 5})
+        self.assertEqual(result.requests, 3)
+        self.assertEqual([len(call.args[0]) for call in mock_batch.call_args_list], [2, 2, 1])
+        self.assertEqual(ArtistEmbedding.objects.count(), 5)
+        embedding = ArtistEmbedding.objects.get(artist=self.artists[0])
+        self.assertEqual(embedding.vector, [8.0])
+        self.assertEqual(embedding.quality_score, 0.9)
+
+    def test_only_stale_versions_are_resynced(self, mock_batch):
+        ArtistEmbedding.objects.create(artist=self.artists[0], vector=[1.0], model_version=embedding_sync.MODEL_VERSION)
+        stale = ArtistEmbedding.objects.create(artist=self.artists[1], vector=[1.0], model_version='old')
+
+        result = embedding_sync.sync_stale_embeddings(['artist'])
+
+        self.assertEqual(result.synced, {'artist': 4})
+        stale.refresh_from_db()
+        self.assertEqual(stale.model_version, embedding_sync.MODEL_VERSION)
+        self.assertEqual(stale.vector, [8.0])
+        self.assertEqual(ArtistEmbedding.objects.count(), 5)
+
+    def test_force_resyncs_everything(self, mock_batch):
+        embedding_sync.sync_stale_embeddings()
+        result = embedding_sync.sync_stale_embeddings(force=True)
+
+        self.assertEqual(result.synced, {'artist': 5, 'album': 1, 'track': 1})
+
+    def test_album_and_track_attributes_include_artists(self, mock_batch):
+        embedding_sync.sync_stale_embeddings(['album', 'track'])
+
+        album_item = mock_batch.call_args_list[0].args[0][0]
+        track_item = mock_batch.call_args_list[1].args[0][0]
+        self.assertEqual(album_item['resource_type'], 'album')
+        self.assertEqual(sorted(album_item['attributes']['artists']), ['Artist 0', 'Artist 1'])
+        self.assertEqual(track_item['attributes']['album'], 'Album')
+        self.assertEqual(sorted(track_item['attributes']['artists']), ['Artist 0', 'Artist 1'])
+        self.assertTrue(AlbumEmbedding.objects.filter(album=self.album).exists())
+        self.assertTrue(TrackEmbedding.objects.filter(track=self.track).exists())
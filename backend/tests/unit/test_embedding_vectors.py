@@ -0,0 +1,100 @@
+import importlib
+import math
+import struct
+from unittest import mock
+
+import numpy as np
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from catalog.models import Artist
+from recommender.models import ArtistEmbedding, pack_vector, unpack_vector
+
+_BEFORE = [('recommender', '0002_track_audio_features')]
+_AFTER = [('recommender', '0003_embedding_binary_vectors')]
+
+
+def _float32(values):
+    return [struct.unpack('<f', struct.pack('<f', value))[0] for value in values]
+
+
+class PackVectorTests(SimpleTestCase):
+    def test_float32_values_round_trip_exactly(self):
+        values = [0.0, -0.0, 0.5, -1.25, 3.0, 2.0 ** -20, 3.4028234663852886e38, -1.401298464324817e-45]
+        self.assertEqual(unpack_vector(pack_vector(values)), values)
+
+    def test_other_floats_decode_to_their_float32_rounding(self):
+        values = [0.1, 1 / 3, -2.718281828459045, 1e-3]
+        decoded = unpack_vector(pack_vector(values))
+        self.assertEqual(decoded, _float32(values))
+        self.assertEqual(unpack_vector(pack_vector(decoded)), decoded)
+
+    def test_layout_is_little_endian_float32(self):
+        values = [0.25, -8.0, 1.5]
+        packed = pack_vector(values)
+        self.assertEqual(len(packed), 12)
+        self.assertEqual(np.frombuffer(packed, dtype='<f4').tolist(), values)
+
+    def test_empty_and_missing_data(self):
+        self.assertEqual(pack_vector([]), b'')
+        self.assertEqual(unpack_vector(None), [])
+        self.assertEqual(unpack_vector(memoryview(b'')), [])
+
+
+class EmbeddingVectorFieldTests(TestCase):
+    def test_vector_round_trips_through_bytea(self):
+        artist = Artist.objects.create(name='Tool', spotify_id='artist-tool')
+        values = [0.1, -0.2, 0.3, 4.0]
+        embedding = ArtistEmbedding(artist=artist, model_version='v1')
+        embedding.vector = values
+        embedding.save()
+
+        stored = ArtistEmbedding.objects.get(pk=embedding.pk)
+
+        self.assertEqual(stored.vector, _float32(values))
+        self.assertEqual(stored.vector_dim, 4)
+        self.assertEqual(stored.vector_norm, math.hypot(*_float32(values)))
+
+
+class BinaryVectorMigrationTests(TransactionTestCase):
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(_BEFORE)
+        self.addCleanup(self._migrate_to_latest)
+        self.old_apps = executor.loader.project_state(_BEFORE).apps
+
+    @staticmethod
+    def _migrate_to_latest():
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_json_vectors_are_backfilled_losslessly_in_batches(self):
+        Artist = self.old_apps.get_model('catalog', 'Artist')
+        ArtistEmbedding = self.old_apps.get_model('recommender', 'ArtistEmbedding')
+        vectors = [
+            [0.5, -1.25, 3.0],
+            [0.1, 1 / 3, -2.718281828459045, 1e-3],
+            [],
+            ['not', 'numbers'],
+            [1e-45, 3.4028234663852886e38],
+        ]
+        ids = []
+        for position, vector in enumerate(vectors):
+            artist = Artist.objects.create(name=f'Artist {position}', spotify_id=f'artist-{position}')
+            ids.append(ArtistEmbedding.objects.create(artist=artist, vector=vector, model_version='v1').id)
+
+        migration = importlib.import_module('recommender.migrations.0003_embedding_binary_vectors')
+        with mock.patch.object(migration, '_BATCH_SIZE', 2):
+            executor = MigrationExecutor(connection)
+            executor.migrate(_AFTER)
+        ArtistEmbedding = executor.loader.project_state(_AFTER).apps.get_model('recommender', 'ArtistEmbedding')
+
+        expected = [_float32(vector) for vector in vectors[:3]] + [[], _float32(vectors[4])]
+        for embedding_id, values in zip(ids, expected):
+            embedding = ArtistEmbedding.objects.get(id=embedding_id)
+            self.assertEqual(unpack_vector(embedding.vector_data), values)
+            self.assertEqual(embedding.vector_dim, len(values))
+            self.assertEqual(embedding.vector_norm, math.hypot(*values))
+        # Values that float32 holds exactly survive unchanged.
+        self.assertEqual(unpack_vector(ArtistEmbedding.objects.get(id=ids[0]).vector_data), vectors[0])
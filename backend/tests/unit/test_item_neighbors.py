@@ -0,0 +1,86 @@
+import multiprocessing
+from unittest import mock
+
+import numpy as np
+from django.test import TestCase
+
+from catalog.models import Artist
+from recommender import tasks
+from recommender.models import ArtistEmbedding, ItemNeighbors
+from recommender.services import item_neighbors
+
+
+class ComputeNeighborsTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.vectors = rng.normal(size=(8, 4)).astype(np.float32)
+        self.artists = [Artist.objects.create(name=f'Artist {n}', spotify_id=f'artist-{n}') for n in range(8)]
+        self.embeddings = [
+            ArtistEmbedding.objects.create(artist=artist, vector=vector.tolist(), model_version='v1')
+            for artist, vector in zip(self.artists, self.vectors)
+        ]
+
+    def _expected(self, row, k):
+        normalized = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        scores = normalized @ normalized[row]
+        scores[row] = -np.inf
+        return [self.artists[other].pk for other in np.argsort(-scores, kind='stable')[:k]]
+
+    def test_matches_brute_force_across_blocks_and_threads(self):
+        # Three query rows per block, so the thread pool gets several blocks.
+        with mock.patch.object(item_neighbors, 'BLOCK_CELLS', 24):
+            result = item_neighbors.compute_neighbors(['artists'], k=3, workers=2, dim=4)
+
+        self.assertEqual(result.computed, {'artists': 8})
+        for row, artist in enumerate(self.artists):
+            stored = ItemNeighbors.objects.get(resource_type='artists', item_id=artist.pk)
+            self.assertEqual([neighbor_id for neighbor_id, _ in stored.neighbors()], self._expected(row, 3))
+            scores = [score for _, score in stored.neighbors()]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_celery_task_scores_several_blocks_inside_a_daemonic_worker(self):
+        # Celery prefork children are daemonic and may not start child processes.
+        with (
+            mock.patch.dict(multiprocessing.current_process()._config, {'daemon': True}),
+            mock.patch.object(item_neighbors, 'BLOCK_CELLS', 24),
+            mock.patch('recommender.services.item_neighbors.os.cpu_count', return_value=64),
+            mock.patch(
+                'recommender.services.item_neighbors.ThreadPoolExecutor', wraps=item_neighbors.ThreadPoolExecutor,
+            ) as pool,
+        ):
+            result = tasks.compute_item_neighbors.apply(kwargs={'resource_types': ['artists']}).get()
+
+        self.assertEqual(result['computed'], {'artists': 8})
+        self.assertEqual(pool.call_args.kwargs['max_workers'], item_neighbors.MAX_DEFAULT_WORKERS)
+        stored = ItemNeighbors.objects.get(resource_type='artists', item_id=self.artists[0].pk)
+        self.assertEqual(
+            [neighbor_id for neighbor_id, _ in stored.neighbors()][:3],
+            self._expected(0, 3),
+        )
+
+    def test_incremental_run_only_recomputes_new_and_changed_items(self):
+        item_neighbors.compute_neighbors(['artists'], k=2, workers=1, dim=4)
+        self.assertEqual(item_neighbors.compute_neighbors(['artists'], k=2, workers=1, dim=4).computed, {'artists': 0})
+
+        self.embeddings[0].vector = [1.0, 0.0, 0.0, 0.0]
+        self.embeddings[0].save()
+        newcomer = Artist.objects.create(name='Newcomer', spotify_id='artist-new')
+        ArtistEmbedding.objects.create(artist=newcomer, vector=[0.0, 1.0, 0.0, 0.0], model_version='v1')
+        self.embeddings[1].delete()
+
+        result = item_neighbors.compute_neighbors(['artists'], k=2, workers=1, dim=4)
+
+        self.assertEqual(result.computed, {'artists': 2})
+        self.assertEqual(result.removed, {'artists': 1})
+        self.assertTrue(ItemNeighbors.objects.filter(resource_type='artists', item_id=newcomer.pk).exists())
+        self.assertFalse(ItemNeighbors.objects.filter(resource_type='artists', item_id=self.artists[1].pk).exists())
+
+    def test_lookup_returns_named_neighbors(self):
+        item_neighbors.compute_neighbors(['artists'], k=3, workers=1, dim=4)
+
+        row, neighbors = item_neighbors.lookup('artists', self.artists[0].pk, limit=2)
+
+        self.assertEqual(row.model_version, 'v1')
+        self.assertEqual([neighbor['id'] for neighbor in neighbors], self._expected(0, 2))
+        self.assertEqual(neighbors[0]['name'], Artist.objects.get(pk=neighbors[0]['id']).name)
+        self.assertIsNone(item_neighbors.lookup('artists', 0))
@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from juke_auth.models import JukeUser, MusicProfile
+from recommender.models import ProfileRecommendation
+from recommender.services import profile_recommendations
+
+
+def _engine_result(name):
+    return {
+        'artists': [{'name': name, 'likeness': 0.9, 'extra': {}}],
+        'albums': [],
+        'tracks': [],
+        'model_version': 'v-test',
+        'generated_at': '2026-01-18T00:00:00',
+    }
+
+
+class RefreshAllTests(TestCase):
+    def setUp(self):
+        self.profiles = []
+        for n, artists in enumerate([['Tool'], [], ['Björk', 'Tool']]):
+            user = JukeUser.objects.create_user(username=f'user{n}', password='secret', email=f'user{n}@example.com')
+            self.profiles.append(MusicProfile.objects.create(user=user, favorite_artists=artists))
+
+    @mock.patch('recommender.services.profile_recommendations.client.fetch_recommendations_batch')
+    def test_scores_seeded_profiles_in_chunks_and_stores_results(self, mock_batch):
+        mock_batch.side_effect = lambda payloads: [_engine_result(payload['artists'][0]) for payload in payloads]
+        ProfileRecommendation.objects.create(
+            profile=self.profiles[1], results={}, seed_digest='old', model_version='v0',
+            generated_at='2026-01-01T00:00:00Z',
+        )
+
+        result = profile_recommendations.refresh_all(chunk_size=2, limit=5)
+
+        self.assertEqual((result.profiles, result.stored, result.cleared), (3, 2, 1))
+        self.assertEqual(mock_batch.call_count, 2)
+        sent = [[payload['artists'] for payload in call[0][0]] for call in mock_batch.call_args_list]
+        self.assertEqual(sent, [[['Tool']], [['Björk', 'Tool']]])
+        self.assertEqual(mock_batch.call_args_list[0][0][0][0]['limit'], 5)
+        stored = ProfileRecommendation.objects.get(profile=self.profiles[2])
+        self.assertEqual(stored.results['artists'][0]['name'], 'Björk')
+        self.assertEqual(stored.model_version, 'v-test')
+        self.assertEqual(stored.generated_at.isoformat(), '2026-01-18T00:00:00+00:00')
+        self.assertFalse(ProfileRecommendation.objects.filter(profile=self.profiles[1]).exists())
+
+    @mock.patch('recommender.services.profile_recommendations.client.fetch_recommendations_batch')
+    def test_rerun_overwrites_existing_rows(self, mock_batch):
+        mock_batch.side_effect = lambda payloads: [_engine_result('first') for _ in payloads]
+        profile_recommendations.refresh_all()
+        mock_batch.side_effect = lambda payloads: [_engine_result('second') for _ in payloads]
+        profile_recommendations.refresh_all()
+
+        self.assertEqual(ProfileRecommendation.objects.count(), 2)
+        self.assertEqual(
+            {row.results['artists'][0]['name'] for row in ProfileRecommendation.objects.all()},
+            {'second'},
+        )
+
+
+class FavoritesChangeTests(TestCase):
+    def setUp(self):
+        user = JukeUser.objects.create_user(username='editor', password='secret', email='editor@example.com')
+        self.profile = MusicProfile.objects.create(user=user)
+
+    @mock.patch('recommender.services.profile_recommendations.client.fetch_recommendations')
+    def test_editing_favorites_recomputes_only_that_profile(self, mock_fetch):
+        mock_fetch.return_value = _engine_result('Deftones')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.favorite_artists = ['Tool']
+            self.profile.save()
+
+        mock_fetch.assert_called_once()
+        self.assertEqual(mock_fetch.call_args[0][0]['artists'], ['Tool'])
+        self.assertEqual(ProfileRecommendation.objects.get(profile=self.profile).results['artists'][0]['name'], 'Deftones')
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.profile.bio = 'Unrelated edit'
+            self.profile.save()
+
+        self.assertEqual(callbacks, [])
+        mock_fetch.assert_called_once()
@@ -0,0 +1,72 @@
+from django.test import SimpleTestCase
+
+from recommender.services.rate_limit import LocalRateLimiter, RedisRateLimiter
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+class _FakePipeline:
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def incr(self, key):
+        self.ops.append(key)
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        key = self.ops.pop()
+        self.store[key] = self.store.get(key, 0) + 1
+        return [self.store[key], True]
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def pipeline(self):
+        return _FakePipeline(self.store)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_local_limiter_waits_for_the_next_window(self):
+        clock = _FakeClock()
+        limiter = LocalRateLimiter(2, period=1.0, clock=clock, sleep=clock.sleep)
+
+        for _ in range(5):
+            limiter.acquire()
+
+        # Two calls in window 100, two in 101, one in 102.
+        self.assertEqual(clock.sleeps, [1.0, 1.0])
+        self.assertEqual(clock.now, 102.0)
+
+    def test_redis_limiter_shares_the_quota_between_instances(self):
+        clock = _FakeClock()
+        redis = _FakeRedis()
+        workers = [RedisRateLimiter(redis, 'spotify', 3, clock=clock, sleep=clock.sleep) for _ in range(2)]
+
+        for worker in workers * 2:
+            worker.acquire()
+
+        self.assertEqual(clock.sleeps, [1.0])
+        self.assertEqual(redis.store, {'spotify:100': 4, 'spotify:101': 1})
+
+    def test_zero_rate_disables_limiting(self):
+        clock = _FakeClock()
+        limiter = LocalRateLimiter(0, clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            limiter.acquire()
+        self.assertEqual(clock.sleeps, [])
@@ -1,3 +1,5 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
 import requests
@@ -6,13 +8,34 @@ from django.test import SimpleTestCase
 from recommender.services import client
 
 
+def _response(status_code=200, data=None):
+    response = mock.Mock(status_code=status_code, ok=status_code < 400)
+    response.json.return_value = data if data is not None else {}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.HTTPError(str(status_code))
+    else:
+        response.raise_for_status.return_value = None
+    return response
+
+
 class RecommenderClientTests(SimpleTestCase):
-    @mock.patch('recommender.services.client.requests.post')
+    def setUp(self):
+        for name, value in (
+            ('BREAKER', client.CircuitBreaker(3, 30)),
+            ('STATS', client.CallStats()),
+            ('ENGINE_BASE_URL', 'http://engine.test'),
+            ('HEDGE_AFTER_SECONDS', 0),
+        ):
+            patcher = mock.patch.object(client, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        sleep = mock.patch('recommender.services.client.time.sleep')
+        self.mock_sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    @mock.patch('recommender.services.client.SESSION.post')
     def test_fetch_recommendations_posts_payload(self, mock_post):
-        mock_response = mock.Mock()
-        mock_response.json.return_value = {'artists': []}
-        mock_response.raise_for_status.return_value = None
-        mock_post.return_value = mock_response
+        mock_post.return_value = _response(data={'artists': []})
 
         payload = {'artists': ['Tool']}
         with mock.patch('recommender.services.client.ENGINE_BASE_URL', 'http://engine.test/'):
@@ -25,15 +48,181 @@ class RecommenderClientTests(SimpleTestCase):
             timeout=client.DEFAULT_TIMEOUT,
         )
 
-    @mock.patch('recommender.services.client.requests.post')
+    @mock.patch('recommender.services.client.SESSION.post')
+    @mock.patch('recommender.services.client.SESSION.get')
+    def test_engine_stats_are_fetched_with_a_get(self, mock_get, mock_post):
+        mock_get.side_effect = [_response(503), _response(data={'model_version': 'v2.0.0'})]
+
+        self.assertEqual(client.fetch_engine_stats(), {'model_version': 'v2.0.0'})
+
+        mock_get.assert_called_with('http://engine.test/stats', timeout=client.DEFAULT_TIMEOUT)
+        self.assertEqual(mock_get.call_count, 2)
+        mock_post.assert_not_called()
+        self.assertEqual(client.call_stats()['endpoints']['/stats']['outcomes'], {'http_503': 1, 'ok': 1, 'retry': 1})
+
+    @mock.patch('recommender.services.client.SESSION.post')
     def test_fetch_recommendations_raises_for_http_errors(self, mock_post):
-        mock_response = mock.Mock()
-        mock_response.raise_for_status.side_effect = requests.HTTPError('boom')
-        mock_post.return_value = mock_response
+        mock_post.return_value = _response(400)
+
+        with self.assertRaises(requests.HTTPError):
+            client.fetch_recommendations({'artists': ['Tool']})
+        mock_post.assert_called_once()
+
+    @mock.patch('recommender.services.client.SESSION.post')
+    def test_retries_transient_failures_with_backoff(self, mock_post):
+        mock_post.side_effect = [requests.ConnectionError('reset'), _response(503), _response(data={'artists': []})]
+
+        self.assertEqual(client.fetch_recommendations({'artists': ['Tool']}), {'artists': []})
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(self.mock_sleep.call_count, 2)
+        outcomes = client.call_stats()['endpoints']['/recommend']['outcomes']
+        self.assertEqual(outcomes, {'connection_error': 1, 'http_503': 1, 'ok': 1, 'retry': 2})
 
-        with mock.patch('recommender.services.client.ENGINE_BASE_URL', 'http://engine.test'):
-            with self.assertRaises(requests.HTTPError):
+    @mock.patch('recommender.services.client.SESSION.post')
+    def test_circuit_opens_and_fails_fast(self, mock_post):
+        mock_post.side_effect = requests.ConnectionError('refused')
+
+        with self.assertRaises(requests.ConnectionError):
+            client.fetch_recommendations({'artists': ['Tool']})
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(client.BREAKER.state, 'open')
+
+        with self.assertRaises(client.EngineUnavailable):
+            client.fetch_recommendations({'artists': ['Tool']})
+        self.assertEqual(mock_post.call_count, 3)
+
+    def test_breaker_lets_one_trial_through_after_reset(self):
+        now = [0.0]
+        breaker = client.CircuitBreaker(1, 10, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        now[0] = 10.0
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertTrue(breaker.allow())
+
+    @mock.patch('recommender.services.client.SESSION.post')
+    def test_breaker_recovers_when_the_trial_call_fails_oddly(self, mock_post):
+        now = [0.0]
+        breaker = client.CircuitBreaker(1, 10, clock=lambda: now[0])
+        mock_post.side_effect = [
+            requests.ConnectionError('refused'),
+            requests.exceptions.ChunkedEncodingError('truncated'),
+            _response(data={'artists': []}),
+        ]
+        with mock.patch.object(client, 'BREAKER', breaker), mock.patch.object(client, 'RETRIES', 0):
+            with self.assertRaises(requests.ConnectionError):
                 client.fetch_recommendations({'artists': ['Tool']})
+            now[0] = 10.0
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                client.fetch_recommendations({'artists': ['Tool']})
+            self.assertEqual(breaker.state, 'open')
+
+            now[0] = 20.0
+            self.assertEqual(client.fetch_recommendations({'artists': ['Tool']}), {'artists': []})
+        self.assertEqual(breaker.state, 'closed')
+        outcomes = client.call_stats()['endpoints']['/recommend']['outcomes']
+        self.assertEqual(outcomes['request_error'], 1)
+
+    @mock.patch('recommender.services.client.SESSION.post')
+    def test_non_connection_errors_count_toward_the_threshold(self, mock_post):
+        mock_post.side_effect = requests.exceptions.ContentDecodingError('bad gzip')
+
+        for _ in range(3):
+            with self.assertRaises(requests.exceptions.ContentDecodingError):
+                client.fetch_recommendations({'artists': ['Tool']})
+
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(client.BREAKER.state, 'open')
+
+    @mock.patch('recommender.services.client.SESSION.post')
+    def test_hedged_request_returns_first_answer(self, mock_post):
+        release = threading.Event()
+
+        def post(url, json, timeout):
+            if mock_post.call_count == 1:
+                release.wait(5)
+                return _response(data={'from': 'primary'})
+            return _response(data={'from': 'hedge'})
+
+        mock_post.side_effect = post
+        with mock.patch.object(client, 'HEDGE_AFTER_SECONDS', 0.01):
+            result = client.fetch_recommendations({'artists': ['Tool']})
+        release.set()
+
+        self.assertEqual(result, {'from': 'hedge'})
+        outcomes = client.call_stats()['endpoints']['/recommend']['outcomes']
+        self.assertEqual((outcomes['hedged'], outcomes['hedge_won']), (1, 1))
+
+    @mock.patch('recommender.services.client.SESSION.post')
+    def test_hedge_delay_starts_when_the_primary_does(self, mock_post):
+        mock_post.return_value = _response(data={'from': 'primary'})
+        busy = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        # Queue the call behind other work for longer than the hedge delay.
+        executor.submit(busy.wait, 0.1)
+
+        with mock.patch.object(client, '_PRIMARY_EXECUTOR', executor), mock.patch.object(client, 'HEDGE_AFTER_SECONDS', 0.01):
+            result = client.fetch_recommendations({'artists': ['Tool']})
+
+        self.assertEqual(result, {'from': 'primary'})
+        mock_post.assert_called_once()
+        self.assertNotIn('hedged', client.call_stats()['endpoints']['/recommend']['outcomes'])
+
+    @mock.patch('recommender.services.client.SESSION.post')
+    def test_hedge_is_skipped_when_the_hedge_pool_is_full(self, mock_post):
+        def post(url, json, timeout):
+            threading.Event().wait(0.05)
+            return _response(data={'from': 'primary'})
+
+        mock_post.side_effect = post
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        with mock.patch.object(client, '_HEDGE_SLOTS', slots), mock.patch.object(client, 'HEDGE_AFTER_SECONDS', 0.01):
+            result = client.fetch_recommendations({'artists': ['Tool']})
+
+        self.assertEqual(result, {'from': 'primary'})
+        mock_post.assert_called_once()
+        outcomes = client.call_stats()['endpoints']['/recommend']['outcomes']
+        self.assertEqual(outcomes['hedge_skipped'], 1)
+        self.assertNotIn('hedged', outcomes)
+
+    @mock.patch('recommender.services.client.SESSION.post')
+    def test_call_stats_are_logged_once_per_interval(self, mock_post):
+        mock_post.return_value = _response(data={'artists': []})
+        now = [0.0]
+        with (
+            mock.patch.object(client, 'STATS', client.CallStats(clock=lambda: now[0])),
+            mock.patch.object(client, 'STATS_LOG_SECONDS', 60),
+            self.assertLogs('recommender.services.client', 'INFO') as logs,
+        ):
+            client.fetch_recommendations({'artists': ['Tool']})
+            now[0] = 61.0
+            client.fetch_recommendations({'artists': ['Tool']})
+            client.fetch_recommendations({'artists': ['Tool']})
+
+        lines = [line for line in logs.output if 'engine call stats' in line]
+        self.assertEqual(len(lines), 1)
+        self.assertIn('"ok": 2', lines[0])
+
+    @mock.patch('recommender.services.client._request')
+    def test_fetch_recommendations_batch_chunks_profiles(self, mock_request):
+        mock_request.side_effect = lambda path, payload: {
+            'results': [{'artists': [], 'seed': item['artists']} for item in payload['requests']],
+        }
+        profiles = [{'artists': [f'Artist {n}']} for n in range(5)]
+
+        with mock.patch('recommender.services.client.BATCH_SIZE', 2):
+            results = client.fetch_recommendations_batch(profiles)
+
+        self.assertEqual([result['seed'] for result in results], [profile['artists'] for profile in profiles])
+        self.assertEqual(mock_request.call_count, 3)
+        mock_request.assert_called_with('/recommend/batch', {'requests': profiles[4:]})
 
     @mock.patch('recommender.services.client._request')
     def test_build_vector_from_names_uses_text_embeddings(self, mock_request):